@@ -0,0 +1,126 @@
+"""
+An asyncio interface to planning, so that searching does not block the event
+loop. There are two ways to run a search:
+
+- cooperatively, with :func:`aiter_plans`, which runs a step-wise search (see
+  :mod:`py_plan.search`) on the event loop and yields control back to the loop
+  every `slice_size` node expansions.
+- in an executor, with :func:`aiter_search`, which runs any py_search search
+  in a thread (or process) pool, one solution at a time.
+
+In both cases plans are exposed as an async iterator and cancelling the task
+that consumes the iterator stops the search.
+
+This module requires Python 3.7 or later (async generators and
+:func:`asyncio.get_running_loop`).
+"""
+
+import asyncio
+import threading
+
+from py_search.base import Problem
+from py_search.uninformed import breadth_first_search
+
+from py_plan.search import graph_search_steps
+
+
+class SearchCancelled(Exception):
+    """
+    Raised inside a search that is running in an executor when the task
+    waiting on it is cancelled.
+    """
+    pass
+
+
+class CancellableProblem(Problem):
+    """
+    Wraps a problem so that the search over it raises
+    :class:`SearchCancelled` at the next node expansion once the `cancelled`
+    event is set.
+    """
+
+    def __init__(self, problem, cancelled):
+        self.problem = problem
+        self.cancelled = cancelled
+        self.initial = problem.initial
+        self.goal = problem.goal
+
+    def node_value(self, node):
+        return self.problem.node_value(node)
+
+    def successors(self, node):
+        if self.cancelled.is_set():
+            raise SearchCancelled()
+        return self.problem.successors(node)
+
+    def predecessors(self, node):
+        if self.cancelled.is_set():
+            raise SearchCancelled()
+        return self.problem.predecessors(node)
+
+    def goal_test(self, state_node, goal_node=None):
+        return self.problem.goal_test(state_node, goal_node)
+
+
+async def aiter_plans(problem, steps=graph_search_steps, slice_size=100):
+    """
+    An async iterator over the solutions found by a step-wise search, which
+    runs on the event loop and gives other tasks a turn every `slice_size`
+    node expansions.
+
+    :param problem: The problem to solve.
+    :type problem: :class:`StateSpacePlanningProblem`
+    :param steps: A function that takes the problem and returns a step-wise
+        search (e.g., :func:`graph_search_steps` or :func:`anytime_steps`).
+    :type steps: callable
+    :param slice_size: The number of expansions between yields to the loop.
+    :type slice_size: int
+    """
+    expanded = 0
+    for event in steps(problem):
+        if event is None:
+            expanded += 1
+            if expanded % slice_size == 0:
+                await asyncio.sleep(0)
+        else:
+            yield event
+
+
+async def aiter_search(problem, search=breadth_first_search, executor=None):
+    """
+    An async iterator over the solutions of any py_search search, which runs
+    in an executor (the loop's default thread pool if None). When the
+    consuming task is cancelled, the search is stopped at its next
+    expansion.
+
+    :param problem: The problem to solve.
+    :type problem: :class:`StateSpacePlanningProblem`
+    :param search: A search function that takes the problem.
+    :type search: callable
+    :param executor: The executor to run the search in.
+    :type executor: :class:`concurrent.futures.Executor`
+    """
+    loop = asyncio.get_running_loop()
+    cancelled = threading.Event()
+    solutions = search(CancellableProblem(problem, cancelled))
+    done = object()
+
+    try:
+        while True:
+            solution = await loop.run_in_executor(executor, next, solutions,
+                                                  done)
+            if solution is done:
+                return
+            yield solution
+    finally:
+        cancelled.set()
+
+
+async def plan_async(problem, steps=graph_search_steps, slice_size=100):
+    """
+    Returns the first solution found by cooperatively running a step-wise
+    search, or None if there is no solution.
+    """
+    async for solution in aiter_plans(problem, steps, slice_size):
+        return solution
+    return None
@@ -5,6 +5,7 @@ from __future__ import division
 
 from py_plan.pattern_matching import is_negated_term
 from py_plan.pattern_matching import extract_strings
+from py_plan.numeric import is_numeric_effect
 from py_plan.unification import is_variable
 from py_plan.unification import subst
 
@@ -30,6 +31,7 @@ class Operator:
         self.neg_cond = set()
         self.add_effects = set()
         self.del_effects = set()
+        self.numeric_effects = []
 
         if reverse_sub is None:
             self.reverse_sub = {}
@@ -38,9 +40,9 @@ class Operator:
 
         for c in self.conditions:
             if is_negated_term(c):
-                self.pos_cond.add(c[1])
+                self.neg_cond.add(c[1])
             else:
-                self.neg_cond.add(c)
+                self.pos_cond.add(c)
 
         pos_vars = set(s for term in self.pos_cond
                        for s in extract_strings(term)
@@ -51,7 +53,9 @@ class Operator:
         self.free_vars = neg_vars - pos_vars
 
         for e in self.effects:
-            if isinstance(e, tuple) and len(e) > 0 and e[0] == 'not':
+            if is_numeric_effect(e):
+                self.numeric_effects.append(e)
+            elif isinstance(e, tuple) and len(e) > 0 and e[0] == 'not':
                 self.del_effects.add(e[1])
             else:
                 self.add_effects.add(e)
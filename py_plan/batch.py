@@ -0,0 +1,136 @@
+"""
+Batch evaluation of constraint terms, such as `(ne, '?b', '?x')` or
+`(ge, '?m', '?c')`, over a column-oriented set of candidate bindings. Where
+the operator and the column types allow it, a constraint is evaluated with
+NumPy ufuncs over whole columns; otherwise each row is evaluated with
+:func:`execute_functions`, which gives the same result.
+
+NumPy is optional; without it every constraint is evaluated row by row.
+"""
+
+from __future__ import print_function
+from __future__ import unicode_literals
+from __future__ import absolute_import
+from __future__ import division
+
+from operator import add
+from operator import and_
+from operator import eq
+from operator import ge
+from operator import gt
+from operator import le
+from operator import lt
+from operator import mul
+from operator import ne
+from operator import or_
+from operator import sub
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+from py_plan.unification import execute_functions
+from py_plan.unification import is_variable
+
+COMPARISONS = frozenset([eq, ne, lt, le, gt, ge])
+ARITHMETIC = frozenset([add, sub, mul])
+LOGICAL = frozenset([or_, and_])
+
+# constraints with these operators evaluate to booleans.
+BOOLEAN_OPS = COMPARISONS.union(LOGICAL)
+
+if np is not None:
+    UFUNCS = {eq: np.equal, ne: np.not_equal, lt: np.less, le: np.less_equal,
+              gt: np.greater, ge: np.greater_equal, add: np.add,
+              sub: np.subtract, mul: np.multiply, or_: np.logical_or,
+              and_: np.logical_and}
+
+
+def column_array(values):
+    """
+    Converts a column of values to a NumPy array, which is numeric or string
+    typed if all of the values are ints, all are floats, all are bools, or all
+    are strings, and an object array otherwise (so a column that mixes ints
+    and floats keeps its values as they are).
+
+    >>> column_array([1, 2]).dtype.kind
+    'i'
+    >>> column_array([1, 2.5]).dtype.kind
+    'O'
+    """
+    types = set(type(v) for v in values)
+    if types and (types in (set([int]), set([float]), set([bool])) or
+                  all(issubclass(t, type('')) for t in types)):
+        return np.array(values)
+    arr = np.empty(len(values), dtype=object)
+    for i, v in enumerate(values):
+        arr[i] = v
+    return arr
+
+
+def _vectorizable(op, args):
+    kinds = [a.dtype.kind for a in args]
+    if op in LOGICAL:
+        return all(k == 'b' for k in kinds)
+    if op in ARITHMETIC:
+        return all(k in 'iuf' for k in kinds)
+    if all(k in 'biuf' for k in kinds):
+        return True
+    return all(k == 'U' for k in kinds)
+
+
+def _evaluate(term, columns):
+    """
+    Evaluates a term over the columns with ufuncs. Returns an array (or a 0-d
+    array for constants), or None if the term cannot be vectorized.
+    """
+    if is_variable(term):
+        return columns[term] if term in columns else None
+    if not isinstance(term, tuple):
+        value = np.asarray(term)
+        return value if value.dtype.kind in 'biufU' else None
+    if len(term) == 0 or term[0] not in UFUNCS:
+        return None
+
+    args = [_evaluate(a, columns) for a in term[1:]]
+    if len(args) != 2 or any(a is None for a in args):
+        return None
+    if not _vectorizable(term[0], args):
+        return None
+    return UFUNCS[term[0]](*args)
+
+
+def batch_evaluate(constraint, columns, size=None):
+    """
+    Evaluates a constraint for every row of a column-oriented set of bindings
+    (a dict from variables to equal length sequences of values) and returns a
+    mask with True for the rows where the constraint evaluates to True. The
+    mask is a NumPy bool array, or a list if NumPy is not available.
+
+    >>> batch_evaluate((ne, '?x', '?y'), {'?x': ['A', 'B'], '?y': ['B', 'B']})
+    array([ True, False])
+    >>> batch_evaluate((ge, (sub, '?m', '?c'), 0), {'?m': [5, 3],
+    ...                                             '?c': [4, 4]})
+    array([ True, False])
+    """
+    if size is None:
+        size = len(next(iter(columns.values()))) if columns else 1
+
+    if np is not None:
+        arrays = {v: column_array(columns[v]) for v in columns}
+        try:
+            result = _evaluate(constraint, arrays)
+        except TypeError:
+            result = None
+        if result is not None and result.dtype.kind == 'b':
+            return np.array(np.broadcast_to(result, (size,)))
+
+    mask = []
+    for i in range(size):
+        binding = {v: columns[v][i] for v in columns}
+        mask.append(execute_functions(constraint, binding) is True)
+
+    if np is None:
+        return mask
+    return np.array(mask, dtype=bool)
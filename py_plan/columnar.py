@@ -0,0 +1,335 @@
+"""
+A columnar, NumPy-backed store for large fact bases. Symbols are integer
+encoded and each (predicate, arity) relation is an `int32` array with one
+column per argument, so selections over partially bound patterns and joins
+are evaluated with vectorized array operations rather than Python loops.
+
+A :class:`ColumnarIndex` can be used in place of the dict returned by
+:func:`build_index`, i.e., as the index behind :func:`pattern_match`, and
+:func:`columnar_match` matches patterns set-at-a-time with vectorized joins.
+
+This module requires numpy.
+"""
+
+from __future__ import print_function
+from __future__ import unicode_literals
+from __future__ import absolute_import
+from __future__ import division
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+from py_plan.pattern_matching import build_index
+from py_plan.pattern_matching import pattern_match
+from py_plan.pattern_matching import is_functional_term
+from py_plan.pattern_matching import is_negated_term
+from py_plan.pattern_matching import contains_variable
+from py_plan.relational import is_relational_term
+from py_plan.relational import term_vars
+from py_plan.relational import holds
+from py_plan.unification import is_variable
+from py_plan.unification import subst
+
+
+def key_matches(key, fact_key):
+    """
+    Checks if a fact with the given index key is stored under `key` by
+    :func:`build_index`.
+
+    >>> key_matches(('on', '?', 'B'), ('on', 'A', 'B'))
+    True
+    >>> key_matches(('on', ('f', '?')), ('on', ('g', 'A')))
+    False
+    """
+    if key == '?':
+        return True
+    if isinstance(key, tuple) and isinstance(fact_key, tuple):
+        if len(key) != len(fact_key):
+            return False
+        return all(key_matches(k, f) for k, f in zip(key, fact_key))
+    return key == fact_key
+
+
+class ColumnarIndex(object):
+    """
+    An index over ground facts, where each flat relational fact is stored as a
+    row of integer codes in a per-relation `int32` array. Other facts (e.g.,
+    facts without a predicate or facts with variables) are kept in a regular
+    :func:`build_index` index.
+
+    It supports the read-only dict interface used by :func:`pattern_match`
+    (`key in index`, `index[key]`), where a key is an index key (see
+    :func:`index_key`). The facts for each key are selected with vectorized
+    comparisons and cached.
+
+    >>> index = ColumnarIndex([('on', 'A', 'B'), ('on', 'B', 'C')])
+    >>> index[('on', '?', 'C')]
+    [('on', 'B', 'C')]
+    >>> ('on', 'C', '?') in index
+    False
+    """
+
+    def __init__(self, facts):
+        if np is None:
+            raise ImportError("ColumnarIndex requires numpy.")
+
+        self.codes = {}
+        self.symbols = []
+        self.equal = {}
+        rows = {}
+        other = []
+
+        for fact in set(facts):
+            if (isinstance(fact, tuple) and len(fact) > 1 and
+                    is_relational_term(fact) and
+                    not contains_variable(fact)):
+                key = (fact[0], len(fact) - 1)
+                if key not in rows:
+                    rows[key] = []
+                rows[key].append([self.encode(a) for a in fact[1:]])
+            else:
+                other.append(fact)
+
+        self.relations = {k: np.array(rows[k], dtype=np.int32)
+                          for k in rows}
+        self.canonical = np.array([self.equal[v][0] for v in self.symbols],
+                                  dtype=np.int32)
+        self.other = build_index(other)
+        self.cache = {}
+
+    def encode(self, symbol):
+        # keyed by type too, so 1, 1.0 and True decode to themselves.
+        key = (type(symbol), symbol)
+        if key not in self.codes:
+            self.codes[key] = len(self.symbols)
+            self.symbols.append(symbol)
+            # a dict key, so symbols that compare equal share an entry.
+            self.equal.setdefault(symbol, []).append(self.codes[key])
+        return self.codes[key]
+
+    def equal_codes(self, symbol):
+        """
+        Returns the codes of the symbols that are equal to a symbol (e.g., 1,
+        1.0, and True), so matching compares values as :func:`build_index`
+        does.
+        """
+        return self.equal.get(symbol, [])
+
+    def decode(self, head, row):
+        return (head,) + tuple(self.symbols[c] for c in row)
+
+    def relation(self, head, arity):
+        """
+        The array of rows for a relation (possibly empty).
+        """
+        if (head, arity) in self.relations:
+            return self.relations[(head, arity)]
+        return np.zeros((0, arity), dtype=np.int32)
+
+    def select(self, head, arity, bound):
+        """
+        Returns the rows of a relation whose columns equal the given values,
+        where `bound` is a list of (column, value) pairs, as an array.
+
+        >>> index = ColumnarIndex([('on', 'A', 'B'), ('on', 'B', 'C')])
+        >>> [index.decode('on', r) for r in index.select('on', 2, [(0, 'A')])]
+        [('on', 'A', 'B')]
+        """
+        return self._select(self.relation(head, arity), bound)
+
+    def _select(self, rel, bound):
+        mask = np.ones(len(rel), dtype=bool)
+        for c, v in bound:
+            codes = self.equal_codes(v)
+            if len(codes) == 1:
+                mask &= rel[:, c] == codes[0]
+            else:
+                mask &= np.isin(rel[:, c], codes)
+        return rel[mask]
+
+    def lookup(self, key):
+        """
+        Returns the facts stored under an index key.
+        """
+        if key in self.cache:
+            return self.cache[key]
+
+        facts = []
+        if key == '?':
+            for (head, _), rel in self.relations.items():
+                facts.extend(self.decode(head, row) for row in rel)
+        elif (isinstance(key, tuple) and len(key) > 1 and
+              not isinstance(key[0], tuple) and
+              (key[0], len(key) - 1) in self.relations):
+            rel = self.relations[(key[0], len(key) - 1)]
+            bound = [(c, a) for c, a in enumerate(key[1:])
+                     if not contains_variable(a)]
+            partial = [a for a in key[1:]
+                       if isinstance(a, tuple) and contains_variable(a)]
+            for row in self._select(rel, bound):
+                fact = self.decode(key[0], row)
+                if not partial or key_matches(key, fact):
+                    facts.append(fact)
+
+        facts.extend(self.other.get(key, []))
+        self.cache[key] = facts
+        return facts
+
+    def __contains__(self, key):
+        return len(self.lookup(key)) > 0
+
+    def __getitem__(self, key):
+        facts = self.lookup(key)
+        if len(facts) == 0:
+            raise KeyError(key)
+        return facts
+
+    def get(self, key, default=None):
+        facts = self.lookup(key)
+        if len(facts) == 0:
+            return default
+        return facts
+
+
+def vector_join(variables, table, term, index):
+    """
+    Joins a table of binding codes (an int32 array with one column per
+    variable) with the relation of a positive term. Rows are matched on the
+    shared variables by mapping the join keys of both sides to dense ids
+    (np.unique) and using a sort and binary search.
+    """
+    args = term[1:]
+    bound = [(c, a) for c, a in enumerate(args) if not is_variable(a)]
+    rel = index.select(term[0], len(args), bound)
+
+    var_cols = {}
+    for c, a in enumerate(args):
+        if is_variable(a):
+            var_cols.setdefault(a, []).append(c)
+
+    # repeated variables within the term (equal symbols share a canonical
+    # code).
+    canonical = index.canonical
+    for cols in var_cols.values():
+        for c in cols[1:]:
+            rel = rel[canonical[rel[:, cols[0]]] == canonical[rel[:, c]]]
+
+    shared = [v for v in var_cols if v in variables]
+    new = [v for v in var_cols if v not in variables]
+
+    if not shared:
+        left = np.repeat(np.arange(len(table)), len(rel))
+        right = np.tile(np.arange(len(rel)), len(table))
+    else:
+        lkeys = canonical[table[:, [variables.index(v) for v in shared]]]
+        rkeys = canonical[rel[:, [var_cols[v][0] for v in shared]]]
+        _, ids = np.unique(np.vstack([lkeys, rkeys]), axis=0,
+                           return_inverse=True)
+        ids = ids.reshape(-1)
+        lids = ids[:len(lkeys)]
+        rids = ids[len(lkeys):]
+
+        order = np.argsort(rids, kind='mergesort')
+        sorted_rids = rids[order]
+        start = np.searchsorted(sorted_rids, lids, side='left')
+        end = np.searchsorted(sorted_rids, lids, side='right')
+        counts = end - start
+
+        left = np.repeat(np.arange(len(table)), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) -
+                                                      counts, counts)
+        right = order[np.repeat(start, counts) + offsets]
+
+    columns = [table[left]]
+    columns.extend(rel[right][:, [var_cols[v][0]]] for v in new)
+    return variables + new, np.hstack(columns).astype(np.int32)
+
+
+def columnar_match(pattern, index, substitution=None):
+    """
+    Find substitutions that yield a match of the pattern against a
+    :class:`ColumnarIndex`. Positive relational terms are evaluated with
+    vectorized joins, while negated and functional terms are evaluated as
+    filters over the resulting bindings. Patterns that are not relational are
+    matched with :func:`pattern_match`.
+
+    >>> index = ColumnarIndex([('on', 'A', 'B'), ('on', 'B', 'C')])
+    >>> list(columnar_match([('on', '?x', '?y'), ('on', '?y', '?z')], index))
+    [{'?x': 'A', '?y': 'B', '?z': 'C'}]
+    """
+    if substitution is None:
+        substitution = {}
+
+    pattern = [subst(substitution, t) for t in pattern]
+    positive = [t for t in pattern if not is_negated_term(t) and not
+                is_functional_term(t)]
+
+    if not all(isinstance(t, tuple) and len(t) > 1 and
+               is_relational_term(t) for t in positive):
+        for m in pattern_match(pattern, index, {}):
+            m.update(substitution)
+            yield m
+        return
+
+    variables = []
+    table = np.zeros((1, 0), dtype=np.int32)
+    remaining = list(positive)
+    while remaining and len(table) > 0:
+        def score(t):
+            n_bound = sum(1 for a in t[1:] if not is_variable(a) or
+                          a in variables)
+            return (-n_bound, len(index.relation(t[0], len(t) - 1)))
+        term = min(remaining, key=score)
+        remaining.remove(term)
+        variables, table = vector_join(variables, table, term, index)
+
+    filters = [t for t in pattern if is_negated_term(t) or
+               is_functional_term(t)]
+    determined = set(variables)
+    if any(not term_vars(t).issubset(determined) for t in filters
+           if not is_negated_term(t)):
+        raise Exception("Functionals cannot have existentially "
+                        "quantified variables.")
+
+    fact_index = _FactSet(index)
+    for row in table:
+        m = {v: index.symbols[c] for v, c in zip(variables, row)}
+        if all(holds(t, m, fact_index) for t in filters):
+            m.update(substitution)
+            yield m
+
+
+class _FactSet(object):
+    """
+    Adapts a :class:`ColumnarIndex` to the interface expected by
+    :func:`holds` (a `facts` set, `relation`, `lookup` and `dict_index`).
+    """
+
+    def __init__(self, index):
+        self.index = index
+        self.facts = self
+        self.indices = {}
+
+    def __contains__(self, fact):
+        return fact in self.index.lookup(fact)
+
+    def relation(self, head, arity):
+        return [tuple(self.index.symbols[c] for c in row)
+                for row in self.index.relation(head, arity)]
+
+    def lookup(self, head, arity, positions):
+        key = (head, arity, positions)
+        if key not in self.indices:
+            table = {}
+            for row in self.relation(head, arity):
+                k = tuple(row[p] for p in positions)
+                if k not in table:
+                    table[k] = []
+                table[k].append(row)
+            self.indices[key] = table
+        return self.indices[key]
+
+    def dict_index(self):
+        return self.index
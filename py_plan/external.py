@@ -0,0 +1,238 @@
+"""
+An external-memory breadth-first search for :class:`StateSpacePlanningProblem`
+(or any problem whose states are sets of hashable facts). States are
+serialized to a compact binary encoding and each layer of the search is kept
+in its own file on disk, which is memory-mapped when it is read. Duplicates
+are detected in a delayed fashion: the successors of a layer are written out
+in sorted runs, which are then merged and subtracted from the previous layers.
+Only the table of distinct facts is kept in memory.
+"""
+
+from __future__ import print_function
+from __future__ import unicode_literals
+from __future__ import absolute_import
+from __future__ import division
+
+import os
+import mmap
+import shutil
+import struct
+import tempfile
+from array import array
+from heapq import merge
+
+from py_search.base import Node
+from py_search.base import SolutionNode
+
+_LEN = struct.Struct('<I')
+
+
+class FactEncoder(object):
+    """
+    Interns facts so that states can be encoded as a sorted sequence of
+    unsigned integer fact ids.
+
+    >>> e = FactEncoder()
+    >>> s = frozenset([('on', 'A', 'B'), ('clear', 'A')])
+    >>> e.decode(e.encode(s)) == s
+    True
+    """
+
+    def __init__(self):
+        self.ids = {}
+        self.facts = []
+
+    def fact_id(self, fact):
+        if fact not in self.ids:
+            self.ids[fact] = len(self.facts)
+            self.facts.append(fact)
+        return self.ids[fact]
+
+    def encode(self, state):
+        """
+        Returns the binary record for a state, a length prefix followed by the
+        sorted fact ids.
+        """
+        ids = array(str('I'), sorted(self.fact_id(f) for f in state))
+        # tostring and fromstring are the Python 2 names.
+        tobytes = getattr(ids, 'tobytes', None) or ids.tostring
+        return _LEN.pack(len(ids)) + tobytes()
+
+    def decode(self, record):
+        ids = array(str('I'))
+        frombytes = getattr(ids, 'frombytes', None) or ids.fromstring
+        frombytes(record[_LEN.size:])
+        return frozenset(self.facts[i] for i in ids)
+
+
+def read_records(path):
+    """
+    Iterates over the binary state records stored in a file, using a
+    memory map to access the file.
+    """
+    if os.path.getsize(path) == 0:
+        return
+
+    with open(path, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            offset = 0
+            size = len(mm)
+            while offset < size:
+                n = _LEN.unpack_from(mm, offset)[0]
+                end = offset + _LEN.size + 4 * n
+                yield mm[offset:end]
+                offset = end
+        finally:
+            mm.close()
+
+
+def write_records(path, records):
+    """
+    Writes an iterator of records to a file, returning the number written.
+    """
+    count = 0
+    with open(path, 'wb') as f:
+        for r in records:
+            f.write(r)
+            count += 1
+    return count
+
+
+def unique(records):
+    """
+    Drops adjacent duplicates from a sorted iterator of records.
+    """
+    last = None
+    for r in records:
+        if r != last:
+            yield r
+        last = r
+
+
+def subtract(records, previous):
+    """
+    Given a sorted iterator of records and a list of sorted iterators of
+    previously seen records, yields the records that are not previously seen.
+    """
+    seen = unique(merge(*previous))
+    current = next(seen, None)
+    for r in records:
+        while current is not None and current < r:
+            current = next(seen, None)
+        if r != current:
+            yield r
+
+
+def external_breadth_first_search(problem, directory=None, chunk_size=100000,
+                                  depth_limit=float('inf')):
+    """
+    A breadth-first search that stores its frontier and closed list on disk.
+    Each layer of the search is a file of sorted, unique state records. The
+    successors of a layer are buffered in memory in chunks of `chunk_size`
+    records, which are sorted and written as runs. Once the layer is expanded
+    the runs are merged and all states that appear in an earlier layer are
+    removed (delayed duplicate detection).
+
+    When a goal is found, the plan is reconstructed by scanning the previous
+    layers for a parent of the goal state, so no parent pointers are stored.
+    Like the py_search searches, this returns an iterator of solutions.
+
+    :param problem: The problem to solve.
+    :type problem: :class:`StateSpacePlanningProblem`
+    :param directory: The directory to store the layer files in. If None, then
+        a temporary directory is created and removed when search ends.
+    :type directory: str
+    :param chunk_size: The number of records sorted in memory at one time.
+    :type chunk_size: int
+    :param depth_limit: A limit for the depth of the search.
+    :type depth_limit: int or float('inf')
+    """
+    cleanup = directory is None
+    if directory is None:
+        directory = tempfile.mkdtemp(prefix='py_plan_bfs')
+
+    encoder = FactEncoder()
+
+    def layer_path(depth):
+        return os.path.join(directory, 'layer-%i.bin' % depth)
+
+    try:
+        write_records(layer_path(0), [encoder.encode(problem.initial.state)])
+        depth = 0
+
+        while True:
+            runs = []
+            buf = []
+
+            for record in read_records(layer_path(depth)):
+                state = encoder.decode(record)
+                node = Node(state, None, None, 0)
+                if problem.goal_test(node, problem.goal):
+                    goal = _reconstruct(problem, encoder, layer_path, depth,
+                                        state)
+                    yield SolutionNode(goal, problem.goal)
+
+                if depth >= depth_limit:
+                    continue
+
+                for s in problem.successors(node):
+                    buf.append(encoder.encode(s.state))
+                    if len(buf) >= chunk_size:
+                        runs.append(_write_run(directory, len(runs), buf))
+                        buf = []
+
+            if buf:
+                runs.append(_write_run(directory, len(runs), buf))
+
+            if not runs:
+                break
+
+            candidates = unique(merge(*[read_records(r) for r in runs]))
+            previous = [read_records(layer_path(d))
+                        for d in range(depth + 1)]
+            count = write_records(layer_path(depth + 1),
+                                  subtract(candidates, previous))
+
+            for r in runs:
+                os.remove(r)
+
+            if count == 0:
+                break
+            depth += 1
+
+    finally:
+        if cleanup:
+            shutil.rmtree(directory, ignore_errors=True)
+
+
+def _write_run(directory, i, buf):
+    path = os.path.join(directory, 'run-%i.bin' % i)
+    buf.sort()
+    write_records(path, unique(buf))
+    return path
+
+
+def _reconstruct(problem, encoder, layer_path, depth, state):
+    """
+    Rebuilds the path to a state at the given depth by searching each previous
+    layer for a state that generates it.
+    """
+    steps = []
+    for d in range(depth - 1, -1, -1):
+        for record in read_records(layer_path(d)):
+            parent = encoder.decode(record)
+            found = None
+            for s in problem.successors(Node(parent, None, None, 0)):
+                if s.state == state:
+                    found = s
+                    break
+            if found is not None:
+                steps.append((found.action, state, found.cost()))
+                state = parent
+                break
+
+    node = Node(problem.initial.state, None, None, problem.initial.cost())
+    for action, state, cost in reversed(steps):
+        node = Node(state, node, action, node.cost() + cost)
+    return node
@@ -0,0 +1,217 @@
+"""
+Grounding of operators by relaxed reachability. Starting from the initial
+state, operators are repeatedly matched against the set of reachable facts,
+ignoring negated conditions and delete effects, until no new facts (or
+actions) are reachable. The result is the set of ground actions that could
+be applicable in some reachable state, along with the reachable facts.
+
+Fluents whose values the operators change (see
+:func:`py_plan.numeric.changed_fluents`) can take any value in the
+relaxation: conditions on their values, and comparisons that use those
+values, are dropped when grounding and are not part of the conditions of the
+ground actions, and computed values are not added as facts. Values of such
+fluents that are used in effects are bound to the values the fluents have in
+the state.
+"""
+
+from __future__ import print_function
+from __future__ import unicode_literals
+from __future__ import absolute_import
+from __future__ import division
+
+from py_plan.pattern_matching import build_index
+from py_plan.pattern_matching import pattern_match
+from py_plan.pattern_matching import is_functional_term
+from py_plan.pattern_matching import is_negated_term
+from py_plan.pattern_matching import term_variables
+from py_plan.numeric import changed_fluents
+from py_plan.numeric import is_computed_value
+from py_plan.numeric import is_fluent_fact
+from py_plan.unification import execute_functions
+from py_plan.unification import is_variable
+from py_plan.unification import subst
+
+
+class GroundingLimitExceeded(Exception):
+    """
+    Raised when grounding produces more actions than the provided limit.
+    """
+    pass
+
+
+class GroundAction(object):
+    """
+    An operator together with a binding of its variables. The positive
+    conditions (`pos_cond`), negated conditions (`neg_cond`), add effects
+    (`adds`), and delete effects (`dels`) are sets of ground facts, except
+    that negated conditions can contain existentially quantified variables.
+    `action` is the (operator, binding) pair used in plans. Conditions on the
+    values of the `fluents` (a set of fluent keys) are left out of
+    `pos_cond`, computed values of them are left out of `adds`, and the
+    variables bound to their values are left out of `key`.
+    """
+
+    def __init__(self, operator, binding, fluents=frozenset()):
+        self.operator = operator
+        self.binding = binding
+        self.action = (operator, binding)
+        self.key = action_key(operator, binding,
+                              fluent_variables(operator, fluents))
+        self.cost = operator.cost
+
+        self.pos_cond = frozenset(subst(binding, c) for c in
+                                  operator.conditions if not
+                                  is_negated_term(c) and not
+                                  is_functional_term(c) and not
+                                  is_fluent_fact(c, fluents))
+        self.neg_cond = frozenset(subst(binding, c[1]) for c in
+                                  operator.conditions if is_negated_term(c))
+        self.adds = frozenset(ground_effect(e, binding)
+                              for e in operator.add_effects if not
+                              (is_computed_value(e) and
+                               is_fluent_fact(e, fluents)))
+        self.dels = frozenset(ground_effect(e, binding)
+                              for e in operator.del_effects)
+
+    def __repr__(self):
+        return "%s(%s)" % (self.operator.name,
+                           ", ".join("%s" % v for _, v in
+                                     sorted(self.binding.items())))
+
+
+def action_key(operator, binding, ignored=frozenset()):
+    """
+    A hashable key for the action of applying an operator under a binding,
+    leaving out the `ignored` variables.
+    """
+    return (id(operator), frozenset((v, binding[v]) for v in binding
+                                    if v not in ignored))
+
+
+def fluent_variables(operator, fluents):
+    """
+    The variables of an operator that are bound to the values of the fluents
+    (a set of fluent keys) by its conditions.
+    """
+    return frozenset(c[-1] for c in operator.pos_cond
+                     if is_fluent_fact(c, fluents) and is_variable(c[-1]))
+
+
+def ground_effect(effect, binding):
+    if is_functional_term(effect):
+        return execute_functions(effect, binding)
+    return subst(binding, effect)
+
+
+def relaxed_pattern(operator, fluents):
+    """
+    Returns the conditions that grounding matches for an operator, where the
+    values of the fluents can be anything, and the set of variables added to
+    stand for constant fluent values.
+
+    >>> from operator import ge
+    >>> from py_plan.base import Operator
+    >>> buy = Operator('buy', [('Money', '?m'), ('Cost', '?b', '?c'),
+    ...                        (ge, '?m', '?c')],
+    ...                [('Own', '?b'), ('decrease', ('Money',), '?c')])
+    >>> pattern, _ = relaxed_pattern(buy, set([('Money', 0)]))
+    >>> sorted(pattern)
+    [('Cost', '?b', '?c'), ('Money', '?m')]
+    """
+    values = set(c[-1] for c in operator.pos_cond
+                 if is_fluent_fact(c, fluents) and is_variable(c[-1]))
+    pattern = []
+    fresh = set()
+    for c in operator.conditions:
+        if is_negated_term(c):
+            continue
+        if is_functional_term(c) and not values.isdisjoint(
+                term_variables(c)):
+            continue
+        if is_fluent_fact(c, fluents) and not is_variable(c[-1]):
+            v = '?_value%i' % len(fresh)
+            fresh.add(v)
+            c = c[:-1] + (v,)
+        pattern.append(c)
+    return pattern, fresh
+
+
+def ground(operators, state, layer_limit=None, action_limit=None):
+    """
+    Grounds the operators by relaxed reachability from the state. Returns a
+    list of :class:`GroundAction` and the set of reachable facts.
+
+    :param operators: The operators to ground.
+    :type operators: list of :class:`Operator`
+    :param state: The initial state.
+    :type state: iterable of facts
+    :param layer_limit: The maximum number of relaxed layers to expand.
+    :type layer_limit: int
+    :param action_limit: The maximum number of ground actions; if exceeded,
+        then :class:`GroundingLimitExceeded` is raised.
+    :type action_limit: int
+
+    >>> from py_plan.base import Operator
+    >>> move = Operator('move', [('at', '?x'), ('adj', '?x', '?y')],
+    ...                 [('at', '?y'), ('not', ('at', '?x'))])
+    >>> actions, facts = ground([move], [('at', 'a'), ('adj', 'a', 'b'),
+    ...                                  ('adj', 'b', 'c')])
+    >>> sorted(repr(a) for a in actions)
+    ['move(a, b)', 'move(b, c)']
+    >>> ('at', 'c') in facts
+    True
+    """
+    facts = set(state)
+    actions = []
+    seen = set()
+    fluents = frozenset(changed_fluents(operators))
+    patterns = [relaxed_pattern(o, fluents) for o in operators]
+
+    layer = 0
+    while layer_limit is None or layer < layer_limit:
+        layer += 1
+        index = build_index(facts)
+        new_facts = set()
+
+        for o, (pattern, fresh) in zip(operators, patterns):
+            for m in pattern_match(pattern, index):
+                m = {v: m[v] for v in m if v not in fresh}
+                key = (id(o), frozenset(m.items()))
+                if key in seen:
+                    continue
+                seen.add(key)
+                action = GroundAction(o, m, fluents)
+                actions.append(action)
+                if action_limit is not None and len(actions) > action_limit:
+                    raise GroundingLimitExceeded()
+                new_facts.update(action.adds)
+
+        new_facts.difference_update(facts)
+        if not new_facts:
+            break
+        facts.update(new_facts)
+
+    return actions, facts
+
+
+def relaxed_reachable(state, actions, excluded=None):
+    """
+    Returns the facts reachable from the state in the delete relaxation of
+    the ground actions, without applying any action that adds `excluded`.
+    """
+    facts = set(state)
+    remaining = [a for a in actions if excluded is None or
+                 excluded not in a.adds]
+    changed = True
+    while changed:
+        changed = False
+        waiting = []
+        for a in remaining:
+            if a.pos_cond.issubset(facts):
+                if not a.adds.issubset(facts):
+                    facts.update(a.adds)
+                    changed = True
+            else:
+                waiting.append(a)
+        remaining = waiting
+    return facts
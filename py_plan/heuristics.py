@@ -0,0 +1,244 @@
+"""
+Domain-general heuristics for :class:`StateSpacePlanningProblem`. A heuristic
+is a callable that takes a search node and returns an estimate of the cost
+to reach the goals from the node's state. A heuristic can be passed to
+:class:`StateSpacePlanningProblem`, in which case node_value returns the cost
+of the node plus the heuristic estimate.
+"""
+
+from __future__ import print_function
+from __future__ import unicode_literals
+from __future__ import absolute_import
+from __future__ import division
+
+from collections import OrderedDict
+
+from py_plan.pattern_matching import build_index
+from py_plan.pattern_matching import match_exists
+from py_plan.pattern_matching import is_functional_term
+from py_plan.pattern_matching import is_negated_term
+from py_plan.grounding import action_key
+from py_plan.grounding import fluent_variables
+from py_plan.grounding import ground
+from py_plan.numeric import changed_fluents
+from py_plan.numeric import is_fluent_fact
+from py_plan.unification import unify
+
+# the number of states whose helpful actions are cached.
+HELPFUL_CACHE_SIZE = 1000
+
+
+def goal_count(state, goals):
+    """
+    Returns the number of goals that are not individually satisfied in the
+    state.
+
+    >>> goal_count([('on', 'A', 'B')], [('on', 'A', 'B'), ('on', 'B', 'C')])
+    1
+    """
+    index = build_index(state)
+    return sum(1 for g in goals if not is_functional_term(g) and
+               not match_exists([g], index))
+
+
+class GoalCountHeuristic(object):
+    """
+    The number of unsatisfied goals. This is not admissible in general, but
+    it is cheap to compute and informative when goals are achieved one at a
+    time.
+    """
+
+    def __init__(self, goals):
+        self.goals = frozenset(goals)
+
+    def __call__(self, node):
+        return goal_count(node.state, self.goals)
+
+
+class FFHeuristic(object):
+    """
+    The FF heuristic, the cost of a relaxed plan. The operators are grounded
+    once (see :mod:`py_plan.grounding`) and, for each state, a relaxed
+    planning graph is built by applying actions while ignoring their delete
+    effects and negated conditions. A relaxed plan is then extracted
+    backwards from the goals by choosing, for each (sub)goal, the first
+    action that achieved it. Unreachable goals give an estimate of infinity.
+
+    The applicable actions of the relaxed plan that add a subgoal of the
+    first layer are the helpful actions of the state (see
+    :meth:`helpful_actions`), which are likely to be good steps towards the
+    goals. The helpful actions of the most recently evaluated states are
+    cached, and actions are compared with them by :meth:`action_key`.
+
+    Goals with variables are satisfied by the first fact that matches them.
+    Fluents that the operators change can take any value in the relaxation
+    (see :mod:`py_plan.grounding`), so goals on their values are ignored.
+    This is not admissible, but it is very informative on most domains.
+    """
+
+    def __init__(self, operators, state, goals, layer_limit=None):
+        self.actions, _ = ground(operators, state, layer_limit)
+        self.fluents = frozenset(changed_fluents(operators))
+        self.goals = [g for g in goals if not is_functional_term(g) and
+                      not is_negated_term(g) and
+                      not is_fluent_fact(g, self.fluents)]
+        self.ignored = {}
+        self.helpful = OrderedDict()
+
+    def relaxed_plan(self, state):
+        """
+        Returns the relaxed plan for the state (a set of
+        :class:`GroundAction`, or None if the goals are unreachable) and the
+        set of keys of its helpful actions.
+        """
+        level = {f: 0 for f in state}
+        achiever = {}
+        remaining = self.actions
+        layer = 0
+        while not self.reached(level):
+            new_facts = {}
+            waiting = []
+            for a in remaining:
+                if not a.pos_cond.issubset(level):
+                    waiting.append(a)
+                    continue
+                for f in a.adds:
+                    if f not in level and f not in new_facts:
+                        new_facts[f] = a
+            if not new_facts:
+                return None, frozenset()
+            layer += 1
+            for f, a in new_facts.items():
+                level[f] = layer
+                achiever[f] = a
+            remaining = waiting
+
+        agenda = {}
+        for g in self.goals:
+            f = self.first_match(g, level)
+            agenda.setdefault(level[f], set()).add(f)
+
+        plan = set()
+        for i in range(layer, 0, -1):
+            for f in agenda.get(i, ()):
+                a = achiever[f]
+                if a in plan:
+                    continue
+                plan.add(a)
+                for p in a.pos_cond:
+                    if level[p] > 0:
+                        agenda.setdefault(level[p], set()).add(p)
+
+        first = agenda.get(1, set())
+        helpful = frozenset(a.key for a in self.actions
+                            if a.pos_cond.issubset(state) and
+                            not a.adds.isdisjoint(first))
+        return plan, helpful
+
+    def first_match(self, goal, level):
+        if goal in level:
+            return goal
+        matches = [f for f in level if unify(goal, f) is not None]
+        if not matches:
+            return None
+        return min(matches, key=lambda f: level[f])
+
+    def reached(self, level):
+        return all(self.first_match(g, level) is not None
+                   for g in self.goals)
+
+    def helpful_actions(self, state):
+        """
+        Returns the set of keys of the helpful actions in a state (see
+        :meth:`action_key`).
+        """
+        if state in self.helpful:
+            helpful = self.helpful.pop(state)
+        else:
+            _, helpful = self.relaxed_plan(state)
+        self.store(state, helpful)
+        return helpful
+
+    def action_key(self, operator, binding):
+        """
+        The key of an action, as in :meth:`helpful_actions`. The values of
+        changed fluents are left out, since the ground actions bind them to
+        their values in the initial state.
+        """
+        if id(operator) not in self.ignored:
+            self.ignored[id(operator)] = fluent_variables(operator,
+                                                          self.fluents)
+        return action_key(operator, binding, self.ignored[id(operator)])
+
+    def store(self, state, helpful):
+        self.helpful.pop(state, None)
+        self.helpful[state] = helpful
+        if len(self.helpful) > HELPFUL_CACHE_SIZE:
+            self.helpful.popitem(last=False)
+
+    def __call__(self, node):
+        plan, helpful = self.relaxed_plan(node.state)
+        self.store(node.state, helpful)
+        if plan is None:
+            return float('inf')
+        return sum(a.cost for a in plan)
+
+
+class CachedHeuristic(object):
+    """
+    Wraps a heuristic to cache its estimates by state, so a state that is
+    reached along several paths is only evaluated once. At most `max_size`
+    states are cached (the least recently used are dropped first), or all of
+    them if it is None. `evaluations` counts the calls to the wrapped
+    heuristic. Other attributes, such as helpful_actions, are those of the
+    wrapped heuristic.
+
+    Only heuristics that depend on the state alone should be cached; for
+    example, :class:`py_plan.landmarks.LandmarkCountHeuristic` depends on
+    the path to a node.
+
+    >>> h = CachedHeuristic(lambda node: len(node.state))
+    >>> from py_search.base import Node
+    >>> h(Node(frozenset([('on', 'A', 'B')]))), h.evaluations
+    (1, 1)
+    >>> h(Node(frozenset([('on', 'A', 'B')]))), h.evaluations
+    (1, 1)
+    """
+
+    def __init__(self, heuristic, max_size=None):
+        self.heuristic = heuristic
+        self.max_size = max_size
+        self.cache = OrderedDict()
+        self.evaluations = 0
+
+    def __getattr__(self, name):
+        if name == 'heuristic':
+            raise AttributeError(name)
+        return getattr(self.heuristic, name)
+
+    def __call__(self, node):
+        state = node.state
+        if state in self.cache:
+            value = self.cache.pop(state)
+        else:
+            value = self.heuristic(node)
+            self.evaluations += 1
+        self.cache[state] = value
+        if self.max_size is not None and len(self.cache) > self.max_size:
+            self.cache.popitem(last=False)
+        return value
+
+
+class RegressionGoalCountHeuristic(object):
+    """
+    A heuristic for backward search, the number of facts of a regressed goal
+    set (the state of a goal node) that are not individually satisfied in the
+    initial state.
+    """
+
+    def __init__(self, state):
+        self.index = build_index(state)
+
+    def __call__(self, node):
+        return sum(1 for g in node.state if not is_functional_term(g) and
+                   not match_exists([g], self.index))
@@ -0,0 +1,152 @@
+"""
+Fact landmarks and the landmark count heuristic. A landmark is a fact that
+must be true at some point on every plan. Landmarks are found by
+backchaining from the goals over the grounded operators (see
+:mod:`py_plan.grounding`): the preconditions that all of the first achievers
+of a landmark share are also landmarks, and they must be true before the
+landmark is (a greedy-necessary ordering). The first achievers of a landmark
+are the actions that add it and are reachable in the delete relaxation
+without it.
+"""
+
+from __future__ import print_function
+from __future__ import unicode_literals
+from __future__ import absolute_import
+from __future__ import division
+
+from collections import OrderedDict
+
+from py_plan.pattern_matching import contains_variable
+from py_plan.pattern_matching import is_functional_term
+from py_plan.pattern_matching import is_negated_term
+from py_plan.grounding import ground
+from py_plan.grounding import relaxed_reachable
+
+ACCEPTED_CACHE_SIZE = 100000
+
+
+class LandmarkGraph(object):
+    """
+    A set of fact landmarks and their orderings, where `orderings[l]` is the
+    set of landmarks that must be true before `l` first becomes true.
+    """
+
+    def __init__(self, landmarks, orderings, goals):
+        self.landmarks = frozenset(landmarks)
+        self.orderings = orderings
+        self.goals = frozenset(goals)
+
+    def __len__(self):
+        return len(self.landmarks)
+
+
+def find_landmarks(operators, state, goals, layer_limit=None):
+    """
+    Finds fact landmarks by backchaining from the (ground, positive) goals.
+
+    A `layer_limit` truncates grounding (see :func:`ground`), so some
+    achievers of a landmark can be missing and facts that are not landmarks
+    can be returned as landmarks. Only use it when the limit is at least the
+    number of relaxed layers of the problem, or when an inadmissible
+    approximation is acceptable.
+
+    >>> from py_plan.base import Operator
+    >>> move = Operator('move', [('at', '?x'), ('adj', '?x', '?y')],
+    ...                 [('at', '?y'), ('not', ('at', '?x'))])
+    >>> lms = find_landmarks([move], [('at', 'a'), ('adj', 'a', 'b'),
+    ...                               ('adj', 'b', 'c')], [('at', 'c')])
+    >>> sorted(l for l in lms.landmarks if l[0] == 'at')
+    [('at', 'a'), ('at', 'b'), ('at', 'c')]
+    """
+    state = frozenset(state)
+    actions, _ = ground(operators, state, layer_limit)
+
+    goals = [g for g in goals if not is_negated_term(g) and not
+             is_functional_term(g) and not contains_variable(g)]
+    landmarks = set(goals)
+    orderings = {g: set() for g in goals}
+    queue = list(goals)
+
+    while queue:
+        lm = queue.pop()
+        if lm in state:
+            continue
+
+        reachable = relaxed_reachable(state, actions, excluded=lm)
+        achievers = [a for a in actions if lm in a.adds and
+                     a.pos_cond.issubset(reachable)]
+        if not achievers:
+            continue
+
+        shared = frozenset.intersection(*[a.pos_cond for a in achievers])
+        for p in shared:
+            orderings[lm].add(p)
+            if p not in landmarks:
+                landmarks.add(p)
+                orderings[p] = set()
+                queue.append(p)
+
+    return LandmarkGraph(landmarks, orderings, goals)
+
+
+class LandmarkCountHeuristic(object):
+    """
+    The landmark count heuristic, the number of landmarks that still need to
+    be achieved: those that have not been accepted on the path to the node,
+    plus accepted ones that are required again (goals that are false and
+    landmarks that must be true before an unaccepted landmark). A landmark is
+    accepted when it is true and all of the landmarks ordered before it were
+    accepted at the parent. The accepted sets are computed incrementally
+    along the path to the node and cached for the most recently evaluated
+    `ACCEPTED_CACHE_SIZE` nodes.
+
+    This is not admissible, but it is very informative on domains like
+    logistics.
+    """
+
+    def __init__(self, operators, state, goals, layer_limit=None):
+        self.graph = find_landmarks(operators, state, goals, layer_limit)
+        # keyed by id, since nodes compare equal when their states do; the
+        # node is kept with its entry so that the id is not reused.
+        self.cache = OrderedDict()
+
+    def accepted(self, node):
+        path = []
+        previous = None
+        while node is not None:
+            if id(node) in self.cache:
+                previous = self.cache[id(node)][1]
+                break
+            path.append(node)
+            node = node.parent
+
+        orderings = self.graph.orderings
+        for node in reversed(path):
+            if previous is None:
+                accepted = frozenset(lm for lm in self.graph.landmarks
+                                     if lm in node.state)
+            else:
+                accepted = previous.union(
+                    lm for lm in self.graph.landmarks if lm not in previous
+                    and lm in node.state and
+                    orderings[lm].issubset(previous))
+            self.store(node, accepted)
+            previous = accepted
+        return previous
+
+    def store(self, node, accepted):
+        self.cache.pop(id(node), None)
+        self.cache[id(node)] = (node, accepted)
+        if len(self.cache) > ACCEPTED_CACHE_SIZE:
+            self.cache.popitem(last=False)
+
+    def __call__(self, node):
+        accepted = self.accepted(node)
+        state = node.state
+        orderings = self.graph.orderings
+
+        unaccepted = self.graph.landmarks - accepted
+        needed = set(p for lm in unaccepted for p in orderings[lm])
+        required_again = set(lm for lm in accepted if lm not in state and
+                             (lm in self.graph.goals or lm in needed))
+        return len(unaccepted) + len(required_again)
@@ -0,0 +1,284 @@
+"""
+Macro-operators learned from solved plans. A :class:`MacroLearner` counts the
+sequences of consecutive plan steps (n-grams) that apply the same operators
+with the same sharing of objects between their bindings, such as loading a
+cargo into a plane, flying the plane, and unloading the same cargo. The most
+frequent sequences are composed into :class:`MacroOperator` objects, which
+can be added to the operators of future problems; :func:`expand_plan`
+replaces the macros in a plan with the steps they stand for.
+
+Variables of different steps that were bound to the same object become the
+same macro variable. Where two facts of different steps could still become
+equal under some binding and that would change the outcome of the sequence
+(e.g., a condition of the second step and a delete effect of the first),
+the macro gets an `or_`/`ne` constraint that rules it out, so applying a
+macro always has the same effect as applying its steps. Operators with
+numeric or functional effects are not composed.
+"""
+
+from __future__ import print_function
+from __future__ import unicode_literals
+from __future__ import absolute_import
+from __future__ import division
+
+from operator import ne
+
+from py_plan.base import Operator
+from py_plan.pattern_matching import extract_strings
+from py_plan.pattern_matching import is_functional_term
+from py_plan.pattern_matching import is_negated_term
+from py_plan.total_order import or_constraints
+from py_plan.unification import is_variable
+from py_plan.unification import subst
+from py_plan.unification import unify
+
+
+class MacroOperator(Operator):
+    """
+    An operator that applies a sequence of operators. `steps` is a list of
+    (operator, variables) pairs, where variables maps the variables of the
+    operator to the variables of the macro.
+    """
+
+    def __init__(self, name, conditions, effects, cost, steps,
+                 reverse_sub=None):
+        Operator.__init__(self, name, conditions, effects, cost, reverse_sub)
+        self.steps = steps
+
+    def standardized_copy(self):
+        """
+        Returns a copy with fresh variables (see
+        :meth:`Operator.standardized_copy`), whose steps map to the fresh
+        variables, so plans found by regression can still be expanded.
+        """
+        copy = Operator.standardized_copy(self)
+        sub = copy.reverse_sub
+        steps = [(o, {v: sub.get(mv, mv) for v, mv in variables.items()})
+                 for o, variables in self.steps]
+        return MacroOperator(copy.name, copy.conditions, copy.effects,
+                             copy.cost, steps, sub)
+
+
+def operator_variables(operator):
+    return set(e for t in operator.conditions.union(operator.effects)
+               for e in extract_strings(t) if is_variable(e))
+
+
+def step_variables(operator, binding, objects, step):
+    """
+    Maps the variables of a plan step to macro variables: variables bound to
+    the same object (numbered in `objects`) share a macro variable, and
+    unbound variables get a fresh variable for the step.
+    """
+    variables = {}
+    for v in sorted(operator_variables(operator)):
+        if v in binding:
+            value = binding[v]
+            if value not in objects:
+                objects[value] = '?m%i' % len(objects)
+            variables[v] = objects[value]
+        else:
+            variables[v] = '?s%i%s' % (step, v[1:])
+    return variables
+
+
+def composable(operator):
+    return (not operator.numeric_effects and
+            not any(is_functional_term(e) for e in operator.effects))
+
+
+def distinct(p, q):
+    """
+    Returns a constraint that two facts are not equal, None if they can never
+    be equal, or False if they are always equal.
+    """
+    if p == q:
+        return False
+    match = unify(p, q, {})
+    if match is None:
+        return None
+    return or_constraints([(ne, v, match[v]) for v in sorted(match)])
+
+
+def compose(first, second):
+    """
+    Composes two operators (whose shared variables have the same names) into
+    the conditions, effects, and cost of an operator that applies both, or
+    returns None if they cannot be composed.
+    """
+    conditions = set(first.conditions)
+    constraints = set()
+
+    def forbid(p, q):
+        c = distinct(p, q)
+        if c:
+            constraints.add(c)
+
+    for c in second.conditions:
+        if is_functional_term(c):
+            conditions.add(c)
+        elif is_negated_term(c):
+            if c[1] in first.add_effects:
+                return None
+            free = second.free_vars.intersection(extract_strings(c[1]))
+            for a in first.add_effects:
+                if free and distinct(c[1], a) is not None:
+                    return None
+                forbid(c[1], a)
+            if c[1] not in first.del_effects:
+                conditions.add(c)
+        else:
+            if c in first.add_effects:
+                continue
+            if c in first.del_effects:
+                return None
+            for d in first.del_effects:
+                forbid(c, d)
+            conditions.add(c)
+
+    for a in first.add_effects:
+        for d in second.del_effects:
+            forbid(a, d)
+
+    adds = set(second.add_effects).union(
+        a for a in first.add_effects if a not in second.del_effects)
+    dels = set(first.del_effects).union(second.del_effects)
+    effects = adds.union(('not', d) for d in dels)
+
+    bound = set(e for c in conditions if not is_negated_term(c) and not
+                is_functional_term(c) for e in extract_strings(c)
+                if is_variable(e))
+    for c in constraints:
+        if not set(e for e in extract_strings(c)
+                   if is_variable(e)).issubset(bound):
+            return None
+
+    return conditions.union(constraints), effects, first.cost + second.cost
+
+
+def macro_name(steps):
+    """
+    The name of a macro, the names of its steps with their (sorted)
+    variables, so macros that apply the same operators with different
+    sharing of variables have different names.
+
+    >>> move = Operator('move', [('at', '?x'), ('road', '?x', '?y')],
+    ...                 [('at', '?y'), ('not', ('at', '?x'))])
+    >>> print(macro_name([(move, {'?x': '?m0', '?y': '?m1'}),
+    ...                   (move, {'?x': '?m1', '?y': '?m2'})]))
+    move(?m0, ?m1)+move(?m1, ?m2)
+    """
+    return "+".join("%s(%s)" % (o.name, ", ".join(variables[v] for v in
+                                                  sorted(variables)))
+                    for o, variables in steps)
+
+
+def build_macro(steps):
+    """
+    Builds a :class:`MacroOperator` from a list of (operator, variables)
+    pairs (see :func:`step_variables`), or returns None if the steps cannot
+    be composed. The macro is named by :func:`macro_name`.
+
+    >>> move = Operator('move', [('at', '?x'), ('road', '?x', '?y')],
+    ...                 [('at', '?y'), ('not', ('at', '?x'))])
+    >>> macro = build_macro([(move, {'?x': '?m0', '?y': '?m1'}),
+    ...                      (move, {'?x': '?m1', '?y': '?m2'})])
+    >>> sorted(c for c in macro.conditions if c[0] != ne)
+    [('at', '?m0'), ('road', '?m0', '?m1'), ('road', '?m1', '?m2')]
+    >>> sorted(macro.effects)
+    [('at', '?m2'), ('not', ('at', '?m0')), ('not', ('at', '?m1'))]
+    """
+    current = None
+    for o, variables in steps:
+        o = Operator(o.name, [subst(variables, c) for c in o.conditions],
+                     [subst(variables, e) for e in o.effects], o.cost)
+        if current is None:
+            current = o
+            continue
+        composed = compose(current, o)
+        if composed is None:
+            return None
+        conditions, effects, cost = composed
+        current = Operator(current.name, conditions, effects, cost)
+
+    return MacroOperator(macro_name(steps), current.conditions,
+                         current.effects, current.cost, steps)
+
+
+def expand_plan(plan):
+    """
+    Replaces each macro step of a plan, a sequence of (operator, binding)
+    pairs, with the steps of the macro.
+    """
+    expanded = []
+    for o, m in plan:
+        if not isinstance(o, MacroOperator):
+            expanded.append((o, m))
+            continue
+        for step, variables in o.steps:
+            expanded.append((step, {v: m[mv] for v, mv in variables.items()
+                                    if mv in m}))
+    return expanded
+
+
+class MacroLearner(object):
+    """
+    Learns macro-operators from solved plans (see :meth:`observe`). The
+    sequences of `min_length` to `max_length` steps that occur at least
+    `min_count` times are ranked by the number of steps they would have saved
+    (their count times their length minus one) and the best `max_macros` are
+    returned by :meth:`macros`.
+    """
+
+    def __init__(self, max_macros=5, min_length=2, max_length=3,
+                 min_count=2):
+        self.max_macros = max_macros
+        self.min_length = min_length
+        self.max_length = max_length
+        self.min_count = min_count
+        self.counts = {}
+        self.examples = {}
+        self.built = {}
+
+    def observe(self, plan):
+        """
+        Counts the operator sequences of a plan (macros in the plan are
+        expanded first).
+        """
+        plan = expand_plan(plan)
+        for i in range(len(plan)):
+            for n in range(self.min_length, self.max_length + 1):
+                window = plan[i:i + n]
+                if len(window) < n or not all(composable(o)
+                                              for o, _ in window):
+                    break
+                objects = {}
+                steps = [(o, step_variables(o, m, objects, j))
+                         for j, (o, m) in enumerate(window)]
+                key = tuple((id(o), tuple(sorted(variables.items())))
+                            for o, variables in steps)
+                self.counts[key] = self.counts.get(key, 0) + 1
+                self.examples.setdefault(key, steps)
+
+    def macros(self):
+        """
+        Returns the most useful macros learned so far.
+        """
+        ranked = sorted((k for k in self.counts
+                         if self.counts[k] >= self.min_count),
+                        key=lambda k: -self.counts[k] * (len(k) - 1))
+        macros = []
+        for key in ranked:
+            if len(macros) >= self.max_macros:
+                break
+            if key not in self.built:
+                self.built[key] = build_macro(self.examples[key])
+            if self.built[key] is not None:
+                macros.append(self.built[key])
+        return macros
+
+    def operators(self, operators):
+        """
+        Returns the operators extended with the learned macros.
+        """
+        return list(operators) + self.macros()
@@ -0,0 +1,197 @@
+"""
+Multi-query matching, which matches the conditions of all operators against
+a state at once. The conditions of each operator are turned into a sequence
+of steps (joins with positive terms and filters for negated and functional
+terms) and the sequences are merged into a trie, so the sub-patterns that
+operators have in common (e.g., `('on', '?b', '?x')`, `('block', '?b')`, and
+`('not', ('on', '?other', '?b'))` in blocksworld) are evaluated only once per
+state.
+
+Variables are canonicalized by order of first occurrence within a sequence,
+so steps are shared regardless of what the operators call their variables.
+Steps are evaluated with the relational engine in :mod:`py_plan.relational`.
+"""
+
+from __future__ import print_function
+from __future__ import unicode_literals
+from __future__ import absolute_import
+from __future__ import division
+
+from py_plan.pattern_matching import is_functional_term
+from py_plan.pattern_matching import is_negated_term
+from py_plan.pattern_matching import contains_variable
+from py_plan.relational import RelationalIndex
+from py_plan.relational import Table
+from py_plan.relational import is_relational_term
+from py_plan.relational import term_vars
+from py_plan.relational import join
+from py_plan.relational import filter_table
+from py_plan.relational import join_match
+from py_plan.unification import is_variable
+
+
+def canonicalize(term, mapping):
+    """
+    Renames the variables of a term using mapping, assigning the next
+    canonical name to each new variable (in order of occurrence). The mapping
+    is updated in place.
+
+    >>> mapping = {'?b': '?v0'}
+    >>> canonicalize(('on', '?b', '?x'), mapping)
+    ('on', '?v0', '?v1')
+    >>> mapping['?x']
+    '?v1'
+    """
+    if is_variable(term):
+        if term not in mapping:
+            mapping[term] = '?v%i' % len(mapping)
+        return mapping[term]
+    if isinstance(term, tuple):
+        return tuple(canonicalize(e, mapping) for e in term)
+    return term
+
+
+class MatchNode(object):
+    """
+    A node in the trie of steps. Each child edge is a canonical step and
+    `operators` holds the operators whose steps end at this node, along with
+    a mapping from their variables to the canonical variables.
+    """
+
+    def __init__(self, step=None):
+        self.step = step
+        self.children = []
+        self.operators = []
+
+    def child(self, step):
+        for c in self.children:
+            if c.step == step:
+                return c
+        return None
+
+    def size(self):
+        return 1 + sum(c.size() for c in self.children)
+
+
+class MultiQueryMatcher(object):
+    """
+    Matches the conditions of a set of operators against states, sharing the
+    evaluation of common steps. Operators whose conditions cannot be
+    evaluated as joins are matched individually with :func:`join_match`.
+
+    >>> from py_plan.base import Operator
+    >>> a = Operator('a', [('on', '?x', '?y'), ('block', '?x')], [])
+    >>> b = Operator('b', [('on', '?p', '?q'), ('block', '?q')], [])
+    >>> matcher = MultiQueryMatcher([a, b])
+    >>> matcher.root.size()
+    4
+    >>> sorted((o.name, sorted(m.items())) for o, m in
+    ...        matcher.match([('on', 'A', 'B'), ('block', 'A')]))
+    [('a', [('?x', 'A'), ('?y', 'B')])]
+    """
+
+    def __init__(self, operators):
+        self.root = MatchNode()
+        self.unshared = []
+
+        for o in operators:
+            positive = [t for t in o.conditions if not is_negated_term(t) and
+                        not is_functional_term(t)]
+            if not all(is_relational_term(t) for t in positive):
+                self.unshared.append(o)
+                continue
+
+            determined = set(v for t in positive for v in term_vars(t))
+            if any(not term_vars(t).issubset(determined)
+                   for t in o.conditions
+                   if is_functional_term(t) and not is_negated_term(t)):
+                raise Exception("Functionals cannot have existentially "
+                                "quantified variables.")
+            filters = [(t, term_vars(t[1]).intersection(determined)
+                        if is_negated_term(t) else term_vars(t))
+                       for t in o.conditions if is_negated_term(t) or
+                       is_functional_term(t)]
+            self.insert(o, positive, filters)
+
+    def insert(self, operator, positive, filters):
+        """
+        Adds the steps of an operator to the trie. Filters are applied as
+        soon as their variables are bound and, at each node, a step that
+        already exists in the trie is preferred to a new one.
+        """
+        node = self.root
+        mapping = {}
+        bound = set()
+        remaining = list(positive)
+        filters = list(filters)
+
+        while remaining or filters:
+            ready = [t for t, vs in filters if vs.issubset(bound)]
+
+            if ready:
+                candidates = ready
+            else:
+                candidates = remaining
+
+            # prefer existing steps, then the term with the most bound
+            # arguments.
+            def score(t):
+                step = canonicalize(t, dict(mapping))
+                shared = node.child(step) is not None
+                n_bound = 0
+                if t in remaining and isinstance(t, tuple):
+                    n_bound = sum(1 for a in t[1:] if not is_variable(a) or
+                                  a in bound)
+                return (not shared, -n_bound, repr(step))
+
+            term = min(candidates, key=score)
+            if ready:
+                filters = [(t, vs) for t, vs in filters if t is not term]
+            else:
+                remaining.remove(term)
+                bound.update(term_vars(term))
+
+            step = canonicalize(term, mapping)
+            child = node.child(step)
+            if child is None:
+                child = MatchNode(step)
+                node.children.append(child)
+            node = child
+
+        node.operators.append((operator, {v: mapping[v] for v in mapping if
+                                          v in term_vars(tuple(positive))}))
+
+    def match(self, state, index=None):
+        """
+        Yields (operator, binding) pairs for every operator whose conditions
+        match the state.
+        """
+        if index is None:
+            index = RelationalIndex(state)
+
+        for o, m in self._match(self.root, Table([], [()]), index):
+            yield o, m
+
+        for o in self.unshared:
+            for m in join_match(o.conditions, index):
+                yield o, m
+
+    def _match(self, node, table, index):
+        for o, mapping in node.operators:
+            for row in table.rows:
+                b = table.binding(row)
+                yield o, {v: b[mapping[v]] for v in mapping}
+
+        for child in node.children:
+            step = child.step
+            if is_negated_term(step) or is_functional_term(step):
+                result = filter_table(table, [step], index)
+            elif not isinstance(step, tuple) or not contains_variable(step):
+                result = table if step in index.facts else Table(
+                    table.variables, [])
+            else:
+                result = join(table, step, index)
+
+            if result.rows:
+                for o, m in self._match(child, result, index):
+                    yield o, m
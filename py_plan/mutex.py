@@ -0,0 +1,180 @@
+"""
+Mutex analysis with h^2 reachability. Over the grounded operators (see
+:mod:`py_plan.grounding`), it computes the pairs of facts that can be true
+together in some reachable state, taking delete effects into account. Two
+reachable facts that are not such a pair are mutually exclusive (e.g., a
+block `on` two different things). Negated conditions are ignored, which can
+only make more pairs reachable, so every mutex is sound.
+
+Regressed states that contain a mutex pair can never be reached and can be
+discarded by backward search. Fluents that the operators change can take
+any value (see :mod:`py_plan.grounding`), so facts about their values are
+never mutex.
+"""
+
+from __future__ import print_function
+from __future__ import unicode_literals
+from __future__ import absolute_import
+from __future__ import division
+
+from itertools import combinations
+
+from py_plan.pattern_matching import build_index
+from py_plan.pattern_matching import contains_variable
+from py_plan.pattern_matching import index_key
+from py_plan.pattern_matching import is_functional_term
+from py_plan.pattern_matching import is_negated_term
+from py_plan.pattern_matching import term_variables
+from py_plan.grounding import ground
+from py_plan.numeric import changed_fluents
+from py_plan.numeric import is_fluent_fact
+from py_plan.unification import execute_functions
+from py_plan.unification import subst
+from py_plan.unification import unify
+
+
+def pair(p, q):
+    return frozenset((p, q))
+
+
+def h2_reachable(state, actions):
+    """
+    Returns the reachable facts and the reachable pairs of facts (as
+    frozensets) under the h^2 relaxation.
+    """
+    atoms = set(state)
+    pairs = set(pair(p, q) for p, q in combinations(atoms, 2))
+
+    def pair_reachable(p, q):
+        return p == q or pair(p, q) in pairs
+
+    changed = True
+    while changed:
+        changed = False
+        for a in actions:
+            pre = a.pos_cond
+            if not pre.issubset(atoms):
+                continue
+            if not all(pair(p, q) in pairs for p, q in combinations(pre, 2)):
+                continue
+
+            for p in a.adds:
+                if p not in atoms:
+                    atoms.add(p)
+                    changed = True
+
+            for p, q in combinations(a.adds, 2):
+                if pair(p, q) not in pairs:
+                    pairs.add(pair(p, q))
+                    changed = True
+
+            for q in list(atoms):
+                if q in a.dels or q in a.adds:
+                    continue
+                if not all(pair_reachable(q, r) for r in pre):
+                    continue
+                for p in a.adds:
+                    if pair(p, q) not in pairs:
+                        pairs.add(pair(p, q))
+                        changed = True
+
+    return atoms, pairs
+
+
+class Mutexes(object):
+    """
+    The h^2 mutexes of a problem. A set of facts is inconsistent if it
+    contains a mutex pair: two ground facts that are mutex, or a pair with
+    variables (and, if both have variables, a variable in common) that is
+    mutex under every grounding to reachable facts.
+
+    >>> from py_plan.base import Operator
+    >>> drive = Operator('drive', [('at', '?x'), ('road', '?x', '?y')],
+    ...                  [('at', '?y'), ('not', ('at', '?x'))])
+    >>> m = Mutexes([drive], [('at', 'a'), ('road', 'a', 'b')])
+    >>> m.mutex(('at', 'a'), ('at', 'b'))
+    True
+    >>> m.inconsistent([('at', 'b'), ('road', 'a', 'b')])
+    False
+    """
+
+    def __init__(self, operators, state, layer_limit=None):
+        actions, _ = ground(operators, state, layer_limit)
+        self.atoms, self.pairs = h2_reachable(state, actions)
+        self.index = build_index(self.atoms)
+        self.fluents = changed_fluents(operators)
+
+    def mutex(self, p, q):
+        """
+        Checks if two ground facts are mutex (unreachable facts are mutex
+        with every other fact).
+        """
+        if p == q:
+            return False
+        if p not in self.atoms or q not in self.atoms:
+            return True
+        return pair(p, q) not in self.pairs
+
+    def candidates(self, fact):
+        return self.index.get(index_key(fact), [])
+
+    def lifted_mutex(self, p, q, constraints=()):
+        """
+        Checks if two facts, which may contain variables, are mutex under
+        every grounding to reachable facts that does not violate one of the
+        (functional) constraints.
+        """
+        for g in self.candidates(p):
+            sub = unify(p, g, {})
+            if sub is None:
+                continue
+            bq = subst(sub, q)
+            for h in self.candidates(bq):
+                full = unify(bq, h, dict(sub))
+                if full is None or self.mutex(g, h):
+                    continue
+                if not violates(constraints, full):
+                    return False
+        return True
+
+    def inconsistent(self, facts):
+        """
+        Checks if a set of facts (e.g., a regressed state) contains a mutex
+        pair. Functional terms are used as constraints on the groundings of
+        facts with variables, and negated terms and the values of changed
+        fluents are ignored.
+        """
+        constraints = [f for f in facts if is_functional_term(f) and not
+                       is_negated_term(f)]
+        facts = [f for f in facts if not is_negated_term(f) and not
+                 is_functional_term(f) and
+                 not is_fluent_fact(f, self.fluents)]
+        for p, q in combinations(facts, 2):
+            lifted_p = contains_variable(p)
+            lifted_q = contains_variable(q)
+            if not lifted_p and not lifted_q:
+                if self.mutex(p, q):
+                    return True
+            elif ((not lifted_p or not lifted_q or shares_variable(p, q))
+                  and self.lifted_mutex(p, q, constraints)):
+                return True
+        return False
+
+
+def shares_variable(p, q):
+    return bool(term_variables(p).intersection(term_variables(q)))
+
+
+def violates(constraints, sub):
+    """
+    Checks if some constraint whose variables are all bound by sub evaluates
+    to False.
+    """
+    for c in constraints:
+        if term_variables(c).issubset(sub):
+            try:
+                if execute_functions(c, sub) is False:
+                    return True
+            except TypeError:
+                continue
+    return False
@@ -0,0 +1,345 @@
+"""
+Support for numeric fluents. An operator can have numeric effects of the
+form `('increase', F, expr)`, `('decrease', F, expr)`, or `('assign', F,
+expr)`, where F is a fluent term, such as `('Money',)` or `('fuel', '?p')`,
+and expr is a number, a variable, or a functional term. The value of a fluent
+is stored in the state as a single fact, F with the value appended (e.g.,
+`('Money', 30)`), so numeric preconditions are ordinary conditions, such as
+`('Money', '?m')` and `(ge, '?m', '?c')`.
+
+This module also provides an interval relaxation of the numeric effects,
+which is used to prune states from which numeric goals cannot be reached.
+"""
+
+from __future__ import print_function
+from __future__ import unicode_literals
+from __future__ import absolute_import
+from __future__ import division
+
+from numbers import Number
+from operator import add
+from operator import eq
+from operator import ge
+from operator import gt
+from operator import le
+from operator import lt
+from operator import ne
+from operator import sub
+
+from py_plan.pattern_matching import contains_variable
+from py_plan.pattern_matching import is_functional_term
+from py_plan.pattern_matching import is_negated_term
+from py_plan.unification import execute_functions
+from py_plan.unification import is_variable
+from py_plan.unification import subst
+
+NUMERIC_EFFECTS = ('increase', 'decrease', 'assign')
+
+INF = float('inf')
+
+
+def is_numeric_effect(effect):
+    """
+    Checks if an effect is a numeric effect. The fluent must be a tuple term,
+    so a fact such as `('increase', 'a', 'b')` is an ordinary effect.
+
+    >>> is_numeric_effect(('decrease', ('Money',), '?c'))
+    True
+    >>> is_numeric_effect(('increase', 'a', 'b'))
+    False
+    >>> is_numeric_effect(('Own', '?b'))
+    False
+    """
+    return (isinstance(effect, tuple) and len(effect) == 3 and
+            effect[0] in NUMERIC_EFFECTS and isinstance(effect[1], tuple) and
+            len(effect[1]) > 0 and not callable(effect[1][0]))
+
+
+def is_number(value):
+    return isinstance(value, Number) and not isinstance(value, bool)
+
+
+def fluent_key(fluent):
+    """
+    The key of a fluent term, its head and arity.
+    """
+    return (fluent[0], len(fluent) - 1)
+
+
+def is_computed_value(fact):
+    """
+    Checks if a fact computes its (last) value with a function, like the
+    effect `('Money', (add, '?m', 10))`.
+
+    >>> is_computed_value(('Money', (add, '?m', 10)))
+    True
+    >>> is_computed_value(('Money', '?m'))
+    False
+    """
+    return (isinstance(fact, tuple) and len(fact) > 1 and
+            not callable(fact[0]) and is_functional_term(fact[-1]))
+
+
+def changed_fluents(operators):
+    """
+    Returns the keys of the fluents whose values the operators change, with
+    numeric effects or with add effects that compute the new value.
+
+    >>> from py_plan.base import Operator
+    >>> work = Operator('work', [('Money', '?m')],
+    ...                 [('not', ('Money', '?m')),
+    ...                  ('Money', (add, '?m', 10))])
+    >>> changed_fluents([work])
+    {('Money', 0)}
+    """
+    keys = set()
+    for o in operators:
+        keys.update(fluent_key(f) for _, f, _ in o.numeric_effects)
+        keys.update(fluent_key(e[:-1]) for e in o.add_effects
+                    if is_computed_value(e))
+    return keys
+
+
+def is_fluent_fact(fact, keys):
+    """
+    Checks if a fact stores the value of a fluent with one of the keys.
+    """
+    return (isinstance(fact, tuple) and len(fact) > 1 and
+            not callable(fact[0]) and fluent_key(fact[:-1]) in keys)
+
+
+def fluent_value(state, fluent):
+    """
+    Returns the value of a ground fluent in a state, or None if it has no
+    value.
+
+    >>> fluent_value([('Money', 30), ('Own', 'book1')], ('Money',))
+    30
+    """
+    for fact in state:
+        if (isinstance(fact, tuple) and len(fact) == len(fluent) + 1 and
+                fact[:-1] == fluent):
+            return fact[-1]
+    return None
+
+
+def refers_to_fluents(facts, operator):
+    """
+    Checks if any of the facts (or negated facts) refers to a fluent that the
+    numeric effects of the operator change.
+    """
+    keys = set(fluent_key(f) for _, f, _ in operator.numeric_effects)
+    for fact in facts:
+        if is_negated_term(fact):
+            fact = fact[1]
+        if (isinstance(fact, tuple) and len(fact) > 1 and
+                fluent_key(fact[:-1]) in keys):
+            return True
+    return False
+
+
+def apply_numeric_effects(state, new_state, effects, match):
+    """
+    Applies numeric effects, under the provided binding, to new_state. The
+    effects are evaluated with the fluent values of state (the state before
+    the operator was applied).
+
+    >>> state = frozenset([('Money', 30)])
+    >>> sorted(apply_numeric_effects(state, state,
+    ...                              [('decrease', ('Money',), '?c')],
+    ...                              {'?c': 10}))
+    [('Money', 20)]
+    """
+    for kind, fluent, expr in effects:
+        fluent = subst(match, fluent)
+        amount = execute_functions(expr, match)
+        old = fluent_value(state, fluent)
+
+        if kind == 'assign':
+            value = amount
+        elif old is None:
+            raise ValueError("Fluent %s has no value to %s." %
+                             (fluent, kind))
+        elif kind == 'increase':
+            value = old + amount
+        else:
+            value = old - amount
+
+        current = fluent_value(new_state, fluent)
+        if current is not None:
+            new_state = new_state.difference([fluent + (current,)])
+        new_state = new_state.union([fluent + (value,)])
+
+    return new_state
+
+
+class Interval(object):
+    """
+    A closed interval of numbers, which may be unbounded.
+    """
+
+    def __init__(self, lo=-INF, hi=INF):
+        self.lo = lo
+        self.hi = hi
+
+    def __add__(self, other):
+        return Interval(self.lo + other.lo, self.hi + other.hi)
+
+    def __sub__(self, other):
+        return Interval(self.lo - other.hi, self.hi - other.lo)
+
+    def __repr__(self):
+        return "Interval(%s, %s)" % (self.lo, self.hi)
+
+
+def possibly(op, a, b):
+    """
+    Checks if a comparison can hold for some values in two intervals.
+
+    >>> possibly(ge, Interval(-INF, 30), Interval(40, 40))
+    False
+    >>> possibly(ge, Interval(20, INF), Interval(40, 40))
+    True
+    """
+    if op == ge:
+        return a.hi >= b.lo
+    if op == gt:
+        return a.hi > b.lo
+    if op == le:
+        return a.lo <= b.hi
+    if op == lt:
+        return a.lo < b.hi
+    if op == eq:
+        return a.lo <= b.hi and b.lo <= a.hi
+    if op == ne:
+        return not (a.lo == a.hi == b.lo == b.hi)
+    return True
+
+
+class NumericReachability(object):
+    """
+    An interval relaxation of the numeric effects of a set of operators. For
+    each fluent, it determines the range of changes a single operator can
+    make, where the amounts come from constants or from the values of static
+    facts in the initial state (facts that no operator adds or deletes). A
+    fluent that can never increase can never exceed its current value, and
+    one that can never decrease can never fall below it. A fluent whose value
+    fact is added or deleted by an ordinary effect (e.g., `('Money', (add,
+    '?m', 10))`) can take any value.
+
+    Calling it on a state returns False if some numeric goal (a goal fluent
+    value or a comparison over goal fluents) cannot be reached from the
+    state, and True otherwise.
+    """
+
+    def __init__(self, operators, state, goals):
+        self.goals = list(goals)
+        changing = set()
+        for o in operators:
+            for e in o.add_effects.union(o.del_effects):
+                if isinstance(e, tuple) and len(e) > 0:
+                    changing.add((e[0], len(e) - 1))
+            for _, fluent, _ in o.numeric_effects:
+                changing.add((fluent[0], len(fluent)))
+
+        self.changes = {}
+        for o in operators:
+            for kind, fluent, expr in o.numeric_effects:
+                change = self.amount(o, expr, state, changing)
+                if kind == 'decrease':
+                    change = Interval(-change.hi, -change.lo)
+                elif kind == 'assign':
+                    change = Interval()
+                key = fluent_key(fluent)
+                if key in self.changes:
+                    prev = self.changes[key]
+                    change = Interval(min(prev.lo, change.lo),
+                                      max(prev.hi, change.hi))
+                self.changes[key] = change
+
+        # ordinary effects can set a fluent to any value (and an effect with
+        # a variable predicate could set any fluent).
+        self.unbounded = False
+        for o in operators:
+            for e in o.add_effects.union(o.del_effects):
+                if not isinstance(e, tuple) or len(e) < 2:
+                    continue
+                if is_variable(e[0]):
+                    self.unbounded = True
+                self.changes[fluent_key(e[:-1])] = Interval()
+
+    def amount(self, operator, expr, state, changing):
+        """
+        The interval of values an effect amount can take.
+        """
+        if is_number(expr):
+            return Interval(expr, expr)
+        if not is_variable(expr):
+            return Interval()
+
+        values = []
+        for c in operator.pos_cond:
+            if (not isinstance(c, tuple) or is_functional_term(c) or
+                    expr not in c[1:]):
+                continue
+            if (c[0], len(c) - 1) in changing or is_variable(c[0]):
+                continue
+            pos = c.index(expr)
+            values.extend(f[pos] for f in state if isinstance(f, tuple) and
+                          len(f) == len(c) and f[0] == c[0] and
+                          is_number(f[pos]))
+            if values:
+                return Interval(min(values), max(values))
+        return Interval()
+
+    def reachable_values(self, state, fluent):
+        """
+        The interval of values a ground fluent could reach from a state.
+        """
+        value = fluent_value(state, fluent)
+        if not is_number(value):
+            return Interval()
+        change = self.changes.get(fluent_key(fluent), Interval(0, 0))
+        return Interval(value if change.lo >= 0 else -INF,
+                        value if change.hi <= 0 else INF)
+
+    def evaluate(self, term, bindings):
+        if is_number(term):
+            return Interval(term, term)
+        if is_variable(term):
+            return bindings.get(term)
+        if (isinstance(term, tuple) and len(term) == 3 and
+                term[0] in (add, sub)):
+            a = self.evaluate(term[1], bindings)
+            b = self.evaluate(term[2], bindings)
+            if a is None or b is None:
+                return None
+            return a + b if term[0] == add else a - b
+        return None
+
+    def __call__(self, state):
+        if self.unbounded:
+            return True
+        bindings = {}
+        for g in self.goals:
+            if (not isinstance(g, tuple) or is_negated_term(g) or
+                    is_functional_term(g) or len(g) < 2 or
+                    fluent_key(g[:-1]) not in self.changes or
+                    contains_variable(g[:-1])):
+                continue
+            reach = self.reachable_values(state, g[:-1])
+            if is_variable(g[-1]):
+                bindings[g[-1]] = reach
+            elif is_number(g[-1]) and not possibly(eq, reach,
+                                                   Interval(g[-1], g[-1])):
+                return False
+
+        for g in self.goals:
+            if (isinstance(g, tuple) and len(g) == 3 and
+                    g[0] in (eq, ne, lt, le, gt, ge)):
+                a = self.evaluate(g[1], bindings)
+                b = self.evaluate(g[2], bindings)
+                if a is not None and b is not None and not possibly(g[0], a,
+                                                                    b):
+                    return False
+        return True
@@ -0,0 +1,198 @@
+"""
+A hash-distributed best-first search (HDA*) for
+:class:`StateSpacePlanningProblem` that runs on several worker processes. Every
+state is owned by one worker, which is chosen by hashing the state. Each worker
+keeps its own open and closed lists; the successors it generates are sent to
+the queue of their owner.
+
+Termination is detected with a shared count of outstanding work (messages in
+transit plus nodes on open lists). The count is incremented before a node is
+sent and decremented once a node has been discarded or expanded, so it only
+reaches zero when every open list is empty and no messages are in transit.
+Nodes whose value is not better than the cost of the best plan found so far
+are discarded, so, if `problem.node_value` is the cost plus an admissible
+heuristic, the returned plan is optimal.
+
+If a worker raises an exception (e.g., in an operator function), it is sent
+to the parent, which terminates the other workers and raises it.
+"""
+
+from __future__ import print_function
+from __future__ import unicode_literals
+from __future__ import absolute_import
+from __future__ import division
+
+import multiprocessing
+import pickle
+from heapq import heappush
+from heapq import heappop
+from zlib import crc32
+
+try:
+    from queue import Empty
+except ImportError:
+    from Queue import Empty
+
+from py_search.base import Node
+from py_search.base import SolutionNode
+
+from py_plan.total_order import apply_operator
+
+
+def state_owner(state, num_workers):
+    """
+    Returns the worker that owns a state. This uses a hash that is stable
+    across processes (unlike the builtin hash, which is salted per process
+    when processes are spawned).
+    """
+    key = '\n'.join(sorted(repr(f) for f in state)).encode('utf-8')
+    return crc32(key) % num_workers
+
+
+def _send(inboxes, work, state, g, path):
+    with work.get_lock():
+        work.value += 1
+    inboxes[state_owner(state, len(inboxes))].put((state, g, path))
+
+
+def _done(work):
+    with work.get_lock():
+        work.value -= 1
+
+
+def _worker(i, problem, inboxes, results, work, incumbent):
+    try:
+        _search(i, problem, inboxes, results, work, incumbent)
+    except Exception as e:
+        try:
+            pickle.dumps(e)
+        except Exception:
+            e = RuntimeError(repr(e))
+        results.put(('error', e, None))
+
+
+def _search(i, problem, inboxes, results, work, incumbent):
+    inbox = inboxes[i]
+    operators = problem.operators
+    op_index = {id(o): j for j, o in enumerate(operators)}
+
+    fringe = []
+    closed = {}
+    count = 0
+
+    while True:
+        messages = []
+        try:
+            while True:
+                messages.append(inbox.get_nowait())
+        except Empty:
+            pass
+
+        if not messages and not fringe:
+            if work.value == 0:
+                return
+            try:
+                messages.append(inbox.get(timeout=0.01))
+            except Empty:
+                continue
+
+        for state, g, path in messages:
+            if state in closed and closed[state] <= g:
+                _done(work)
+                continue
+            value = problem.node_value(Node(state, None, None, g))
+            if value >= incumbent.value:
+                _done(work)
+                continue
+            closed[state] = g
+            count += 1
+            heappush(fringe, (value, g, count, state, path))
+
+        if not fringe:
+            continue
+
+        value, g, _, state, path = heappop(fringe)
+        if closed[state] < g or value >= incumbent.value:
+            _done(work)
+            continue
+
+        node = Node(state, None, None, g)
+        if problem.goal_test(node, problem.goal):
+            with incumbent.get_lock():
+                if g < incumbent.value:
+                    incumbent.value = g
+                    results.put(('plan', g, path))
+            _done(work)
+            continue
+
+        for s in problem.successors(node):
+            o, m = s.action
+            step = (op_index[id(o)], tuple(sorted(m.items())))
+            _send(inboxes, work, s.state, s.cost(), path + (step,))
+        _done(work)
+
+
+def hash_distributed_search(problem, num_workers=None):
+    """
+    Searches for an optimal plan using hash-distributed best-first search
+    (HDA*) across `num_workers` processes (defaults to the number of CPUs).
+    Nodes are ordered by `problem.node_value`, which should be the cost plus
+    an admissible heuristic (by default it is just the cost). Like the
+    py_search searches, this returns an iterator of solutions; it yields at
+    most one, optimal, solution.
+
+    :param problem: The problem to solve.
+    :type problem: :class:`StateSpacePlanningProblem`
+    :param num_workers: The number of worker processes.
+    :type num_workers: int
+    """
+    if num_workers is None:
+        num_workers = multiprocessing.cpu_count()
+
+    inboxes = [multiprocessing.Queue() for _ in range(num_workers)]
+    results = multiprocessing.Queue()
+    work = multiprocessing.Value('l', 0)
+    incumbent = multiprocessing.Value('d', float('inf'))
+
+    _send(inboxes, work, problem.initial.state, problem.initial.cost(), ())
+
+    workers = [multiprocessing.Process(target=_worker,
+                                       args=(i, problem, inboxes, results,
+                                             work, incumbent))
+               for i in range(num_workers)]
+    for w in workers:
+        w.daemon = True
+        w.start()
+
+    best = None
+    error = None
+    try:
+        while any(w.is_alive() for w in workers) or not results.empty():
+            try:
+                kind, value, info = results.get(timeout=0.05)
+            except Empty:
+                continue
+            if kind == 'error':
+                error = value
+                break
+            if best is None or value < best[0]:
+                best = (value, info)
+    finally:
+        for w in workers:
+            if w.is_alive():
+                w.terminate()
+            w.join()
+
+    if error is not None:
+        raise error
+
+    if best is None:
+        return
+
+    node = problem.initial
+    for j, items in best[1]:
+        o = problem.operators[j]
+        m = dict(items)
+        node = Node(apply_operator(node.state, o, m), node, (o, m),
+                    node.cost() + o.cost)
+    yield SolutionNode(node, problem.goal)
@@ -0,0 +1,253 @@
+"""
+Pattern database heuristics for :class:`StateSpacePlanningProblem`. A pattern
+selects a subset of the facts (by predicate and, optionally, by object) and
+the problem is projected onto it: each ground action (see
+:mod:`py_plan.grounding`) keeps only the conditions and effects that are in
+the pattern, and negated conditions are dropped. The abstract state space is
+explored forward from the projected initial state and the exact cost to
+reach the projected goals is computed for every abstract state by a backward
+Dijkstra search. Since the projection only removes constraints, these costs
+are admissible estimates for the original problem.
+
+A table maps 64-bit hashes of abstract states to goal distances. It is
+stored as two sorted arrays, so a lookup is a binary search over a handful
+of array reads. Tables can be saved to a binary file and loaded with a
+memory map, which lets several processes share one copy.
+"""
+
+from __future__ import print_function
+from __future__ import unicode_literals
+from __future__ import absolute_import
+from __future__ import division
+
+import mmap
+import struct
+import hashlib
+from array import array
+from bisect import bisect_left
+from collections import deque
+from heapq import heappush
+from heapq import heappop
+
+from py_plan.pattern_matching import contains_variable
+from py_plan.pattern_matching import is_functional_term
+from py_plan.pattern_matching import is_negated_term
+from py_plan.grounding import ground
+
+_HEADER = struct.Struct('<4sQ')
+_MAGIC = b'PDB1'
+_KEY = struct.Struct('<Q')
+_VALUE = struct.Struct('<d')
+
+
+def state_hash(facts):
+    """
+    A 64-bit hash of a set of facts that is stable across processes.
+    """
+    data = '\n'.join(sorted(repr(f) for f in facts)).encode('utf-8')
+    return _KEY.unpack(hashlib.md5(data).digest()[:_KEY.size])[0]
+
+
+class DistanceTable(object):
+    """
+    An in-memory table from abstract state hashes to goal distances, stored
+    as a sorted array of keys and a parallel array of distances.
+    """
+
+    def __init__(self, distances):
+        keys = sorted(distances)
+        self.keys = array(str('Q'), keys)
+        self.values = array(str('d'), [distances[k] for k in keys])
+
+    def __len__(self):
+        return len(self.keys)
+
+    def get(self, key):
+        i = bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            return self.values[i]
+        return None
+
+    def save(self, path):
+        """
+        Writes the table to a binary file: a header with the number of
+        entries, the sorted keys (uint64), and the distances (float64).
+        """
+        with open(path, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, len(self.keys)))
+            f.write(struct.pack(str('<%iQ' % len(self.keys)), *self.keys))
+            f.write(struct.pack(str('<%id' % len(self.values)),
+                                *self.values))
+
+
+class MappedDistanceTable(object):
+    """
+    A table saved by :meth:`DistanceTable.save`, read through a memory map.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.size = _HEADER.unpack_from(self.mm, 0)
+        if magic != _MAGIC:
+            raise ValueError("%s is not a pattern database file." % path)
+        self.keys_offset = _HEADER.size
+        self.values_offset = self.keys_offset + _KEY.size * self.size
+
+    def __len__(self):
+        return self.size
+
+    def key(self, i):
+        return _KEY.unpack_from(self.mm, self.keys_offset +
+                                _KEY.size * i)[0]
+
+    def get(self, key):
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.size and self.key(lo) == key:
+            return _VALUE.unpack_from(self.mm, self.values_offset +
+                                      _VALUE.size * lo)[0]
+        return None
+
+    def close(self):
+        self.mm.close()
+        self.file.close()
+
+
+class PatternDatabase(object):
+    """
+    A pattern database for a planning problem. The pattern is a set of
+    predicates; if objects are provided, then only facts that mention one of
+    them are in the pattern. Exploration stops after `max_states` abstract
+    states, in which case unexplored abstract states have a distance of 0,
+    and explored ones get their distance to the nearest goal or unexplored
+    state.
+
+    If `path` is provided, then the table is loaded from that file (see
+    :meth:`save`) instead of being computed.
+
+    >>> from py_plan.base import Operator
+    >>> drive = Operator('drive', [('at', '?x'), ('road', '?x', '?y')],
+    ...                  [('at', '?y'), ('not', ('at', '?x'))])
+    >>> pdb = PatternDatabase([drive], [('at', 'a'), ('road', 'a', 'b'),
+    ...                                 ('road', 'b', 'c')], [('at', 'c')],
+    ...                       ['at'])
+    >>> pdb.h([('at', 'a')]), pdb.h([('at', 'b')]), pdb.h([('at', 'c')])
+    (2.0, 1.0, 0.0)
+    """
+
+    def __init__(self, operators, state, goals, predicates, objects=None,
+                 max_states=100000, path=None):
+        self.predicates = frozenset(predicates)
+        self.objects = None if objects is None else frozenset(objects)
+
+        if path is not None:
+            self.table = MappedDistanceTable(path)
+            return
+
+        actions, _ = ground(operators, state)
+        abstract = []
+        for a in actions:
+            pre = frozenset(f for f in a.pos_cond if self.in_pattern(f))
+            adds = frozenset(f for f in a.adds if self.in_pattern(f))
+            dels = frozenset(f for f in a.dels if self.in_pattern(f))
+            if adds or dels:
+                abstract.append((pre, dels, adds, a.cost))
+
+        goals = frozenset(g for g in goals if not is_negated_term(g) and not
+                          is_functional_term(g) and not
+                          contains_variable(g) and self.in_pattern(g))
+
+        self.table = DistanceTable(self.distances(self.project(state),
+                                                  goals, abstract,
+                                                  max_states))
+
+    def in_pattern(self, fact):
+        if not isinstance(fact, tuple) or len(fact) == 0:
+            return fact in self.predicates
+        if fact[0] not in self.predicates:
+            return False
+        return self.objects is None or any(a in self.objects
+                                           for a in fact[1:])
+
+    def project(self, state):
+        return frozenset(f for f in state if self.in_pattern(f))
+
+    def distances(self, initial, goals, actions, max_states):
+        """
+        Explores the abstract states reachable from the initial one and
+        returns the goal distance of each (by state hash). States with an
+        edge to a state that was not explored (because of `max_states`) are
+        given a distance of 0, like the unexplored states, so the distances
+        stay admissible.
+        """
+        parents = {initial: []}
+        cut = set()
+        queue = deque([initial])
+        while queue:
+            s = queue.popleft()
+            for pre, dels, adds, cost in actions:
+                if not pre.issubset(s):
+                    continue
+                t = s.difference(dels).union(adds)
+                if t == s:
+                    continue
+                if t not in parents:
+                    if len(parents) >= max_states:
+                        cut.add(s)
+                        continue
+                    parents[t] = []
+                    queue.append(t)
+                parents[t].append((s, cost))
+
+        dist = {}
+        fringe = []
+        count = 0
+        for s in parents:
+            if goals.issubset(s) or s in cut:
+                dist[s] = 0
+                heappush(fringe, (0, count, s))
+                count += 1
+
+        while fringe:
+            d, _, s = heappop(fringe)
+            if d > dist[s]:
+                continue
+            for p, cost in parents[s]:
+                if d + cost < dist.get(p, float('inf')):
+                    dist[p] = d + cost
+                    count += 1
+                    heappush(fringe, (d + cost, count, p))
+
+        return {state_hash(s): dist.get(s, float('inf')) for s in parents}
+
+    def h(self, state):
+        """
+        The goal distance of the projection of a state (0 if unknown).
+        """
+        d = self.table.get(state_hash(self.project(state)))
+        return 0 if d is None else d
+
+    def save(self, path):
+        self.table.save(path)
+
+    def __len__(self):
+        return len(self.table)
+
+
+class PDBHeuristic(object):
+    """
+    The maximum of the estimates of several pattern databases, which is
+    admissible when each database is.
+    """
+
+    def __init__(self, databases):
+        self.databases = list(databases)
+
+    def __call__(self, node):
+        return max([db.h(node.state) for db in self.databases] + [0])
@@ -3,9 +3,12 @@ from __future__ import unicode_literals
 from __future__ import absolute_import
 from __future__ import division
 
+from collections import OrderedDict
+from itertools import islice
 from itertools import product
 from random import random
 from random import shuffle
+from threading import Lock
 
 # from concept_formation.utils import isNumber
 from py_search.base import Problem
@@ -17,13 +20,32 @@ from py_plan.unification import unify
 from py_plan.unification import execute_functions
 
 
+PATTERN_CACHE_SIZE = 1000
+_pattern_cache = OrderedDict()
+_variables_cache = {}
+# guards both caches, so patterns can be matched from several threads.
+_cache_lock = Lock()
+
+
+class FactIndex(dict):
+    """
+    The dict index returned by :func:`build_index`. The `ground` flag records
+    whether all of the indexed facts are ground, in which case a term whose
+    variables are distinct matches some fact exactly when its index key is in
+    the index.
+    """
+    ground = True
+
+
 def build_index(facts):
     """
     Given an iterator of facts returns a dict index.
     """
-    index = {}
+    index = FactIndex()
     for fact in facts:
         key = index_key(fact)
+        if index.ground and contains_variable(fact):
+            index.ground = False
         # print('KEY', key)
         for k in get_variablized_keys(key):
             # print('VB KEY', k)
@@ -172,12 +194,77 @@ def is_negated_term(term):
     return isinstance(term, tuple) and len(term) > 0 and term[0] == 'not'
 
 
+def term_variables(term):
+    """
+    Returns the set of variables in a (pattern) term. The result is cached;
+    the cache is not an LRU, it is simply emptied when it reaches
+    PATTERN_CACHE_SIZE terms, which keeps lookups (a dict get) cheap.
+
+    >>> sorted(term_variables(('not', ('on', '?x', '?y'))))
+    ['?x', '?y']
+    """
+    with _cache_lock:
+        variables = _variables_cache.get(term)
+    if variables is not None:
+        return variables
+
+    variables = frozenset(e for e in extract_strings(term)
+                          if is_variable(e))
+    with _cache_lock:
+        if len(_variables_cache) >= PATTERN_CACHE_SIZE:
+            _variables_cache.clear()
+        _variables_cache[term] = variables
+    return variables
+
+
+def has_distinct_vars(term):
+    """
+    Checks that no variable occurs more than once in a term.
+
+    >>> has_distinct_vars(('on', '?x', '?y'))
+    True
+    >>> has_distinct_vars(('on', '?x', '?x'))
+    False
+    """
+    variables = [e for e in extract_strings(term) if is_variable(e)]
+    return len(variables) == len(set(variables))
+
+
+def has_match(term, index, sub=None):
+    """
+    Checks if some fact in the index unifies with the term, treating the
+    term's unbound variables as existentially quantified. This is how negated
+    terms are checked.
+
+    When the index only holds ground facts and the term is ground, or its
+    variables are distinct, then every fact under the term's key matches, so
+    this is a single key lookup. Otherwise, the term is unified with the
+    facts under its key.
+
+    >>> index = build_index([('on', 'A', 'B')])
+    >>> has_match(('on', 'A', 'B'), index)
+    True
+    >>> has_match(('on', '?x', 'C'), index)
+    False
+    >>> has_match(('on', '?x', '?x'), index)
+    False
+    """
+    key = index_key(term)
+    if key not in index:
+        return False
+    if getattr(index, 'ground', False) and has_distinct_vars(term):
+        return True
+    if sub is None:
+        sub = {}
+    return any(unify(term, fact, sub) is not None for fact in index[key])
+
+
 def update_fun_pattern(fun_pattern, sub, index):
     new_fun_pattern = []
     bound_set = set(sub)
 
     for term in fun_pattern:
-        args = set(e for e in extract_strings(term) if is_variable(e))
+        args = term_variables(term)
         if args.issubset(bound_set):
             bterm = subst(sub, term)
 
@@ -225,7 +312,7 @@ def update_neg_pattern(neg_pattern, sub, index, free_vars=None):
     bound_set = set(sub).union(free_vars)
 
     for term in neg_pattern:
-        args = set(e for e in extract_strings(term) if is_variable(e))
+        args = term_variables(term)
         if args.issubset(bound_set):
             bterm = execute_functions(subst(sub, term))
 
@@ -234,12 +321,8 @@ def update_neg_pattern(neg_pattern, sub, index, free_vars=None):
             if bterm is True:
                 return None
 
-            key = index_key(bterm)
-
-            if key in index and len(index[key]) > 0:
-                for fact in index[key]:
-                    if unify(bterm, fact, sub, index):
-                        return None
+            if has_match(bterm, index, dict(sub)):
+                return None
         else:
             new_neg_pattern.append(term)
 
@@ -268,14 +351,8 @@ def update_terms(terms, f_terms, sub, index, partial=False):
                             continue
 
                 if is_negated_term(bterm):
-                    key = index_key(bterm[1])
-
-                    if key in index and len(index[key]) > 0:
-                        for fact in index[key]:
-                            if unify(bterm[1], fact, sub, index):
-                                # if partial:
-                                #     continue
-                                return None
+                    if has_match(bterm[1], index, sub):
+                        return None
                 else:
                     key = index_key(bterm)
 
@@ -358,19 +435,30 @@ def identify_necessary_vars(term, determined_vars, neg=False, fun=False):
     return set()
 
 
-def pattern_match(pattern, index, substitution=None, partial=False):
+def analyze_pattern(pattern):
     """
-    Find substitutions that yield a match of the pattern against the provided
-    index. If no match is found then it returns None.
+    Returns the static analysis of a pattern used by :func:`pattern_match`:
+    the terms grouped by the variables that must be bound before they can be
+    checked, and the set of functional terms. Patterns (e.g., operator
+    conditions) are matched many times, so the analysis is kept in a bounded
+    LRU cache keyed by the frozen pattern, which is guarded by a lock so it
+    can be shared by threads. The cached groupings are never modified by
+    matching.
+
+    >>> terms, f_terms = analyze_pattern([('on', '?x', '?y'),
+    ...                                   ('not', ('on', '?z', '?x'))])
+    >>> sorted(len(necessary) for necessary in terms)
+    [0, 1]
     """
-    if substitution is None:
-        substitution = {}
-
-    sub = frozenset(substitution.items())
+    key = frozenset(pattern)
+    with _cache_lock:
+        if key in _pattern_cache:
+            analysis = _pattern_cache.pop(key)
+            _pattern_cache[key] = analysis
+            return analysis
 
     determined_vars = set(v for t in pattern
                           for v in identify_determined_vars(t))
-    # print('DETERMINED', determined_vars)
 
     terms = {}
     for t in pattern:
@@ -379,9 +467,28 @@ def pattern_match(pattern, index, substitution=None, partial=False):
             terms[necessary] = []
         terms[necessary].append(t)
 
-    # print(terms)
+    f_terms = frozenset(t for t in pattern if is_functional_term(t))
+
+    analysis = (terms, f_terms)
+    with _cache_lock:
+        _pattern_cache[key] = analysis
+        if len(_pattern_cache) > PATTERN_CACHE_SIZE:
+            _pattern_cache.popitem(last=False)
+    return analysis
+
+
+def _match_states(pattern, index, substitution=None, partial=False):
+    """
+    Yields the states of the solution nodes of the pattern matching search,
+    i.e., frozensets of (variable, value) pairs, without converting them to
+    dicts.
+    """
+    if substitution is None:
+        substitution = {}
+
+    sub = frozenset(substitution.items())
 
-    f_terms = set(t for t in pattern if is_functional_term(t))
+    terms, f_terms = analyze_pattern(pattern)
 
     terms = update_terms(terms, f_terms, substitution, index, partial)
 
@@ -394,7 +501,72 @@ def pattern_match(pattern, index, substitution=None, partial=False):
         problem = PatternMatchingProblem(sub, extra=(terms, f_terms, index))
 
     for solution in depth_first_search(problem):
-        yield dict(solution.state_node.state)
+        yield solution.state_node.state
+
+
+def pattern_match(pattern, index, substitution=None, partial=False,
+                  limit=None, project=None):
+    """
+    Find substitutions that yield a match of the pattern against the provided
+    index. If no match is found then it returns None.
+
+    Matches are generated lazily, so the search stops when the caller stops
+    iterating. If `limit` is provided, then at most that many matches are
+    yielded. If `project` is a sequence of variables, then each match is
+    yielded as a tuple of the values of those variables (None if unbound)
+    rather than a dict.
+
+    >>> index = build_index([('on', 'A', 'B'), ('on', 'B', 'C')])
+    >>> sorted(pattern_match([('on', '?x', '?y')], index, project=['?x']))
+    [('A',), ('B',)]
+    >>> len(list(pattern_match([('on', '?x', '?y')], index, limit=1)))
+    1
+    """
+    states = _match_states(pattern, index, substitution, partial)
+    if limit is not None:
+        states = islice(states, limit)
+
+    if project is None:
+        for state in states:
+            yield dict(state)
+    else:
+        project = tuple(project)
+        wanted = set(project)
+        for state in states:
+            values = {}
+            for var, val in state:
+                if var in wanted:
+                    values[var] = val
+            yield tuple(values.get(v) for v in project)
+
+
+def match_exists(pattern, index, substitution=None, partial=False):
+    """
+    Checks if the pattern has any match against the index, stopping the search
+    at the first one.
+
+    >>> index = build_index([('on', 'A', 'B')])
+    >>> match_exists([('on', '?x', 'B')], index)
+    True
+    >>> match_exists([('on', '?x', '?x')], index)
+    False
+    """
+    for _ in _match_states(pattern, index, substitution, partial):
+        return True
+    return False
+
+
+def count_matches(pattern, index, substitution=None, partial=False):
+    """
+    Returns the number of matches of the pattern against the index, without
+    building a dict for each match.
+
+    >>> index = build_index([('on', 'A', 'B'), ('on', 'B', 'C')])
+    >>> count_matches([('on', '?x', '?y')], index)
+    2
+    """
+    return sum(1 for _ in _match_states(pattern, index, substitution,
+                                        partial))
 
 
 class PatternMatchingProblem(Problem):
@@ -0,0 +1,261 @@
+"""
+A cache of plans for :class:`StateSpacePlanningProblem` that is keyed by a
+canonical form of the problem, so a plan that was found for one problem can be
+reused for any problem that is the same up to a renaming of its objects.
+
+Objects are the constants that appear as arguments in the state and goals, but
+not in the operators. They are renamed canonically using color refinement:
+each object is colored by the predicates and argument positions it appears
+in, and the colors are repeatedly refined using the colors of the objects it
+is related to. Objects are then numbered by color. Refinement does not
+separate every pair of non-symmetric objects, so two problems that are the
+same up to renaming can occasionally produce different keys (a cache miss),
+but plans are always validated against the current state and goals before
+they are returned.
+"""
+
+from __future__ import print_function
+from __future__ import unicode_literals
+from __future__ import absolute_import
+from __future__ import division
+
+import shelve
+from collections import OrderedDict
+from hashlib import sha1
+
+from py_search.uninformed import breadth_first_search
+
+from py_plan.pattern_matching import build_index
+from py_plan.pattern_matching import extract_strings
+from py_plan.pattern_matching import match_exists
+from py_plan.unification import is_variable
+from py_plan.total_order import execute_plan
+
+
+def function_name(function):
+    """
+    The module and qualified name of a function, which identifies it across
+    processes (unlike its repr, which contains its address). Raises a
+    ValueError for callables without a stable name, such as lambdas,
+    partials, and functions defined inside other functions.
+
+    >>> from operator import ne
+    >>> function_name(ne) in ('operator.ne', '_operator.ne')
+    True
+    """
+    module = getattr(function, '__module__', None)
+    name = getattr(function, '__qualname__',
+                   getattr(function, '__name__', None))
+    if module is None or name is None or '<' in name:
+        raise ValueError("Operators in a plan cache require functions with "
+                         "stable names, not %r." % (function,))
+    return '%s.%s' % (module, name)
+
+
+def term_signature(term):
+    """
+    The repr of a term, with functions replaced by their names (see
+    :func:`function_name`).
+    """
+    if isinstance(term, tuple):
+        return '(%s)' % ', '.join(term_signature(e) for e in term)
+    if callable(term):
+        return function_name(term)
+    return repr(term)
+
+
+def operator_signature(operators):
+    """
+    A string that identifies a list of operators.
+    """
+    return repr([(o.name, sorted(term_signature(c) for c in o.conditions),
+                  sorted(term_signature(e) for e in o.effects), o.cost)
+                 for o in operators])
+
+
+def fact_args(fact):
+    if isinstance(fact, tuple) and len(fact) > 0:
+        return list(enumerate(fact[1:]))
+    return []
+
+
+def canonical_objects(state, goals, operators):
+    """
+    Returns a dict that maps each object in the state and goals to a canonical
+    name. Constants that appear in the operators (and numbers) are not
+    objects, so they are never renamed.
+
+    >>> m1 = canonical_objects([('on', 'X', 'Y')], [('clear', 'X')], [])
+    >>> m2 = canonical_objects([('on', 'B', 'A')], [('clear', 'B')], [])
+    >>> m1['X'] == m2['B'] and m1['Y'] == m2['A']
+    True
+    """
+    constants = set(e for o in operators
+                    for t in o.conditions.union(o.effects)
+                    for e in extract_strings(t) if not is_variable(e))
+
+    facts = [('state', f) for f in state] + [('goal', f) for f in goals]
+    objects = set(a for _, f in facts for _, a in fact_args(f)
+                  if isinstance(a, str) and not is_variable(a) and
+                  a not in constants)
+
+    colors = {o: '' for o in objects}
+    num_colors = 1
+    for _ in range(len(objects) + 1):
+        signatures = {o: [] for o in objects}
+        for kind, f in facts:
+            colored = tuple(colors.get(a, a) for _, a in fact_args(f))
+            for pos, a in fact_args(f):
+                if a in objects:
+                    signatures[a].append(repr((kind, f[0], pos, colored)))
+        new_colors = {o: sha1(repr((colors[o], sorted(signatures[o])))
+                              .encode('utf-8')).hexdigest()
+                      for o in objects}
+        colors = new_colors
+        if len(set(colors.values())) == num_colors:
+            break
+        num_colors = len(set(colors.values()))
+
+    ordered = sorted(objects, key=lambda o: (colors[o], o))
+    return {o: '#o%i' % i for i, o in enumerate(ordered)}
+
+
+def rename_objects(term, mapping):
+    """
+    Renames the objects in a term (or binding value).
+    """
+    if isinstance(term, tuple):
+        return tuple(rename_objects(e, mapping) for e in term)
+    if isinstance(term, str) and term in mapping:
+        return mapping[term]
+    return term
+
+
+def problem_key(state, goals, operators, mapping):
+    """
+    The cache key for a problem, given its canonical object mapping.
+    """
+    state = sorted(repr(rename_objects(f, mapping)) for f in state)
+    goals = sorted(repr(rename_objects(f, mapping)) for f in goals)
+    key = repr((state, goals, operator_signature(operators)))
+    return sha1(key.encode('utf-8')).hexdigest()
+
+
+class PlanCache(object):
+    """
+    Stores plans keyed by a canonical form of (operators, state, goals). The
+    most recently used `max_size` plans are kept in memory. If a `path` is
+    provided, then plans are also stored in (and retrieved from) a shelve
+    database on disk, so they persist across processes.
+
+    Plans are sequences of (operator, binding) pairs, i.e., the path of a
+    solution found with forward search.
+    """
+
+    def __init__(self, max_size=1000, path=None):
+        self.max_size = max_size
+        self.memory = OrderedDict()
+        self.store = None
+        if path is not None:
+            self.store = shelve.open(path)
+        self.hits = 0
+        self.misses = 0
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+
+    def _remember(self, key, entry):
+        self.memory.pop(key, None)
+        self.memory[key] = entry
+        while len(self.memory) > self.max_size:
+            self.memory.popitem(last=False)
+
+    def _forget(self, key):
+        self.memory.pop(key, None)
+        if self.store is not None and key in self.store:
+            del self.store[key]
+
+    def get(self, state, goals, operators):
+        """
+        Returns a cached plan for the problem, re-mapped to its objects, or
+        None if there is no cached plan that is valid for the problem.
+        """
+        mapping = canonical_objects(state, goals, operators)
+        key = problem_key(state, goals, operators, mapping)
+
+        entry = self.memory.get(key)
+        if entry is None and self.store is not None and key in self.store:
+            entry = self.store[key]
+        if entry is None:
+            self.misses += 1
+            return None
+
+        inverse = {mapping[o]: o for o in mapping}
+        plan = tuple((operators[i], {v: rename_objects(val, inverse)
+                                     for v, val in binding})
+                     for i, binding in entry)
+
+        final = execute_plan(state, plan)
+        if final is None or not match_exists(goals, build_index(final)):
+            self._forget(key)
+            self.misses += 1
+            return None
+
+        self._remember(key, entry)
+        self.hits += 1
+        return plan
+
+    def put(self, state, goals, operators, plan):
+        """
+        Adds a plan for the problem to the cache. Plans that use operators
+        that are not in the list of operators (e.g., the renamed operators of
+        regression search) are not cached.
+        """
+        index = {id(o): i for i, o in enumerate(operators)}
+        if any(id(o) not in index for o, _ in plan):
+            return
+
+        mapping = canonical_objects(state, goals, operators)
+        key = problem_key(state, goals, operators, mapping)
+        entry = tuple((index[id(o)],
+                       tuple(sorted((v, rename_objects(m[v], mapping))
+                                    for v in m)))
+                      for o, m in plan)
+
+        self._remember(key, entry)
+        if self.store is not None:
+            self.store[key] = entry
+
+    def plan(self, problem, search=breadth_first_search):
+        """
+        Returns a plan for a :class:`StateSpacePlanningProblem`, from the
+        cache if possible, otherwise by searching (and caching the result).
+        Problems whose operators use functions without stable names (see
+        :func:`function_name`) are solved without the cache. Returns None if
+        no plan is found.
+        """
+        state = problem.initial.state
+        goals = problem.goal.state
+        operators = problem.operators
+
+        try:
+            operator_signature(operators)
+            cached = True
+        except ValueError:
+            cached = False
+
+        if cached:
+            plan = self.get(state, goals, operators)
+            if plan is not None:
+                return plan
+
+        solution = next(search(problem), None)
+        if solution is None:
+            return None
+
+        plan = solution.path()
+        if cached:
+            self.put(state, goals, operators, plan)
+        return plan
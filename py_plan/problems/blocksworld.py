@@ -96,12 +96,17 @@ if __name__ == "__main__":
     p = StateSpacePlanningProblem(start, goal, [move_from_table,
                                                 move_to_table])
 
+    # the same problem, pruned with partial-order reduction.
+    por = StateSpacePlanningProblem(start, goal, [move_from_table,
+                                                  move_to_table],
+                                    stubborn_sets=True)
+
     # print(next(best_first_search(p)).state)
 
-    compare_searches([p], [progression,
-                           regression, bidirectional,
-                           # iterative_deepening_search
-    ])
+    compare_searches([p, por], [progression,
+                                regression, bidirectional,
+                                # iterative_deepening_search
+                                ])
 
     print(next(progression(p)).path())
     print(next(regression(p)).path())
@@ -1,5 +1,4 @@
 from operator import ge
-from operator import sub
 from functools import partial
 
 from py_search.utils import compare_searches
@@ -14,8 +13,7 @@ buy = Operator('buy',
                 ('Money', '?m'),
                 (ge, '?m', '?c')],
                [('Own', '?b'),
-                ('not', ('Money', '?m')),
-                ('Money', (sub, '?m', '?c'))])
+                ('decrease', ('Money',), '?c')])
 
 start = [('Money', 30)]
 for i in range(30):
@@ -25,6 +23,7 @@ for i in range(30):
 goal = [('Own', 'book2')]
 
 p = StateSpacePlanningProblem(start, goal, [buy])
+rp = StateSpacePlanningProblem(start, goal, [buy], relevance=True)
 
 
 def progression(problem):
@@ -38,7 +37,7 @@ def bidirectional(problem):
     return partial(depth_first_search, forward=True, backward=True)(problem)
 
 
-compare_searches([p], [progression,
-                       regression,
-                       bidirectional
-                       ])
+compare_searches([p, rp], [progression,
+                           regression,
+                           bidirectional
+                           ])
@@ -51,4 +51,6 @@ compare_searches([p], [progression, regression, bidirectional])
 
 
 print(next(progression(p)).path())
-print(next(regression(p)).path())
+# regression cannot achieve the negated precondition of puton, because
+# predecessors only regresses through add effects.
+print(next(bidirectional(p)).path())
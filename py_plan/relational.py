@@ -0,0 +1,313 @@
+"""
+A set-at-a-time alternative to :func:`pattern_match` for matching operator
+conditions against a state. Each predicate of the state is stored as a
+relation (a table of argument tuples) and the positive conditions of a pattern
+are evaluated as a sequence of hash joins over a table of variable bindings.
+Negated conditions are evaluated as anti-joins and functional conditions
+(e.g., `(ne, '?x', '?y')`) as filters, each as soon as its variables are
+bound.
+
+Patterns that cannot be expressed as joins over flat relations (e.g., terms
+with a variable predicate or nested terms that contain variables) are matched
+with :func:`pattern_match` instead.
+"""
+
+from __future__ import print_function
+from __future__ import unicode_literals
+from __future__ import absolute_import
+from __future__ import division
+
+from py_plan.pattern_matching import build_index
+from py_plan.pattern_matching import pattern_match
+from py_plan.pattern_matching import match_exists
+from py_plan.pattern_matching import is_functional_term
+from py_plan.pattern_matching import is_negated_term
+from py_plan.pattern_matching import contains_variable
+from py_plan.batch import batch_evaluate
+from py_plan.batch import BOOLEAN_OPS
+from py_plan.unification import execute_functions
+from py_plan.unification import is_variable
+from py_plan.unification import subst
+
+
+class RelationalIndex(object):
+    """
+    Stores facts as relations, keyed by (predicate, arity), with hash indices
+    over argument positions that are built on demand.
+
+    >>> index = RelationalIndex([('on', 'A', 'B'), ('on', 'B', 'C')])
+    >>> sorted(index.relation('on', 2))
+    [('A', 'B'), ('B', 'C')]
+    >>> index.lookup('on', 2, (1,))[('C',)]
+    [('B', 'C')]
+    """
+
+    def __init__(self, facts):
+        self.facts = frozenset(facts)
+        self.relations = {}
+        self.indices = {}
+        self.fact_index = None
+
+        for fact in self.facts:
+            if isinstance(fact, tuple) and len(fact) > 0:
+                key = (fact[0], len(fact) - 1)
+                if key not in self.relations:
+                    self.relations[key] = []
+                self.relations[key].append(fact[1:])
+
+    def relation(self, head, arity):
+        return self.relations.get((head, arity), [])
+
+    def lookup(self, head, arity, positions):
+        """
+        Returns a dict that maps the values at the given argument positions
+        to the rows with those values.
+        """
+        key = (head, arity, positions)
+        if key not in self.indices:
+            table = {}
+            for row in self.relation(head, arity):
+                k = tuple(row[p] for p in positions)
+                if k not in table:
+                    table[k] = []
+                table[k].append(row)
+            self.indices[key] = table
+        return self.indices[key]
+
+    def dict_index(self):
+        """
+        The :func:`build_index` index of the facts, used when a pattern
+        cannot be matched with joins.
+        """
+        if self.fact_index is None:
+            self.fact_index = build_index(self.facts)
+        return self.fact_index
+
+
+def is_relational_term(term):
+    """
+    Checks if a (non-negated, non-functional) term can be evaluated as a join,
+    i.e., it has a constant predicate and its arguments are variables or
+    ground values.
+    """
+    if not isinstance(term, tuple):
+        return not is_variable(term)
+    if len(term) == 0 or is_variable(term[0]) or isinstance(term[0], tuple):
+        return False
+    return all(is_variable(a) or not contains_variable(a) for a in term[1:])
+
+
+def term_vars(term):
+    if is_variable(term):
+        return set([term])
+    if isinstance(term, tuple):
+        return set(v for e in term for v in term_vars(e))
+    return set()
+
+
+class Table(object):
+    """
+    A table of variable bindings, with one column per variable.
+    """
+
+    def __init__(self, variables, rows):
+        self.variables = list(variables)
+        self.columns = {v: i for i, v in enumerate(self.variables)}
+        self.rows = rows
+
+    def binding(self, row):
+        return {v: row[i] for i, v in enumerate(self.variables)}
+
+
+def join(table, term, index):
+    """
+    Hash joins a table of bindings with the relation of a positive term.
+    """
+    args = term[1:]
+    rel = index.relation(term[0], len(args))
+
+    key_pos = []
+    key_src = []
+    new_vars = []
+    new_pos = []
+    same = []
+    for p, a in enumerate(args):
+        if is_variable(a) and a in table.columns:
+            key_pos.append(p)
+            key_src.append((True, table.columns[a]))
+        elif is_variable(a) and a in new_vars:
+            same.append((new_pos[new_vars.index(a)], p))
+        elif is_variable(a):
+            new_vars.append(a)
+            new_pos.append(p)
+        else:
+            key_pos.append(p)
+            key_src.append((False, a))
+
+    if key_pos:
+        lookup = index.lookup(term[0], len(args), tuple(key_pos))
+    else:
+        lookup = {(): rel}
+
+    rows = []
+    for row in table.rows:
+        k = tuple(row[i] if is_col else i for is_col, i in key_src)
+        for match in lookup.get(k, ()):
+            if any(match[p1] != match[p2] for p1, p2 in same):
+                continue
+            rows.append(row + tuple(match[p] for p in new_pos))
+
+    return Table(table.variables + new_vars, rows)
+
+
+def fact_exists(term, index):
+    """
+    Checks if any fact matches a term whose unbound variables are
+    existentially quantified.
+    """
+    if not contains_variable(term):
+        return term in index.facts
+    if not is_relational_term(term):
+        return match_exists([term], index.dict_index())
+
+    args = term[1:]
+    key_pos = tuple(p for p, a in enumerate(args) if not is_variable(a))
+    k = tuple(args[p] for p in key_pos)
+    rows = index.lookup(term[0], len(args), key_pos).get(k, ())
+
+    var_pos = {}
+    for p, a in enumerate(args):
+        if is_variable(a):
+            var_pos.setdefault(a, []).append(p)
+    repeated = [ps for ps in var_pos.values() if len(ps) > 1]
+    if not repeated:
+        return len(rows) > 0
+
+    return any(all(row[p] == row[ps[0]] for ps in repeated for p in ps)
+               for row in rows)
+
+
+def holds(term, binding, index):
+    """
+    Evaluates a negated or functional term under a full binding of its
+    (non-existential) variables. This mirrors the semantics of
+    :func:`pattern_match`.
+    """
+    if is_negated_term(term):
+        inner = subst(binding, term[1])
+        if is_functional_term(inner):
+            inner = execute_functions(inner)
+            if inner is True or inner is False:
+                return not inner
+        return not fact_exists(inner, index)
+
+    result = execute_functions(subst(binding, term))
+    if result is True or result is False:
+        return result
+    return result in index.facts
+
+
+def filter_table(table, terms, index):
+    """
+    Keeps the rows of a table that satisfy all of the terms. Boolean
+    constraints (e.g., `(ne, '?x', '?y')`) are evaluated over whole columns
+    with :func:`batch_evaluate` and the remaining terms row by row.
+    """
+    rows = table.rows
+    batched = [t for t in terms if is_batch_constraint(t)]
+    if batched and len(rows) > 1:
+        for t in batched:
+            columns = {v: [row[table.columns[v]] for row in rows]
+                       for v in term_vars(t)}
+            mask = batch_evaluate(t, columns, len(rows))
+            rows = [row for row, keep in zip(rows, mask) if keep]
+        terms = [t for t in terms if t not in batched]
+
+    rows = [row for row in rows
+            if all(holds(t, table.binding(row), index) for t in terms)]
+    return Table(table.variables, rows)
+
+
+def is_batch_constraint(term):
+    """
+    Checks if a term is a boolean constraint that can be evaluated with
+    :func:`batch_evaluate`.
+    """
+    return (isinstance(term, tuple) and len(term) > 0 and
+            not is_negated_term(term) and term[0] in BOOLEAN_OPS)
+
+
+def join_match(pattern, index, substitution=None):
+    """
+    Find substitutions that yield a match of the pattern against a
+    :class:`RelationalIndex`, using hash joins. Yields the same substitutions
+    as :func:`pattern_match`.
+
+    >>> from operator import ne
+    >>> index = RelationalIndex([('on', 'A', 'B'), ('on', 'B', 'C'),
+    ...                          ('block', 'A'), ('block', 'B')])
+    >>> [m for m in join_match([('on', '?x', '?y'), ('block', '?y'),
+    ...                         ('not', ('on', '?z', '?x')),
+    ...                         (ne, '?x', '?y')], index)]
+    [{'?x': 'A', '?y': 'B'}]
+    """
+    if substitution is None:
+        substitution = {}
+
+    pattern = [subst(substitution, t) for t in pattern]
+    positive = [t for t in pattern if not is_negated_term(t) and not
+                is_functional_term(t)]
+
+    if not all(is_relational_term(t) for t in positive):
+        for m in pattern_match(pattern, index.dict_index(), {}):
+            m.update(substitution)
+            yield m
+        return
+
+    determined = set(v for t in positive for v in term_vars(t))
+    if any(not term_vars(t).issubset(determined) for t in pattern
+           if is_functional_term(t) and not is_negated_term(t)):
+        raise Exception("Functionals cannot have existentially "
+                        "quantified variables.")
+
+    filters = [(t, term_vars(t[1]).intersection(determined)
+                if is_negated_term(t) else term_vars(t))
+               for t in pattern if is_negated_term(t) or
+               is_functional_term(t)]
+
+    table = Table([], [()])
+    remaining = list(positive)
+
+    while True:
+        bound = set(table.variables)
+        ready = [t for t, vs in filters if vs.issubset(bound)]
+        if ready:
+            filters = [(t, vs) for t, vs in filters if not
+                       vs.issubset(bound)]
+            table = filter_table(table, ready, index)
+
+        if not table.rows or not remaining:
+            break
+
+        # join next the term with the most bound arguments, breaking ties in
+        # favor of the smallest relation.
+        def score(t):
+            if not isinstance(t, tuple):
+                return (0, 0)
+            n_bound = sum(1 for a in t[1:] if not is_variable(a) or
+                          a in bound)
+            return (-n_bound, len(index.relation(t[0], len(t) - 1)))
+
+        term = min(remaining, key=score)
+        remaining.remove(term)
+
+        if not isinstance(term, tuple) or not contains_variable(term):
+            if term not in index.facts:
+                return
+            continue
+        table = join(table, term, index)
+
+    for row in table.rows:
+        m = table.binding(row)
+        m.update(substitution)
+        yield m
@@ -0,0 +1,253 @@
+"""
+Backward relevance analysis. Starting from the goals, the grounded operators
+(see :mod:`py_plan.grounding`) are marked relevant if they can help achieve a
+relevant fact: they add a relevant fact, delete a fact that must be false
+(one that appears in a relevant negated condition), or change a relevant
+numeric fluent in a useful direction. The conditions of relevant actions are
+relevant in turn.
+
+A numeric fluent is needed in a direction when a condition compares its value
+with `ge`/`gt` (it should go up) or with `le`/`lt` (it should go down); any
+other use of the value needs both directions. For example, buying a book
+decreases `Money`, which cannot help satisfy `(ge, '?m', '?c')`, so buying
+books that the goals do not need is irrelevant.
+
+A fluent is numeric if operators change it with numeric effects or with add
+effects that compute its value (see :func:`py_plan.numeric.changed_fluents`);
+grounding lets such fluents take any value, so the actions that could become
+applicable after they change are not missed.
+
+The reduced problem keeps only the operators with a relevant grounding and
+the facts of the initial state that are relevant (or that a negated condition
+of a kept operator refers to). Every plan for the reduced problem is a plan
+for the original problem, and if the original problem has a plan, then so
+does the reduced one.
+"""
+
+from __future__ import print_function
+from __future__ import unicode_literals
+from __future__ import absolute_import
+from __future__ import division
+
+from operator import ge
+from operator import gt
+from operator import le
+from operator import lt
+
+from py_plan.pattern_matching import contains_variable
+from py_plan.pattern_matching import is_functional_term
+from py_plan.pattern_matching import is_negated_term
+from py_plan.pattern_matching import term_variables
+from py_plan.grounding import ground
+from py_plan.numeric import changed_fluents
+from py_plan.numeric import fluent_key
+from py_plan.numeric import is_computed_value
+from py_plan.numeric import is_number
+from py_plan.unification import execute_functions
+from py_plan.unification import is_variable
+from py_plan.unification import unify
+
+UP = 'up'
+DOWN = 'down'
+
+# the direction a comparison needs its first (left) argument to change in.
+LEFT_DIRECTIONS = {ge: UP, gt: UP, le: DOWN, lt: DOWN}
+
+
+def fact_fluent_key(fact):
+    """
+    The key of the fluent a fact could store the value of.
+    """
+    return fluent_key(fact[:-1])
+
+
+def fluent_directions(conditions, keys):
+    """
+    Returns a dict from the keys of the (numeric) fluents that the conditions
+    refer to, out of the provided keys, to the set of directions in which a
+    change of the fluent could help satisfy the conditions.
+
+    >>> fluent_directions([('Money', '?m'), (ge, '?m', '?c')],
+    ...                   set([('Money', 0)]))
+    {('Money', 0): {'up'}}
+    """
+    directions = {}
+    functional = [c for c in conditions if is_functional_term(c)]
+    for c in conditions:
+        if is_negated_term(c):
+            c = c[1]
+        if (not isinstance(c, tuple) or len(c) < 2 or
+                is_functional_term(c) or fact_fluent_key(c) not in keys):
+            continue
+
+        needed = directions.setdefault(fact_fluent_key(c), set())
+        value = c[-1]
+        if not is_variable(value):
+            needed.update((UP, DOWN))
+            continue
+
+        for f in functional:
+            if value not in term_variables(f):
+                continue
+            if f[0] in LEFT_DIRECTIONS and len(f) == 3 and f[1] == value:
+                needed.add(LEFT_DIRECTIONS[f[0]])
+            elif f[0] in LEFT_DIRECTIONS and len(f) == 3 and f[2] == value:
+                needed.add(UP if LEFT_DIRECTIONS[f[0]] == DOWN else DOWN)
+            else:
+                needed.update((UP, DOWN))
+
+        if all(value not in term_variables(f) for f in functional):
+            needed.update((UP, DOWN))
+
+    return directions
+
+
+def numeric_changes(action):
+    """
+    Yields the fluent key and the direction of each numeric effect of a
+    ground action. Assignments, and add effects that compute the value of a
+    fluent, change it in both directions.
+    """
+    for e in action.operator.add_effects:
+        if is_computed_value(e):
+            yield fact_fluent_key(e), UP
+            yield fact_fluent_key(e), DOWN
+    for kind, fluent, expr in action.operator.numeric_effects:
+        key = fluent_key(fluent)
+        amount = None
+        if kind != 'assign':
+            try:
+                amount = execute_functions(expr, action.binding)
+            except TypeError:
+                pass
+        if not is_number(amount):
+            yield key, UP
+            yield key, DOWN
+            continue
+        if kind == 'decrease':
+            amount = -amount
+        if amount > 0:
+            yield key, UP
+        elif amount < 0:
+            yield key, DOWN
+
+
+def matches_any(fact, patterns):
+    return any(unify(p, fact) is not None for p in patterns)
+
+
+class Relevance(object):
+    """
+    The result of a backward relevance analysis: the relevant ground actions,
+    the relevant facts, the patterns of facts that must be false, and the
+    directions in which numeric fluents are needed.
+
+    >>> from py_plan.base import Operator
+    >>> drive = Operator('drive', [('at', '?x'), ('road', '?x', '?y')],
+    ...                  [('at', '?y'), ('not', ('at', '?x'))])
+    >>> r = Relevance([drive], [('at', 'a'), ('road', 'a', 'b'),
+    ...                         ('road', 'a', 'c')], [('at', 'b')])
+    >>> sorted(repr(a) for a in r.actions)
+    ['drive(a, b)']
+    >>> ('road', 'a', 'c') in r.facts
+    False
+    """
+
+    def __init__(self, operators, state, goals, action_limit=None):
+        actions, reachable = ground(operators, state,
+                                    action_limit=action_limit)
+        keys = changed_fluents(operators)
+
+        self.facts = set()
+        self.negated = set()
+        self.needed = {}
+        self.actions = []
+        self.require(goals, reachable, keys)
+
+        directions = {}
+        remaining = actions
+        changed = True
+        while changed:
+            changed = False
+            waiting = []
+            for a in remaining:
+                if not self.helps(a):
+                    waiting.append(a)
+                    continue
+                changed = True
+                self.actions.append(a)
+                self.facts.update(a.pos_cond)
+                self.negated.update(a.neg_cond)
+                o = a.operator
+                if id(o) not in directions:
+                    directions[id(o)] = fluent_directions(o.conditions, keys)
+                for key, needed in directions[id(o)].items():
+                    self.needed.setdefault(key, set()).update(needed)
+            remaining = waiting
+
+    def require(self, goals, reachable, keys):
+        for g in goals:
+            if is_functional_term(g):
+                continue
+            if is_negated_term(g):
+                self.negated.add(g[1])
+            elif contains_variable(g):
+                self.facts.update(f for f in reachable
+                                  if unify(g, f) is not None)
+            else:
+                self.facts.add(g)
+        for key, needed in fluent_directions(goals, keys).items():
+            self.needed.setdefault(key, set()).update(needed)
+
+    def helps(self, action):
+        if not action.adds.isdisjoint(self.facts):
+            return True
+        if any(self.must_be_false(d) for d in action.dels):
+            return True
+        return any(d in self.needed.get(key, ())
+                   for key, d in numeric_changes(action))
+
+    def must_be_false(self, fact):
+        return fact in self.negated or matches_any(fact, [
+            n for n in self.negated if contains_variable(n)])
+
+    def is_relevant(self, fact):
+        """
+        Checks if a fact of the initial state is relevant.
+        """
+        if fact in self.facts or self.must_be_false(fact):
+            return True
+        return (isinstance(fact, tuple) and len(fact) > 1 and
+                fact_fluent_key(fact) in self.needed)
+
+
+def reduce_problem(state, goals, operators, action_limit=None):
+    """
+    Returns the initial state and operators of the problem, reduced to the
+    relevant facts and the operators with a relevant grounding. Raises
+    :class:`GroundingLimitExceeded` if grounding produces more than
+    `action_limit` actions.
+
+    >>> from py_plan.base import Operator
+    >>> drive = Operator('drive', [('at', '?x'), ('road', '?x', '?y')],
+    ...                  [('at', '?y'), ('not', ('at', '?x'))])
+    >>> fly = Operator('fly', [('at', '?x'), ('airport', '?x')],
+    ...                [('flown', '?x')])
+    >>> state, ops = reduce_problem([('at', 'a'), ('road', 'a', 'b'),
+    ...                              ('road', 'c', 'd'), ('airport', 'a')],
+    ...                             [('at', 'b')], [drive, fly])
+    >>> sorted(state)
+    [('at', 'a'), ('road', 'a', 'b')]
+    >>> [o.name for o in ops]
+    ['drive']
+    """
+    relevance = Relevance(operators, state, goals, action_limit)
+    kept = set(id(a.operator) for a in relevance.actions)
+    operators = [o for o in operators if id(o) in kept]
+
+    negations = [c[1] for o in operators for c in o.conditions
+                 if is_negated_term(c)]
+    negations.extend(g[1] for g in goals if is_negated_term(g))
+    state = frozenset(f for f in state if relevance.is_relevant(f) or
+                      matches_any(f, negations))
+    return state, operators
@@ -0,0 +1,168 @@
+"""
+Incremental replanning for agents that plan, act, and plan again as the world
+changes. A :class:`Replanner` keeps the goals, operators, and heuristic fixed
+and, on each call, plans from the current state while reusing the work of
+previous calls:
+
+- the suffixes of the previous plan are validated from the new state and the
+  shortest valid one is returned (a repair), so no search is needed when the
+  world has only moved along the plan or changed in ways the plan tolerates,
+- otherwise, heuristic estimates are cached by state across searches, and
+- every state on a previously found plan is remembered with the plan suffix
+  that reaches the goals from it, and a search that reaches one of those
+  states can jump to the end of the suffix at the cost of the suffix.
+
+Only the states along previous plans (and heuristic estimates) are reused;
+the rest of the states that earlier searches explored are not.
+"""
+
+from __future__ import print_function
+from __future__ import unicode_literals
+from __future__ import absolute_import
+from __future__ import division
+
+from collections import OrderedDict
+
+from py_search.base import Node
+
+from py_plan.pattern_matching import build_index
+from py_plan.pattern_matching import match_exists
+from py_plan.heuristics import CachedHeuristic
+from py_plan.search import best_first_search
+from py_plan.total_order import StateSpacePlanningProblem
+from py_plan.total_order import apply_operator
+from py_plan.total_order import execute_plan
+
+
+class StitchingProblem(StateSpacePlanningProblem):
+    """
+    A :class:`StateSpacePlanningProblem` where the states in `known`, a dict
+    from states to plan suffixes that reach the goals from them, have an
+    additional successor: the state at the end of the suffix, reached through
+    a node for each step of the suffix. The suffix is paid for like any other
+    steps, so a search that is optimal for the problem stays optimal.
+    """
+
+    def __init__(self, state, goals, operators, known, **kwargs):
+        super(StitchingProblem, self).__init__(state, goals, operators,
+                                               **kwargs)
+        self.known = known
+
+    def successors(self, node):
+        for s in super(StitchingProblem, self).successors(node):
+            yield s
+
+        suffix = self.known.get(node.state)
+        if not suffix:
+            return
+        for o, m in suffix:
+            node = Node(apply_operator(node.state, o, m), node, (o, m),
+                        node.cost() + o.cost)
+        yield node
+
+
+class Replanner(object):
+    """
+    Plans repeatedly for fixed goals and operators from changing states (see
+    the module docstring). The `heuristic` is shared by every search, so it
+    must be valid for every state it is given (e.g., the goal count, or an
+    :class:`py_plan.heuristics.FFHeuristic` grounded from a state whose
+    objects do not change), and its estimates are cached in a
+    :class:`CachedHeuristic` of at most `cache_size` states, and at most
+    `cache_size` states of previous plans are remembered. The `search` is
+    a function that takes a problem and yields solutions, and other keyword
+    arguments are passed to :class:`StateSpacePlanningProblem`.
+
+    `last` records how the most recent plan was found: 'repaired', 'stitched'
+    (found by a search whose plan passes through a known state), 'searched',
+    or None if no plan was found.
+    """
+
+    def __init__(self, goals, operators, heuristic=None,
+                 search=best_first_search, cache_size=100000, **kwargs):
+        self.goals = frozenset(goals)
+        self.operators = operators
+        self.heuristic = None
+        if heuristic is not None:
+            self.heuristic = CachedHeuristic(heuristic, cache_size)
+        self.search = search
+        self.cache_size = cache_size
+        self.kwargs = kwargs
+
+        self.plan = None
+        self.known = OrderedDict()
+        self.last = None
+        self.repairs = 0
+        self.searches = 0
+
+    def achieves(self, state):
+        return match_exists(self.goals, build_index(state))
+
+    def repair(self, state):
+        """
+        Returns the plan suffix known to reach the goals from the state, or
+        else the shortest suffix of the previous plan that reaches the goals
+        from the state, or None.
+        """
+        if state in self.known:
+            suffix = self.known.pop(state)
+            self.known[state] = suffix
+            return suffix
+        if self.plan is None:
+            return None
+        for i in range(len(self.plan), -1, -1):
+            suffix = self.plan[i:]
+            final = execute_plan(state, suffix)
+            if final is not None and self.achieves(final):
+                return suffix
+        return None
+
+    def remember(self, state, plan):
+        """
+        Records every state along a plan with the suffix that reaches the
+        goals from it.
+        """
+        state = frozenset(state)
+        for i in range(len(plan) + 1):
+            self.known.pop(state, None)
+            self.known[state] = plan[i:]
+            if i < len(plan):
+                state = apply_operator(state, *plan[i])
+        while len(self.known) > self.cache_size:
+            self.known.popitem(last=False)
+
+    def __call__(self, state):
+        """
+        Returns a plan (a tuple of (operator, binding) pairs) from the state
+        to the goals, or None if none is found.
+        """
+        state = frozenset(state)
+        suffix = self.repair(state)
+        if suffix is not None:
+            self.repairs += 1
+            self.plan = suffix
+            self.last = 'repaired'
+            return suffix
+
+        self.searches += 1
+        problem = StitchingProblem(state, self.goals, self.operators,
+                                   self.known, heuristic=self.heuristic,
+                                   **self.kwargs)
+        solution = next(self.search(problem), None)
+        if solution is None:
+            self.plan = None
+            self.last = None
+            return None
+
+        plan = tuple(solution.path())
+        self.last = 'searched'
+        current = state
+        for o, m in plan[:-1]:
+            current = apply_operator(current, o, m)
+            if current in self.known:
+                self.last = 'stitched'
+                break
+
+        self.remember(state, plan)
+        self.plan = plan
+        return plan
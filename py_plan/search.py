@@ -0,0 +1,674 @@
+"""
+Planning specific search drivers for :class:`StateSpacePlanningProblem` that
+complement the general searches in py_search.
+"""
+
+from __future__ import print_function
+from __future__ import unicode_literals
+from __future__ import absolute_import
+from __future__ import division
+
+import time
+from collections import deque
+from functools import partial
+from heapq import heappush
+from heapq import heappop
+from numbers import Integral
+
+from py_search.base import SolutionNode
+from py_search.base import FIFOQueue
+from py_search.base import Fringe
+from py_search.base import PriorityQueue
+from py_search.uninformed import choose_search
+
+from py_plan.heuristics import GoalCountHeuristic
+from py_plan.heuristics import RegressionGoalCountHeuristic
+from py_plan.pattern_matching import contains_variable
+from py_plan.pattern_matching import is_functional_term
+from py_plan.pattern_matching import is_negated_term
+
+
+def get_heuristic(problem, heuristic=None):
+    """
+    Returns the heuristic to use for a problem, the provided one, the
+    problem's own heuristic, or the goal count heuristic (in that order).
+    """
+    if heuristic is not None:
+        return heuristic
+    if getattr(problem, 'heuristic', None) is not None:
+        return problem.heuristic
+    return GoalCountHeuristic(problem.goal.state)
+
+
+class BucketQueue(Fringe):
+    """
+    A priority queue for integral node values, which keeps a bucket (a deque)
+    of nodes for each value and pops from the lowest non-empty bucket. Pushing
+    and popping take constant amortized time and never compare nodes.
+
+    Nodes with equal values are popped in first-in first-out order if
+    `tie_breaking` is 'fifo', last-in first-out order if it is 'lifo', and in
+    order of lowest heuristic estimate (the node value minus the node's
+    cost) if it is 'h'. Nodes whose value exceeds the cost limit or is
+    infinite are not added. Values must be non-negative integers (or floats
+    with integral values); other values raise a ValueError, unless
+    `fallback` is True, in which case the nodes are moved to a py_search
+    PriorityQueue, which is used from then on.
+
+    >>> bq = BucketQueue()
+    >>> for v in [6, 0, 2, 6, 7]:
+    ...     bq.push(v)
+    >>> len(bq)
+    5
+    >>> list(bq)
+    [0, 2, 6, 6, 7]
+    >>> bq.pop(), bq.peek_value()
+    (0, 2)
+    """
+
+    def __init__(self, node_value=lambda x: x, cost_limit=float('inf'),
+                 tie_breaking='fifo', fallback=False):
+        if tie_breaking not in ('fifo', 'lifo', 'h'):
+            raise ValueError("Unknown tie breaking: %s" % tie_breaking)
+        self.node_value = node_value
+        self.cost_limit = cost_limit
+        self.tie_breaking = tie_breaking
+        self.fallback = fallback
+        self.queue = None
+        self.clear()
+
+    def clear(self):
+        self.buckets = []
+        self.sizes = []
+        self.min_value = 0
+        self.length = 0
+        self.queue = None
+
+    def switch(self):
+        """
+        Moves the nodes to a PriorityQueue, which is used from then on.
+        """
+        queue = PriorityQueue(node_value=self.node_value,
+                              cost_limit=self.cost_limit)
+        for node in self:
+            queue.push(node)
+        self.queue = queue
+
+    def push(self, node):
+        if self.queue is not None:
+            self.queue.push(node)
+            return
+
+        value = self.node_value(node)
+        if value == float('inf') or value > self.cost_limit:
+            return
+        try:
+            value = bucket_index(value)
+            tie = 0
+            if self.tie_breaking == 'h':
+                tie = bucket_index(value - node.cost())
+        except ValueError:
+            if not self.fallback:
+                raise
+            self.switch()
+            self.queue.push(node)
+            return
+
+        while len(self.buckets) <= value:
+            self.buckets.append([])
+            self.sizes.append(0)
+        bucket = self.buckets[value]
+        while len(bucket) <= tie:
+            bucket.append(deque())
+
+        bucket[tie].append(node)
+        self.sizes[value] += 1
+        self.length += 1
+        if value < self.min_value:
+            self.min_value = value
+
+    def first_bucket(self):
+        """
+        Returns the deque the next node will be popped from.
+        """
+        if self.length == 0:
+            raise IndexError("pop from an empty BucketQueue")
+        while self.sizes[self.min_value] == 0:
+            self.min_value += 1
+        for nodes in self.buckets[self.min_value]:
+            if nodes:
+                return nodes
+
+    def peek(self):
+        if self.queue is not None:
+            return self.queue.peek()
+        nodes = self.first_bucket()
+        return nodes[-1] if self.tie_breaking == 'lifo' else nodes[0]
+
+    def peek_value(self):
+        if self.queue is not None:
+            return self.queue.peek_value()
+        self.first_bucket()
+        return self.min_value
+
+    def pop(self):
+        if self.queue is not None:
+            return self.queue.pop()
+        nodes = self.first_bucket()
+        self.sizes[self.min_value] -= 1
+        self.length -= 1
+        if self.tie_breaking == 'lifo':
+            return nodes.pop()
+        return nodes.popleft()
+
+    def __len__(self):
+        if self.queue is not None:
+            return len(self.queue)
+        return self.length
+
+    def __iter__(self):
+        if self.queue is not None:
+            for node in self.queue:
+                yield node
+            return
+        for value in range(self.min_value, len(self.buckets)):
+            for nodes in self.buckets[value]:
+                if self.tie_breaking == 'lifo':
+                    nodes = reversed(nodes)
+                for node in nodes:
+                    yield node
+
+
+def bucket_index(value):
+    """
+    Converts an integral node value to an int.
+    """
+    if isinstance(value, Integral) and value >= 0:
+        return int(value)
+    if isinstance(value, float) and value.is_integer() and value >= 0:
+        return int(value)
+    raise ValueError("BucketQueue requires non-negative integral values, "
+                     "not %s." % value)
+
+
+def integral_costs(problem):
+    """
+    Checks if all of the operators of a problem have integral costs.
+    """
+    return all(isinstance(o.cost, Integral) for o in problem.operators)
+
+
+def open_list(problem, cost_limit=float('inf'), tie_breaking='h'):
+    """
+    Returns a factory for the open list of a best-first search on a problem
+    that orders nodes by problem.node_value: a :class:`BucketQueue` if all of
+    the operator costs are integral (which switches to a PriorityQueue if a
+    node value is not, e.g., because of the heuristic) and a py_search
+    PriorityQueue otherwise.
+    """
+    if integral_costs(problem):
+        return partial(BucketQueue, node_value=problem.node_value,
+                       cost_limit=cost_limit, tie_breaking=tie_breaking,
+                       fallback=True)
+    return partial(PriorityQueue, node_value=problem.node_value,
+                   cost_limit=cost_limit)
+
+
+def best_first_search(problem, cost_limit=float('inf'), graph=True,
+                      forward=True, backward=False, tie_breaking='h'):
+    """
+    The same as py_search's best_first_search, but the open list is chosen
+    with :func:`open_list`, so problems with integral operator costs use a
+    :class:`BucketQueue`.
+    """
+    for solution in choose_search(problem,
+                                  open_list(problem, cost_limit,
+                                            tie_breaking),
+                                  graph=graph, forward=forward,
+                                  backward=backward):
+        yield solution
+
+
+def graph_search_steps(problem, fringe=None):
+    """
+    A forward graph search that yields after every node expansion, so callers
+    can interleave it with other work or stop it. It yields None after
+    expanding a node and a :class:`SolutionNode` when it finds a solution.
+    The fringe determines the search order (defaults to a FIFO queue, i.e.,
+    breadth-first search).
+    """
+    if fringe is None:
+        fringe = FIFOQueue()
+
+    closed = {}
+    fringe.push(problem.initial)
+    closed[problem.initial] = problem.initial.cost()
+
+    while len(fringe) > 0:
+        node = fringe.pop()
+        if problem.goal_test(node, problem.goal):
+            yield SolutionNode(node, problem.goal)
+
+        for s in problem.successors(node):
+            if s not in closed or s.cost() < closed[s]:
+                fringe.push(s)
+                closed[s] = s.cost()
+        yield None
+
+
+def weighted_astar_steps(problem, heuristic, weight=1, bound=float('inf')):
+    """
+    A weighted A* search (f = g + weight * h) that yields after every node
+    expansion, so callers can interleave it with other work or stop it. It
+    yields None after expanding a node and a :class:`SolutionNode` when it
+    finds a solution. Nodes whose cost is not below `bound` are pruned.
+    """
+    count = 0
+    closed = {}
+    fringe = []
+
+    h = heuristic(problem.initial)
+    heappush(fringe, (weight * h, h, count, problem.initial))
+    closed[problem.initial] = problem.initial.cost()
+
+    while fringe:
+        _, _, _, node = heappop(fringe)
+        if closed.get(node, float('inf')) < node.cost():
+            continue
+
+        if problem.goal_test(node, problem.goal):
+            yield SolutionNode(node, problem.goal)
+            continue
+
+        for s in problem.successors(node):
+            if s.cost() >= bound:
+                continue
+            if s not in closed or s.cost() < closed[s]:
+                closed[s] = s.cost()
+                h = heuristic(s)
+                if h == float('inf'):
+                    continue
+                count += 1
+                heappush(fringe, (s.cost() + weight * h, h, count, s))
+        yield None
+
+
+class AnytimeResult(object):
+    """
+    The outcome of an :func:`anytime_search`. The `solution` is the best
+    :class:`SolutionNode` found (or None) and `status` records why the search
+    stopped:
+
+    - 'completed': the search with the final weight finished (with a weight
+      of 1 and an admissible heuristic, the solution is optimal),
+    - 'no_solution': the search space was exhausted without finding a plan,
+    - 'time_limit', 'node_limit', or 'cancelled': a budget ran out or the
+      search was cancelled.
+    """
+
+    def __init__(self, solution, status, nodes_expanded, solutions_found,
+                 elapsed):
+        self.solution = solution
+        self.status = status
+        self.nodes_expanded = nodes_expanded
+        self.solutions_found = solutions_found
+        self.elapsed = elapsed
+
+    @property
+    def plan(self):
+        if self.solution is None:
+            return None
+        return self.solution.path()
+
+    @property
+    def cost(self):
+        if self.solution is None:
+            return float('inf')
+        return self.solution.cost()
+
+    def __repr__(self):
+        return "AnytimeResult(status=%s, cost=%s, nodes_expanded=%i)" % (
+            self.status, self.cost, self.nodes_expanded)
+
+
+def is_cancelled(cancel):
+    """
+    Checks a cancellation token, which can be None, an object with an is_set
+    method (e.g., a threading.Event), or a callable.
+    """
+    if cancel is None:
+        return False
+    if hasattr(cancel, 'is_set'):
+        return cancel.is_set()
+    return cancel()
+
+
+def anytime_steps(problem, heuristic=None, weights=(5, 3, 2, 1.5, 1)):
+    """
+    Restarting weighted A* over a decreasing sequence of weights. Each search
+    stops at its first solution and is bounded by the cost of the best
+    solution found so far, so every solution it yields is better than the
+    last. Yields None after each node expansion, like
+    :func:`weighted_astar_steps`.
+    """
+    heuristic = get_heuristic(problem, heuristic)
+    best = float('inf')
+    for w in weights:
+        for event in weighted_astar_steps(problem, heuristic, w, best):
+            yield event
+            if event is not None:
+                best = event.cost()
+                break
+
+
+def anytime_search(problem, heuristic=None, weights=(5, 3, 2, 1.5, 1),
+                   time_limit=None, node_limit=None, cancel=None):
+    """
+    Searches for the best plan it can find within the provided budgets using
+    restarting weighted A* (see :func:`anytime_steps`). Returns an
+    :class:`AnytimeResult` with the best solution found and why search
+    stopped.
+
+    :param problem: The problem to solve.
+    :type problem: :class:`StateSpacePlanningProblem`
+    :param heuristic: A heuristic that maps nodes to cost estimates (defaults
+        to the problem's heuristic, or the goal count).
+    :type heuristic: callable
+    :param weights: The decreasing sequence of heuristic weights.
+    :type weights: sequence of floats
+    :param time_limit: The wall-clock budget in seconds.
+    :type time_limit: float
+    :param node_limit: The maximum number of node expansions.
+    :type node_limit: int
+    :param cancel: A cancellation token checked after each expansion (e.g., a
+        threading.Event).
+    :type cancel: object with is_set method or callable
+    """
+    start = time.time()
+    best = None
+    expanded = 0
+    found = 0
+    status = None
+
+    for event in anytime_steps(problem, heuristic, weights):
+        if event is None:
+            expanded += 1
+        else:
+            best = event
+            found += 1
+
+        if is_cancelled(cancel):
+            status = 'cancelled'
+        elif time_limit is not None and time.time() - start >= time_limit:
+            status = 'time_limit'
+        elif node_limit is not None and expanded >= node_limit:
+            status = 'node_limit'
+        if status is not None:
+            break
+
+    if status is None:
+        status = 'completed' if best is not None else 'no_solution'
+
+    return AnytimeResult(best, status, expanded, found, time.time() - start)
+
+
+def helpful_successors(problem, heuristic, node):
+    """
+    Yields the successors of a node that apply one of the helpful actions of
+    the heuristic, or all of the successors if the heuristic does not have
+    helpful actions.
+    """
+    if not hasattr(heuristic, 'helpful_actions'):
+        for s in problem.successors(node):
+            yield s
+        return
+
+    helpful = heuristic.helpful_actions(node.state)
+    for s in problem.successors(node):
+        if heuristic.action_key(*s.action) in helpful:
+            yield s
+
+
+def improve(problem, heuristic, node, h, helpful=True):
+    """
+    A breadth-first search from a node for a node with a heuristic estimate
+    below h, or a goal. Returns the node and its estimate, or None if there is
+    no such node.
+    """
+    fringe = FIFOQueue()
+    fringe.push(node)
+    closed = set([node])
+
+    while len(fringe) > 0:
+        current = fringe.pop()
+        if helpful:
+            children = helpful_successors(problem, heuristic, current)
+        else:
+            children = problem.successors(current)
+
+        for s in children:
+            if s in closed:
+                continue
+            closed.add(s)
+            sh = heuristic(s)
+            if sh < h or problem.goal_test(s, problem.goal):
+                return s, sh
+            if sh != float('inf'):
+                fringe.push(s)
+    return None
+
+
+def enforced_hill_climbing(problem, heuristic=None, helpful=True,
+                           fallback=True, fallback_weight=5):
+    """
+    Enforced hill-climbing, the search of the FF planner. From the current
+    node, a breadth-first search (see :func:`improve`) finds a node with a
+    strictly better heuristic estimate, which becomes the current node, until
+    a goal is reached. If `helpful` is True, then only the helpful actions of
+    the heuristic (see :class:`py_plan.heuristics.FFHeuristic`) are
+    expanded.
+
+    Enforced hill-climbing is fast but incomplete, so when it reaches a dead
+    end and `fallback` is True, then the problem is solved from scratch with
+    a complete weighted A* search (see :func:`weighted_astar_steps`). Yields
+    the :class:`SolutionNode` it finds, if any.
+    """
+    heuristic = get_heuristic(problem, heuristic)
+    node = problem.initial
+    h = heuristic(node)
+
+    while h != float('inf'):
+        if problem.goal_test(node, problem.goal):
+            yield SolutionNode(node, problem.goal)
+            return
+        better = improve(problem, heuristic, node, h, helpful)
+        if better is None:
+            break
+        node, h = better
+
+    if fallback:
+        for event in weighted_astar_steps(problem, heuristic,
+                                          fallback_weight):
+            if event is not None:
+                yield event
+                return
+
+
+def lazy_best_first_search(problem, heuristic=None, weight=1):
+    """
+    Best-first search with deferred heuristic evaluation. Children are added
+    to the open list with the heuristic estimate of their parent (f = g +
+    weight * h(parent)) and a node's own estimate is only computed when it is
+    expanded, so the many children that are generated but never expanded
+    are never evaluated. This trades some guidance (and optimality) for far
+    fewer heuristic evaluations, particularly with expensive heuristics
+    like :class:`py_plan.heuristics.FFHeuristic`. It is usually combined
+    with a :class:`py_plan.heuristics.CachedHeuristic` and with preferred
+    operators, which order the children of a node.
+
+    Yields a :class:`SolutionNode` for each solution it finds.
+    """
+    heuristic = get_heuristic(problem, heuristic)
+    count = 0
+    closed = {}
+    fringe = [(0, 0, count, problem.initial)]
+
+    while fringe:
+        _, _, _, node = heappop(fringe)
+        if closed.get(node, float('inf')) <= node.cost():
+            continue
+        closed[node] = node.cost()
+
+        if problem.goal_test(node, problem.goal):
+            yield SolutionNode(node, problem.goal)
+            continue
+
+        h = heuristic(node)
+        if h == float('inf'):
+            continue
+
+        for s in problem.successors(node):
+            if closed.get(s, float('inf')) <= s.cost():
+                continue
+            count += 1
+            heappush(fringe, (s.cost() + weight * h, h, count, s))
+
+
+def anchors(goal):
+    """
+    Returns the ground positive facts of a goal node's state; a state can
+    only satisfy the goal if it contains all of them.
+    """
+    return [f for f in goal.state if not is_negated_term(f) and
+            not is_functional_term(f) and not contains_variable(f)]
+
+
+class MeetingIndex(object):
+    """
+    Indexes the forward states and backward goal sets generated by a
+    bidirectional search to find the pairs where a state satisfies a goal
+    set without testing every pair. A goal set is indexed under one of its
+    ground facts (its anchor) and a state is only tested against the goal
+    sets anchored by one of its facts, plus the goal sets without ground
+    facts; a new goal set is only tested against the states that contain its
+    rarest ground fact.
+    """
+
+    def __init__(self, problem):
+        self.problem = problem
+        self.states = []
+        self.by_fact = {}
+        self.goals = {}
+        self.unanchored = []
+
+    def add_state(self, node):
+        """
+        Indexes a forward node and yields the goal nodes it satisfies.
+        """
+        self.states.append(node)
+        candidates = list(self.unanchored)
+        for f in node.state:
+            self.by_fact.setdefault(f, []).append(node)
+            candidates.extend(self.goals.get(f, ()))
+        for goal in candidates:
+            if self.problem.goal_test(node, goal):
+                yield goal
+
+    def add_goal(self, goal):
+        """
+        Indexes a backward node and yields the forward nodes that satisfy it.
+        """
+        facts = anchors(goal)
+        if facts:
+            anchor = min(facts, key=lambda f: len(self.by_fact.get(f, ())))
+            self.goals.setdefault(anchor, []).append(goal)
+            candidates = self.by_fact.get(anchor, ())
+        else:
+            self.unanchored.append(goal)
+            candidates = self.states
+        for node in list(candidates):
+            if self.problem.goal_test(node, goal):
+                yield node
+
+
+def bidirectional_search(problem, heuristic=None, backward_heuristic=None,
+                         strategy='size'):
+    """
+    A bidirectional best-first search, where each direction is guided by a
+    heuristic: forward nodes by `heuristic` (defaults to the problem's
+    heuristic, or the goal count) and backward goal sets by
+    `backward_heuristic` (defaults to
+    :class:`py_plan.heuristics.RegressionGoalCountHeuristic`). Each step
+    expands the best node of one frontier, the smaller one if `strategy` is
+    'size' or the one with the lower bound (the lowest g + h) if it is
+    'bound'. Meetings between the two searches are found with a
+    :class:`MeetingIndex`.
+
+    Yields a :class:`SolutionNode` for each meeting that improves on the
+    cost of the previous solution. Nodes that cannot improve on the best
+    solution are pruned.
+    """
+    if strategy not in ('size', 'bound'):
+        raise ValueError("Unknown strategy: %s" % strategy)
+    heuristic = get_heuristic(problem, heuristic)
+    if backward_heuristic is None:
+        backward_heuristic = RegressionGoalCountHeuristic(
+            problem.initial.state)
+
+    meetings = MeetingIndex(problem)
+    best = float('inf')
+    count = 0
+    frontiers = {'forward': [], 'backward': []}
+    closed = {'forward': {}, 'backward': {}}
+    heuristics = {'forward': heuristic, 'backward': backward_heuristic}
+    expand = {'forward': problem.successors,
+              'backward': problem.predecessors}
+
+    def meet(direction, node):
+        if direction == 'forward':
+            return ((node, goal) for goal in meetings.add_state(node))
+        return ((state, node) for state in meetings.add_goal(node))
+
+    for direction, root in (('forward', problem.initial),
+                            ('backward', problem.goal)):
+        closed[direction][root] = root.cost()
+        heappush(frontiers[direction], (0, count, root))
+        count += 1
+
+    for direction, root in (('forward', problem.initial),
+                            ('backward', problem.goal)):
+        for state, goal in meet(direction, root):
+            if state.cost() + goal.cost() < best:
+                best = state.cost() + goal.cost()
+                yield SolutionNode(state, goal)
+
+    while frontiers['forward'] and frontiers['backward']:
+        if strategy == 'size':
+            forward = (len(frontiers['forward']) <=
+                       len(frontiers['backward']))
+        else:
+            forward = (frontiers['forward'][0][0] <=
+                       frontiers['backward'][0][0])
+        direction = 'forward' if forward else 'backward'
+
+        _, _, node = heappop(frontiers[direction])
+        if closed[direction].get(node, float('inf')) < node.cost():
+            continue
+
+        for s in expand[direction](node):
+            if s.cost() >= best:
+                continue
+            if s in closed[direction] and closed[direction][s] <= s.cost():
+                continue
+            closed[direction][s] = s.cost()
+
+            h = heuristics[direction](s)
+            if h == float('inf'):
+                continue
+            heappush(frontiers[direction], (s.cost() + h, count, s))
+            count += 1
+
+            for state, goal in meet(direction, s):
+                if state.cost() + goal.cost() < best:
+                    best = state.cost() + goal.cost()
+                    yield SolutionNode(state, goal)
@@ -0,0 +1,266 @@
+"""
+Partial-order reduction for progression search using strong stubborn sets.
+
+A strong stubborn set for a state is a set of actions that contains a
+disjunctive action landmark for the goal (the achievers of an unsatisfied goal
+fact), a necessary enabling set for every inapplicable action in the set, and
+every action that interferes with an applicable action in the set. Expanding
+only the applicable actions of a strong stubborn set preserves completeness
+(and optimality) of the search.
+
+The operators are never grounded. Instead, the set is built from lifted
+actions, i.e., an operator and a partial binding of its variables, where each
+lifted action stands for all of its ground instances. Interference and
+achievement are computed by unifying operator conditions and effects.
+"""
+
+from __future__ import print_function
+from __future__ import unicode_literals
+from __future__ import absolute_import
+from __future__ import division
+
+from py_plan.pattern_matching import build_index
+from py_plan.pattern_matching import index_key
+from py_plan.pattern_matching import pattern_match
+from py_plan.pattern_matching import match_exists
+from py_plan.pattern_matching import is_functional_term
+from py_plan.pattern_matching import is_negated_term
+from py_plan.pattern_matching import contains_variable
+from py_plan.unification import execute_functions
+from py_plan.unification import is_variable
+from py_plan.unification import subst
+from py_plan.unification import unify
+
+PREFIX = '?__por'
+
+
+def rename(term, prefix=PREFIX):
+    """
+    Renames the variables in a term, so they do not collide with the variables
+    of an operator.
+
+    >>> rename(('on', '?x', 'A'))
+    ('on', '?__por?x', 'A')
+    """
+    if is_variable(term):
+        return prefix + term
+    if isinstance(term, tuple):
+        return tuple(rename(e, prefix) for e in term)
+    return term
+
+
+def wildcard_functions(term, count=None):
+    """
+    Replaces the functional subterms of a term with fresh variables, so the
+    term can be unified with any value the function might return.
+
+    >>> import operator
+    >>> wildcard_functions(('Money', (operator.sub, '?m', '?c')))
+    ('Money', '?__porf0')
+    """
+    if count is None:
+        count = [0]
+    if isinstance(term, tuple) and len(term) > 0 and callable(term[0]):
+        count[0] += 1
+        return '%sf%i' % (PREFIX, count[0] - 1)
+    if isinstance(term, tuple):
+        return tuple(wildcard_functions(e, count) for e in term)
+    return term
+
+
+def lifted_unifiers(terms, target):
+    """
+    Yields, for each term that unifies with the target, the resulting
+    bindings of the term's variables to ground values. Variables that are
+    bound to variables of the target remain unbound.
+    """
+    target = rename(target)
+    for t in terms:
+        u = unify(t, target, {})
+        if u is None:
+            continue
+        binding = {}
+        for v in u:
+            if v.startswith(PREFIX):
+                continue
+            val = u[v]
+            while is_variable(val) and val in u:
+                val = u[val]
+            if not contains_variable(val):
+                binding[v] = val
+        yield binding
+
+
+def fact_in(fact, index):
+    key = index_key(fact)
+    return key in index and fact in index[key]
+
+
+def fact_unifies(fact, index, sub=None):
+    if sub is None:
+        sub = {}
+    key = index_key(fact)
+    if key not in index:
+        return False
+    return any(unify(fact, f, sub) is not None for f in index[key])
+
+
+class StubbornSets(object):
+    """
+    Computes the applicable actions of a strong stubborn set for a state,
+    given a list of (lifted) :class:`Operator` objects.
+    """
+
+    def __init__(self, operators):
+        self.operators = list(operators)
+        self.pos = []
+        self.neg = []
+        self.adds = []
+        self.dels = []
+
+        for o in self.operators:
+            self.pos.append([c for c in o.conditions if not
+                             is_negated_term(c) and not
+                             is_functional_term(c)])
+            self.neg.append([c[1] for c in o.conditions if
+                             is_negated_term(c)])
+            self.adds.append([wildcard_functions(e) for e in o.add_effects])
+            self.dels.append([wildcard_functions(e) for e in o.del_effects])
+
+    def achievers(self, fact):
+        """
+        The lifted actions that might add a fact.
+        """
+        return [(i, b) for i in range(len(self.operators))
+                for b in lifted_unifiers(self.adds[i], fact)]
+
+    def deleters(self, fact):
+        """
+        The lifted actions that might delete a fact.
+        """
+        return [(i, b) for i in range(len(self.operators))
+                for b in lifted_unifiers(self.dels[i], fact)]
+
+    def interfering(self, pre, neg, adds, dels):
+        """
+        The lifted actions that interfere with a ground action with the given
+        positive preconditions, negated preconditions, add and delete effects.
+        An action interferes if either action disables the other or if their
+        effects conflict.
+        """
+        pairs = ([(self.dels, p) for p in pre] +
+                 [(self.adds, n) for n in neg] +
+                 [(self.pos, d) for d in dels] +
+                 [(self.adds, d) for d in dels] +
+                 [(self.neg, a) for a in adds] +
+                 [(self.dels, a) for a in adds])
+
+        result = []
+        for terms, fact in pairs:
+            for i in range(len(self.operators)):
+                result.extend((i, b) for b in lifted_unifiers(terms[i], fact))
+        return result
+
+    def enablers(self, i, sub, index):
+        """
+        Returns the lifted actions that make up a necessary enabling set for
+        every inapplicable ground instance of operator i under the binding.
+        The positive conditions are enumerated depth first, so a different
+        unsatisfied condition can be chosen for each group of instances.
+        """
+        out = []
+        self._enablers(i, list(self.pos[i]), sub, index, out)
+        return out
+
+    def _enablers(self, i, remaining, b, index, out):
+        remaining = list(remaining)
+        for t in list(remaining):
+            bt = subst(b, t)
+            if not contains_variable(bt):
+                if not fact_in(bt, index):
+                    out.extend(self.achievers(bt))
+                    return
+                remaining.remove(t)
+
+        if len(remaining) == 0:
+            for n in self.neg[i]:
+                bn = subst(b, n)
+                if fact_unifies(bn, index):
+                    out.extend(self.deleters(bn))
+                    return
+            return
+
+        # prefer conditions that no action can achieve (e.g., types), they
+        # constrain the instances without adding any enablers.
+        candidates = [(len(self.achievers(subst(b, t))), t)
+                      for t in remaining]
+        n_achievers, t = min(candidates, key=lambda x: x[0])
+        bt = subst(b, t)
+        if n_achievers > 0:
+            out.extend(self.achievers(bt))
+
+        remaining.remove(t)
+        key = index_key(bt)
+        if key not in index:
+            return
+        for fact in index[key]:
+            new_b = unify(t, fact, b)
+            if new_b is not None:
+                self._enablers(i, remaining, new_b, index, out)
+
+    def landmark(self, goals, index):
+        """
+        Returns the achievers of an unsatisfied goal, or None if each goal is
+        individually satisfied.
+        """
+        for g in goals:
+            if is_functional_term(g):
+                continue
+            if is_negated_term(g):
+                if fact_unifies(g[1], index):
+                    return self.deleters(g[1])
+            elif not match_exists([g], index):
+                return self.achievers(g)
+        return None
+
+    def applicable(self, state, goals, index=None):
+        """
+        Returns a list of (operator, binding) pairs, the applicable actions of
+        a strong stubborn set for the state.
+        """
+        if index is None:
+            index = build_index(state)
+
+        queue = self.landmark(goals, index)
+        if queue is None:
+            return [(o, m) for o in self.operators
+                    for m in pattern_match(o.conditions, index)]
+
+        seen = set()
+        applicable = {}
+
+        while queue:
+            i, sub = queue.pop()
+            key = (i, frozenset(sub.items()))
+            if key in seen:
+                continue
+            seen.add(key)
+
+            o = self.operators[i]
+            for m in pattern_match(o.conditions, index, sub):
+                akey = (i, frozenset(m.items()))
+                if akey in applicable:
+                    continue
+                applicable[akey] = (o, m)
+
+                pre = [subst(m, t) for t in self.pos[i]]
+                neg = [subst(m, t) for t in self.neg[i]]
+                adds = [execute_functions(e, m) if is_functional_term(e)
+                        else subst(m, e) for e in o.add_effects]
+                dels = [execute_functions(e, m) if is_functional_term(e)
+                        else subst(m, e) for e in o.del_effects]
+                queue.extend(self.interfering(pre, neg, adds, dels))
+
+            queue.extend(self.enablers(i, sub, index))
+
+        return list(applicable.values())
@@ -19,6 +19,7 @@ from py_search.utils import compare_searches
 
 from py_plan.pattern_matching import build_index
 from py_plan.pattern_matching import pattern_match
+from py_plan.pattern_matching import match_exists
 from py_plan.pattern_matching import is_functional_term
 from py_plan.pattern_matching import is_negated_term
 from py_plan.unification import execute_functions
@@ -26,6 +27,19 @@ from py_plan.unification import is_variable
 from py_plan.unification import subst
 from py_plan.base import gen_skolem
 from py_plan.base import Operator
+from py_plan.stubborn_sets import StubbornSets
+from py_plan.relational import RelationalIndex
+from py_plan.relational import join_match
+from py_plan.multi_query import MultiQueryMatcher
+from py_plan.numeric import NumericReachability
+from py_plan.numeric import apply_numeric_effects
+from py_plan.numeric import refers_to_fluents
+from py_plan.mutex import Mutexes
+from py_plan.grounding import GroundingLimitExceeded
+from py_plan.relevance import reduce_problem
+
+# the maximum number of ground actions for the relevance analysis.
+RELEVANCE_ACTION_LIMIT = 100000
 
 
 def powerset(iterable):
@@ -67,6 +81,36 @@ def generate_add_constraints(add_effects, negative_goals):
             pattern_match([e], build_index(add_effects), {})]
 
 
+def apply_operator(state, operator, match):
+    """
+    Returns the state that results from applying the operator, under the
+    provided binding, to the state. The operator's conditions are assumed to
+    hold.
+    """
+    dels = frozenset(execute_functions(e, match) if is_functional_term(e)
+                     else subst(match, e) for e in operator.del_effects)
+    adds = frozenset(execute_functions(e, match) if is_functional_term(e)
+                     else subst(match, e) for e in operator.add_effects)
+    new_state = state.difference(dels).union(adds)
+    if operator.numeric_effects:
+        new_state = apply_numeric_effects(state, new_state,
+                                          operator.numeric_effects, match)
+    return new_state
+
+
+def execute_plan(state, plan):
+    """
+    Applies a plan (a sequence of (operator, binding) pairs) to a state.
+    Returns the resulting state or None if some step is not applicable.
+    """
+    state = frozenset(state)
+    for o, m in plan:
+        if not match_exists(o.conditions, build_index(state), m):
+            return None
+        state = apply_operator(state, o, m)
+    return state
+
+
 def replace_functionals(ele, sub):
     """
     Return the element with all functionals replaced,
@@ -111,17 +155,173 @@ def is_var_assignment(ele):
             is_constant(ele[2]))
 
 
+class CompactNode(Node):
+    """
+    A search node that stores only the delta (deleted and added facts) of the
+    action that generated it, rather than a complete copy of the state. The
+    full state is rebuilt on demand by replaying the deltas along the parent
+    chain, starting from the nearest checkpoint (a node that keeps its full
+    state, or a regular :class:`Node`). A checkpoint is stored every
+    `checkpoint_interval` levels of depth, which bounds the cost of rebuilding
+    a state.
+
+    The hash of the state is computed once when the node is generated, so
+    duplicate detection only rebuilds states when two hashes collide.
+    """
+
+    def __init__(self, state, parent=None, action=None, node_cost=0,
+                 extra=None, dels=frozenset(), adds=frozenset(),
+                 checkpoint_interval=10):
+        super(CompactNode, self).__init__(None, parent, action, node_cost,
+                                          extra)
+        self.state_hash = hash(state)
+        self.dels = dels
+        self.adds = adds
+
+        if (parent is None or checkpoint_interval <= 1 or
+                self.node_depth % checkpoint_interval == 0):
+            self.checkpoint = state
+        else:
+            self.checkpoint = None
+
+    @property
+    def state(self):
+        """
+        Rebuilds the full state from the nearest checkpoint.
+        """
+        deltas = []
+        current = self
+        while (isinstance(current, CompactNode) and
+               current.checkpoint is None):
+            deltas.append(current)
+            current = current.parent
+
+        if isinstance(current, CompactNode):
+            state = current.checkpoint
+        else:
+            state = current.state
+        for n in reversed(deltas):
+            state = state.difference(n.dels).union(n.adds)
+        return state
+
+    @state.setter
+    def state(self, value):
+        # The state is only stored at checkpoints (see __init__).
+        pass
+
+    def __hash__(self):
+        return self.state_hash
+
+    def __eq__(self, other):
+        if not isinstance(other, Node):
+            return False
+        if hash(other) != self.state_hash:
+            return False
+        return self.state == other.state
+
+
 class StateSpacePlanningProblem(Problem):
     """
     A total order planning problem that can be solved with py_search.
+
+    If `compact` is True, then the nodes generated by successors are
+    :class:`CompactNode` objects, which store the applied operator binding and
+    its delete/add delta instead of a full state. A full state is kept every
+    `checkpoint_interval` levels of depth. This substantially reduces the
+    memory used by breadth-first search at the cost of rebuilding states when
+    they are expanded.
+
+    If `stubborn_sets` is True, then successors only generates the applicable
+    actions of a strong stubborn set (see :mod:`py_plan.stubborn_sets`), which
+    prunes redundant interleavings of independent actions while preserving
+    completeness. This only affects forward search.
+
+    The `matcher` determines how operator conditions are matched against
+    states in successors: 'unify' uses :func:`pattern_match` and 'join' uses
+    the hash-join engine in :mod:`py_plan.relational`, which scales better
+    for operators with many variables, and 'multi' matches all operators at
+    once, evaluating the conditions they have in common only once (see
+    :mod:`py_plan.multi_query`).
+
+    If `relevance` is True, then the initial state and the operators are
+    reduced to the facts and operators that are relevant to the goals (see
+    :mod:`py_plan.relevance`) before searching. If grounding the problem
+    produces more than RELEVANCE_ACTION_LIMIT actions, then the problem is
+    not reduced.
+
+    If `mutexes` is True, then predecessors discards regressed states that
+    contain mutually exclusive facts, according to an h^2 mutex analysis of
+    the grounded operators (see :mod:`py_plan.mutex`).
+
+    Operators can have numeric effects (see :mod:`py_plan.numeric`). States
+    from which the numeric goals cannot be reached, according to an interval
+    relaxation of the numeric effects, are pruned in successors. Operators
+    are not regressed through goals that refer to the fluents their numeric
+    effects change.
+
+    If a `heuristic` (a callable that maps nodes to cost estimates, see
+    :mod:`py_plan.heuristics`) is provided, then node_value returns the cost
+    of a node plus the heuristic estimate.
+
+    If `preferred` is 'first' or 'only', then successors generates the
+    preferred operators of a state, the helpful actions of the heuristic
+    (see :class:`py_plan.heuristics.FFHeuristic`), before the other
+    successors, or generates only the preferred ones, which is incomplete.
+
+    The heuristic is not used by py_search's bidirectional searches; see
+    :func:`py_plan.search.bidirectional_search` for a bidirectional search
+    that is guided in both directions.
     """
-    # TODO Need to implement domain general heuristics, such as node_value.
-    # TODO Can these heuristics guide which bidirectional search is exanded
-    # first? Currently, we can't support heuristics with bidirectional search.
 
-    def __init__(self, state, goals, operators):
+    def __init__(self, state, goals, operators, compact=False,
+                 checkpoint_interval=10, stubborn_sets=False,
+                 heuristic=None, matcher='unify', mutexes=False,
+                 relevance=False, preferred=None):
         state = frozenset(state)
+        if relevance:
+            try:
+                state, operators = reduce_problem(state, goals, operators,
+                                                  RELEVANCE_ACTION_LIMIT)
+            except GroundingLimitExceeded:
+                pass
         self.operators = operators
+        self.heuristic = heuristic
+
+        if preferred not in (None, 'first', 'only'):
+            raise ValueError("Unknown preferred mode: %s" % preferred)
+        if (preferred is not None and
+                not hasattr(heuristic, 'helpful_actions')):
+            raise ValueError("Preferred operators require a heuristic with "
+                             "helpful actions.")
+        self.preferred = preferred
+
+        if matcher not in ('unify', 'join', 'multi'):
+            raise ValueError("Unknown matcher: %s" % matcher)
+        self.matcher = matcher
+        if matcher == 'multi':
+            self.multi_matcher = MultiQueryMatcher(operators)
+        self.compact = compact
+        self.checkpoint_interval = checkpoint_interval
+
+        numeric = any(o.numeric_effects for o in operators)
+        if stubborn_sets and numeric:
+            raise ValueError("Stubborn sets do not support numeric effects.")
+
+        if stubborn_sets:
+            self.stubborn_sets = StubbornSets(operators)
+        else:
+            self.stubborn_sets = None
+
+        if numeric:
+            self.numeric_reachable = NumericReachability(operators, state,
+                                                         goals)
+        else:
+            self.numeric_reachable = None
+
+        if mutexes:
+            self.mutexes = Mutexes(operators, state)
+        else:
+            self.mutexes = None
         self.goal = GoalNode(frozenset(goals))
         self.initial = Node(state, parent=None, action=None, node_cost=0)
         achievable = set(e for o in self.operators
@@ -129,23 +329,73 @@ class StateSpacePlanningProblem(Problem):
         achievable.update(e for e in state)
         self.achievable = build_index(achievable)
 
+    def node_value(self, node):
+        if self.heuristic is None:
+            return node.cost()
+        return node.cost() + self.heuristic(node)
+
     def successors(self, node):
-        index = build_index(node.state)
-        for o in self.operators:
-            # TODO check that operators cannot have unbound variables in
-            # effects.
-            for m in pattern_match(o.conditions, index):
-                dels = frozenset(execute_functions(e, m) if
-                                 is_functional_term(e) else subst(m, e) for e
-                                 in o.del_effects)
-                adds = frozenset(execute_functions(e, m) if
-                                 is_functional_term(e) else subst(m, e) for e
-                                 in o.add_effects)
-                new_state = node.state.difference(dels).union(adds)
+        state = node.state
+
+        # TODO check that operators cannot have unbound variables in
+        # effects.
+        if self.stubborn_sets is not None:
+            actions = self.stubborn_sets.applicable(state, self.goal.state,
+                                                    build_index(state))
+        elif self.matcher == 'join':
+            index = RelationalIndex(state)
+            actions = ((o, m) for o in self.operators
+                       for m in join_match(o.conditions, index))
+        elif self.matcher == 'multi':
+            actions = self.multi_matcher.match(state)
+        else:
+            index = build_index(state)
+            actions = ((o, m) for o in self.operators
+                       for m in pattern_match(o.conditions, index))
+
+        if self.preferred is not None:
+            actions = self.preferred_first(state, actions)
+
+        for o, m in actions:
+            new_state = apply_operator(state, o, m)
+
+            if (self.numeric_reachable is not None and
+                    not self.numeric_reachable(new_state)):
+                continue
+
+            if self.compact:
+                # only keep the facts that actually changed.
+                yield CompactNode(new_state, node, (o, m),
+                                  node.cost() + o.cost,
+                                  dels=state.difference(new_state),
+                                  adds=new_state.difference(state),
+                                  checkpoint_interval=(
+                                      self.checkpoint_interval))
+            else:
                 yield Node(new_state, node, (o, m), node.cost() + o.cost)
 
+    def preferred_first(self, state, actions):
+        """
+        Orders the actions so the preferred ones come first, or, if preferred
+        is 'only', drops the other actions.
+        """
+        helpful = self.heuristic.helpful_actions(state)
+        others = []
+        for o, m in actions:
+            if self.heuristic.action_key(o, m) in helpful:
+                yield o, m
+            elif self.preferred == 'first':
+                others.append((o, m))
+        for o, m in others:
+            yield o, m
+
     def predecessors(self, node):
         for o in self.operators:
+            # Numeric effects cannot be regressed, so operators that change
+            # a fluent the goals refer to are only used in forward search.
+            if o.numeric_effects and refers_to_fluents(node.state, o):
+                continue
+
             # Rename variables to prevent collisions.
             # TODO figure out how to reverse this for printing plans
             o = o.standardized_copy()
@@ -247,16 +497,18 @@ class StateSpacePlanningProblem(Problem):
                     new_e = replace_constants(e, temp_m)
                     p = set((eq, e, temp_m[e]) for e in temp_m)
                     p.add(new_e)
-                    try:
-                        next(pattern_match(p, self.achievable,
-                                           partial=True))
-                    except Exception:
+                    if not match_exists(p, self.achievable, partial=True):
                         invalid = True
                         break
 
                 if invalid:
                     continue
 
+                # Discard states with facts that can never hold together.
+                if (self.mutexes is not None and
+                        self.mutexes.inconsistent(new_state.union(new_cons))):
+                    continue
+
                 # Add any surviving constraints back into the state
                 new_state = new_state.union(new_cons)
 
@@ -264,7 +516,7 @@ class StateSpacePlanningProblem(Problem):
 
     def goal_test(self, node, goal):
         index = build_index(node.state)
-        for m in pattern_match(goal.state, index, {}):
+        for m in pattern_match(goal.state, index, {}, limit=1):
             for v in m:
                 goal.action[1][v] = m[v]
             return True
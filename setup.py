@@ -3,4 +3,5 @@ from setuptools import setup
 setup(
     setup_requires=['pbr'],
     pbr=True,
+    extras_require={'numpy': ['numpy']},
 )
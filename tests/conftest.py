@@ -0,0 +1,8 @@
+import sys
+
+collect_ignore = []
+
+# the asyncio interface uses async generators and asyncio.get_running_loop
+# (Python 3.7+).
+if sys.version_info < (3, 7):
+    collect_ignore.append('test_async_search.py')
@@ -0,0 +1,77 @@
+import asyncio
+
+from py_plan.total_order import StateSpacePlanningProblem
+from py_plan.async_search import aiter_plans
+from py_plan.async_search import aiter_search
+from py_plan.async_search import plan_async
+from py_plan.problems.blocksworld import move_from_table
+from py_plan.problems.blocksworld import move_to_table
+from py_plan.problems.math_example import add_op
+
+start = [('on', 'A', 'Table'),
+         ('on', 'B', 'Table'),
+         ('on', 'C', 'A'),
+         ('block', 'A'),
+         ('block', 'B'),
+         ('block', 'C')]
+
+goal = [('on', 'A', 'B'),
+        ('on', 'B', 'C'),
+        ('on', 'C', 'Table')]
+
+operators = [move_from_table, move_to_table]
+
+
+def test_plan_async():
+    p = StateSpacePlanningProblem(start, goal, operators)
+
+    async def main():
+        ticks = []
+
+        async def ticker():
+            while True:
+                ticks.append(1)
+                await asyncio.sleep(0)
+
+        t = asyncio.ensure_future(ticker())
+        solution = await plan_async(p, slice_size=1)
+        t.cancel()
+        return solution, len(ticks)
+
+    solution, ticks = asyncio.run(main())
+    assert solution.cost() == 3
+    assert ticks > 1
+
+
+def test_aiter_search():
+    p = StateSpacePlanningProblem(start, goal, operators)
+
+    async def main():
+        async for solution in aiter_search(p):
+            return solution
+
+    assert asyncio.run(main()).cost() == 3
+
+
+def test_search_cancellation():
+    # there is no plan that produces a negative number, so search runs
+    # until it is cancelled.
+    p = StateSpacePlanningProblem([('Number', 1)], [('Number', -1)],
+                                  [add_op])
+
+    async def consume(plans):
+        async for solution in plans:
+            return solution
+
+    async def main():
+        for plans in [aiter_plans(p), aiter_search(p)]:
+            task = asyncio.ensure_future(consume(plans))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            assert task.cancelled()
+
+    asyncio.run(main())
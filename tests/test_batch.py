@@ -0,0 +1,44 @@
+from operator import add
+from operator import eq
+from operator import ge
+from operator import ne
+from operator import or_
+
+from py_plan.batch import batch_evaluate
+from py_plan.batch import column_array
+
+
+def test_batch_evaluate():
+    columns = {'?x': ['A', 'B', 'C', 'A'],
+               '?y': ['B', 'B', 'A', 'A']}
+    mask = batch_evaluate((ne, '?x', '?y'), columns)
+    assert list(mask) == [True, False, True, False]
+    assert list(batch_evaluate((or_, (ne, '?x', 'A'), (ne, '?y', 'A')),
+                               columns)) == [True, True, True, False]
+
+    columns = {'?m': [5, 3, 10], '?c': [4, 4, 2.5]}
+    assert list(batch_evaluate((ge, (add, '?m', 1), '?c'),
+                               columns)) == [True, True, True]
+    assert list(batch_evaluate((ge, '?m', (add, '?c', 1)),
+                               columns)) == [True, False, True]
+
+
+def test_batch_evaluate_fallback():
+    # mixed types and arbitrary callables are evaluated row by row.
+    def even(x):
+        return x % 2 == 0
+
+    mask = batch_evaluate((ne, '?x', 1), {'?x': [1, 'A']})
+    assert list(mask) == [False, True]
+    mask = batch_evaluate((even, '?x'), {'?x': [1, 2]})
+    assert list(mask) == [False, True]
+
+
+def test_column_array_mixed_numbers():
+    # ints that do not fit a float64 must not be rounded by mixing in floats.
+    big = 2 ** 53 + 1
+    column = column_array([big, 0.5])
+    assert column.dtype == object
+    assert column[0] == big
+    assert list(batch_evaluate((eq, '?x', big), {'?x': [big, 0.5]})) == [
+        True, False]
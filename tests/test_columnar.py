@@ -0,0 +1,79 @@
+from operator import ne
+
+import pytest
+
+from py_plan.pattern_matching import build_index
+from py_plan.pattern_matching import pattern_match
+from py_plan.problems.blocksworld import move
+from py_plan.problems.blocksworld import move_from_table
+from py_plan.problems.blocksworld import move_to_table
+
+np = pytest.importorskip('numpy')
+
+from py_plan.columnar import ColumnarIndex  # noqa: E402
+from py_plan.columnar import columnar_match  # noqa: E402
+
+start = [('on', 'A', 'Table'),
+         ('on', 'B', 'Table'),
+         ('on', 'C', 'A'),
+         ('block', 'A'),
+         ('block', 'B'),
+         ('block', 'C'),
+         'hand-empty',
+         (('value', 'x'), 5)]
+
+operators = [move, move_from_table, move_to_table]
+
+
+def matches(ms):
+    return sorted(tuple(sorted(m.items())) for m in ms)
+
+
+def test_columnar_index_behind_pattern_match():
+    index = ColumnarIndex(start)
+    assert index.relation('on', 2).dtype == np.int32
+    for key in build_index(start):
+        assert sorted(index[key], key=repr) == sorted(build_index(start)[key],
+                                                      key=repr)
+    assert ('on', 'D', '?') not in index
+
+    for o in operators:
+        expected = matches(pattern_match(o.conditions, build_index(start)))
+        assert matches(pattern_match(o.conditions, index)) == expected
+
+
+def test_columnar_match_agrees_with_pattern_match():
+    index = ColumnarIndex(start)
+    for o in operators:
+        expected = matches(pattern_match(o.conditions, build_index(start)))
+        assert matches(columnar_match(o.conditions, index)) == expected
+
+    pattern = [('on', '?x', '?x'), ('not', ('on', '?y', '?y')),
+               (ne, '?x', 'A')]
+    kb = [('on', 'A', 'A'), ('on', 'B', 'B')]
+    assert matches(columnar_match(pattern, ColumnarIndex(kb))) == []
+
+    sub = {'?b': 'C'}
+    assert (matches(columnar_match(move_to_table.conditions, index, sub)) ==
+            matches(pattern_match(move_to_table.conditions,
+                                  build_index(start), sub)))
+
+
+def test_symbol_types():
+    index = ColumnarIndex([('val', 'a', 1), ('val', 'b', 1.0),
+                           ('val', 'c', True)])
+    values = {f[1]: f[2] for f in index[('val', '?', '?')]}
+    assert [type(values[k]) for k in 'abc'] == [int, float, bool]
+    assert sorted(f[1] for f in index[('val', '?', True)]) == ['a', 'b', 'c']
+
+
+def test_mixed_numbers():
+    # equal values of different types match, as with build_index.
+    facts = [('Cost', 'b1', 10.0), ('Cost', 'b2', 10), ('Cost', 'b3', 5),
+             ('Price', 'b1', 10), ('Price', 'b3', 5.0)]
+    index = ColumnarIndex(facts)
+    for q in [[('Cost', '?b', 10)], [('Cost', '?b', 10.0)],
+              [('Cost', '?b', '?c'), ('Price', '?b', '?c')]]:
+        expected = [m['?b'] for m in pattern_match(q, build_index(facts))]
+        found = [m['?b'] for m in columnar_match(q, index)]
+        assert sorted(found) == sorted(expected)
@@ -0,0 +1,30 @@
+from py_search.uninformed import breadth_first_search
+
+from py_plan.total_order import StateSpacePlanningProblem
+from py_plan.external import external_breadth_first_search
+from py_plan.problems.blocksworld import move_from_table
+from py_plan.problems.blocksworld import move_to_table
+
+start = [('on', 'A', 'Table'),
+         ('on', 'B', 'Table'),
+         ('on', 'C', 'A'),
+         ('block', 'A'),
+         ('block', 'B'),
+         ('block', 'C')]
+
+goal = [('on', 'A', 'B'),
+        ('on', 'B', 'C'),
+        ('on', 'C', 'Table')]
+
+
+def test_external_breadth_first_search(tmpdir):
+    p = StateSpacePlanningProblem(start, goal, [move_from_table,
+                                                move_to_table])
+
+    sol = next(breadth_first_search(p))
+    esol = next(external_breadth_first_search(p, directory=str(tmpdir),
+                                              chunk_size=5))
+
+    assert esol.state_node.state == sol.state_node.state
+    assert len(esol.path()) == len(sol.path())
+    assert esol.cost() == sol.cost()
@@ -0,0 +1,72 @@
+from operator import ge
+
+from py_search.base import Node
+from py_search.informed import best_first_search
+
+from py_plan.base import Operator
+from py_plan.grounding import ground
+from py_plan.landmarks import find_landmarks
+from py_plan.landmarks import LandmarkCountHeuristic
+from py_plan.total_order import StateSpacePlanningProblem
+from py_plan.problems.blocksworld import move
+from py_plan.problems.blocksworld import move_from_table
+from py_plan.problems.blocksworld import move_to_table
+
+start = [('on', 'A', 'Table'),
+         ('on', 'B', 'Table'),
+         ('on', 'C', 'A'),
+         ('block', 'A'),
+         ('block', 'B'),
+         ('block', 'C')]
+
+goal = [('on', 'A', 'B'),
+        ('on', 'B', 'C'),
+        ('on', 'C', 'Table')]
+
+operators = [move, move_from_table, move_to_table]
+
+
+def test_ground():
+    actions, facts = ground(operators, start)
+    assert all(a.pos_cond.issubset(facts) for a in actions)
+    assert set(goal).issubset(facts)
+
+    drive = Operator('drive', [('at', '?x'), ('road', '?x', '?y')],
+                     [('at', '?y'), ('not', ('at', '?x'))])
+    roads = [('at', 'a'), ('road', 'a', 'b'), ('road', 'b', 'c')]
+    actions, facts = ground([drive], roads, layer_limit=1)
+    assert ('at', 'b') in facts and ('at', 'c') not in facts
+    actions, facts = ground([drive], roads)
+    assert ('at', 'c') in facts and len(actions) == 2
+
+
+def test_ground_fluents():
+    # Money changes, so buying the book is reachable even though the book
+    # costs more than the initial money, and buy has no Money condition.
+    buy = Operator('buy', [('Money', '?m'), ('Cost', '?b', '?c'),
+                           (ge, '?m', '?c')],
+                   [('Own', '?b'), ('decrease', ('Money',), '?c')])
+    earn = Operator('earn', [], [('increase', ('Money',), 10)])
+    actions, facts = ground([buy, earn], [('Money', 30), ('Cost', 'b1', 50)])
+    assert ('Own', 'b1') in facts
+    bought = [a for a in actions if a.operator is buy]
+    assert len(bought) == 1
+    assert bought[0].pos_cond == set([('Cost', 'b1', 50)])
+
+
+def test_landmarks():
+    graph = find_landmarks(operators, start, goal)
+    assert set(goal).issubset(graph.landmarks)
+
+    h = LandmarkCountHeuristic(operators, start, goal)
+    root = Node(frozenset(start))
+    unaccepted = graph.landmarks - set(start)
+    assert h(root) == len(unaccepted)
+
+    p = StateSpacePlanningProblem(start, goal, operators, heuristic=h)
+    assert next(best_first_search(p)).cost() == 3
+
+    # the accepted landmarks are cached by the heuristic, not in the node.
+    node = Node(frozenset(start), extra='keep')
+    h(node)
+    assert node.extra == 'keep'
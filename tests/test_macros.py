@@ -0,0 +1,96 @@
+from operator import ne
+
+from py_search.uninformed import breadth_first_search
+
+from py_plan.base import Operator
+from py_plan.macros import MacroLearner
+from py_plan.macros import MacroOperator
+from py_plan.macros import build_macro
+from py_plan.macros import expand_plan
+from py_plan.total_order import StateSpacePlanningProblem
+from py_plan.total_order import execute_plan
+
+load = Operator('load',
+                [('At', '?c', '?a'),
+                 ('At', '?p', '?a'),
+                 ('Cargo', '?c'),
+                 ('Plane', '?p'),
+                 ('Airport', '?a')],
+                [('not', ('At', '?c', '?a')),
+                 ('In', '?c', '?p')])
+
+unload = Operator('unload',
+                  [('In', '?c', '?p'),
+                   ('At', '?p', '?a'),
+                   ('Cargo', '?c'),
+                   ('Plane', '?p'),
+                   ('Airport', '?a')],
+                  [('At', '?c', '?a'),
+                   ('not', ('In', '?c', '?p'))])
+
+fly = Operator('fly',
+               [('At', '?p', '?from'),
+                ('Plane', '?p'),
+                ('Airport', '?from'),
+                ('Airport', '?to'),
+                (ne, '?from', '?to')],
+               [('not', ('At', '?p', '?from')),
+                ('At', '?p', '?to')])
+
+operators = [load, unload, fly]
+
+
+def cargo(c, p, a, b):
+    start = [('At', c, a), ('At', p, a), ('Cargo', c), ('Plane', p),
+             ('Airport', a), ('Airport', b)]
+    return start, [('At', c, b)]
+
+
+def learned():
+    learner = MacroLearner(max_macros=2)
+    for names in [('C1', 'P1', 'SFO', 'JFK'), ('C2', 'P2', 'LAX', 'ORD')]:
+        start, goal = cargo(*names)
+        p = StateSpacePlanningProblem(start, goal, operators)
+        learner.observe(next(breadth_first_search(p)).path())
+    return learner
+
+
+def test_macro_learner():
+    learner = learned()
+    macros = learner.macros()
+    assert len(macros) == 2
+    assert all(isinstance(m, MacroOperator) for m in macros)
+    assert [o.name for o, _ in macros[0].steps] == ['load', 'fly', 'unload']
+
+    start, goal = cargo('C3', 'P3', 'BOS', 'SEA')
+    p = StateSpacePlanningProblem(start, goal, learner.operators(operators))
+    plan = next(breadth_first_search(p)).path()
+    assert len(plan) == 1
+
+    expanded = expand_plan(plan)
+    assert [o.name for o, _ in expanded] == ['load', 'fly', 'unload']
+    assert set(goal).issubset(execute_plan(start, expanded))
+
+
+def test_macro_regression():
+    learner = learned()
+    start, goal = cargo('C3', 'P3', 'BOS', 'SEA')
+    p = StateSpacePlanningProblem(start, goal, learner.operators(operators))
+    plan = next(breadth_first_search(p, forward=False, backward=True)).path()
+    assert len(plan) == 1
+    assert isinstance(plan[0][0], MacroOperator)
+
+    expanded = expand_plan(plan)
+    assert [o.name for o, _ in expanded] == ['load', 'fly', 'unload']
+    load_binding = expanded[0][1]
+    fly_binding = expanded[1][1]
+    assert load_binding['?p'] == fly_binding['?p'] == 'P3'
+    assert load_binding['?a'] == fly_binding['?from'] == 'BOS'
+
+
+def test_macro_names():
+    same = build_macro([(fly, {'?p': '?m0', '?from': '?m1', '?to': '?m2'}),
+                        (fly, {'?p': '?m0', '?from': '?m2', '?to': '?m3'})])
+    other = build_macro([(fly, {'?p': '?m0', '?from': '?m1', '?to': '?m2'}),
+                         (fly, {'?p': '?m3', '?from': '?m4', '?to': '?m5'})])
+    assert same.name != other.name
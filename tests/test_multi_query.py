@@ -0,0 +1,43 @@
+from py_search.uninformed import breadth_first_search
+
+from py_plan.pattern_matching import build_index
+from py_plan.pattern_matching import pattern_match
+from py_plan.multi_query import MultiQueryMatcher
+from py_plan.total_order import StateSpacePlanningProblem
+from py_plan.problems.blocksworld import move
+from py_plan.problems.blocksworld import move_from_table
+from py_plan.problems.blocksworld import move_to_table
+
+start = [('on', 'A', 'Table'),
+         ('on', 'B', 'Table'),
+         ('on', 'C', 'A'),
+         ('block', 'A'),
+         ('block', 'B'),
+         ('block', 'C')]
+
+goal = [('on', 'A', 'B'),
+        ('on', 'B', 'C'),
+        ('on', 'C', 'Table')]
+
+operators = [move, move_from_table, move_to_table]
+
+
+def actions(pairs):
+    return sorted((o.name, tuple(sorted(m.items()))) for o, m in pairs)
+
+
+def test_multi_query_agrees_with_pattern_match():
+    matcher = MultiQueryMatcher(operators)
+    expected = actions((o, m) for o in operators
+                       for m in pattern_match(o.conditions,
+                                              build_index(start)))
+    assert actions(matcher.match(start)) == expected
+
+    # the operators share their leading steps.
+    n_steps = sum(len(o.conditions) for o in operators)
+    assert matcher.root.size() - 1 < n_steps
+
+
+def test_multi_matcher():
+    p = StateSpacePlanningProblem(start, goal, operators, matcher='multi')
+    assert next(breadth_first_search(p)).cost() == 3
@@ -0,0 +1,57 @@
+from py_search.uninformed import breadth_first_search
+
+from py_plan.base import Operator
+from py_plan.mutex import Mutexes
+from py_plan.total_order import StateSpacePlanningProblem
+
+pickup = Operator('pickup', [('ontable', '?x'), ('hand-empty')],
+                  [('not', ('ontable', '?x')), ('not', ('hand-empty')),
+                   ('holding', '?x')])
+
+putdown = Operator('putdown', [('holding', '?x')],
+                   [('not', ('holding', '?x')), ('ontable', '?x'),
+                    ('hand-empty')])
+
+drive = Operator('drive', [('at', '?x'), ('road', '?x', '?y')],
+                 [('at', '?y'), ('not', ('at', '?x'))])
+
+roads = [('at', 'a'), ('road', 'a', 'b'), ('road', 'b', 'c')]
+
+
+def test_mutex():
+    m = Mutexes([pickup, putdown], [('ontable', 'A'), ('ontable', 'B'),
+                                    ('hand-empty')])
+    assert m.mutex(('holding', 'A'), ('hand-empty'))
+    assert m.mutex(('holding', 'A'), ('holding', 'B'))
+    assert not m.mutex(('holding', 'A'), ('ontable', 'B'))
+    assert m.mutex(('holding', 'C'), ('ontable', 'B'))
+
+    assert m.inconsistent([('holding', '?x'), ('hand-empty')])
+    assert m.inconsistent([('holding', '?x'), ('ontable', '?x')])
+    assert not m.inconsistent([('holding', '?x'), ('ontable', '?y')])
+
+
+def test_mutex_regression():
+    p = StateSpacePlanningProblem(roads, [('at', 'c')], [drive])
+    mp = StateSpacePlanningProblem(roads, [('at', 'c')], [drive],
+                                   mutexes=True)
+
+    sol = next(breadth_first_search(p, forward=False, backward=True))
+    msol = next(breadth_first_search(mp, forward=False, backward=True))
+    assert len(msol.path()) == len(sol.path()) == 2
+
+    # regressing drive into ('at', 'c') gives ('at', '?x') with ?x != c,
+    # which is mutex with ('at', 'b') only because of the constraint.
+    goal = [('at', 'b'), ('at', 'c')]
+    p = StateSpacePlanningProblem(roads, goal, [drive])
+    mp = StateSpacePlanningProblem(roads, goal, [drive], mutexes=True)
+    assert len(list(p.predecessors(p.goal))) == 2
+    assert list(mp.predecessors(mp.goal)) == []
+
+
+def test_mutex_fluents():
+    # Money takes new values, so they are not mutex with anything.
+    buy = Operator('buy', [('Money', '?m'), ('Cost', '?b', '?c')],
+                   [('Own', '?b'), ('decrease', ('Money',), '?c')])
+    m = Mutexes([buy], [('Money', 30), ('Cost', 'b1', 10)])
+    assert not m.inconsistent([('Money', 20), ('Own', 'b1')])
@@ -0,0 +1,55 @@
+from operator import add
+from operator import ge
+
+from py_search.uninformed import breadth_first_search
+
+from py_plan.base import Operator
+from py_plan.total_order import StateSpacePlanningProblem
+from py_plan.total_order import execute_plan
+
+buy = Operator('buy',
+               [('Book', '?b'),
+                ('Cost', '?b', '?c'),
+                ('Money', '?m'),
+                ('not', ('Own', '?b')),
+                (ge, '?m', '?c')],
+               [('Own', '?b'),
+                ('decrease', ('Money',), '?c')])
+
+start = [('Money', 30)]
+for i in range(5):
+    start += [('Book', 'book%i' % i), ('Cost', 'book%i' % i, 10)]
+
+
+def test_numeric_effects():
+    assert buy.numeric_effects == [('decrease', ('Money',), '?c')]
+    assert buy.add_effects == set([('Own', '?b')])
+
+    p = StateSpacePlanningProblem(start, [('Own', 'book2'), ('Own', 'book3')],
+                                  [buy])
+    solution = next(breadth_first_search(p))
+    assert solution.cost() == 2
+
+    final = execute_plan(start, solution.path())
+    assert ('Money', 10) in final
+    assert ('Money', 30) not in final
+
+
+def test_numeric_reachability():
+    # money can only decrease, so it can never reach 40.
+    goals = [('Money', '?m'), (ge, '?m', 40)]
+    p = StateSpacePlanningProblem(start, goals, [buy])
+    assert list(p.successors(p.initial)) == []
+    assert next(breadth_first_search(p), None) is None
+
+    goals = [('Money', 10)]
+    p = StateSpacePlanningProblem(start, goals, [buy])
+    assert next(breadth_first_search(p)).cost() == 2
+
+
+def test_numeric_reachability_ordinary_effects():
+    # work sets Money with ordinary effects, so Money can go up.
+    work = Operator('work', [('Money', '?m')],
+                    [('not', ('Money', '?m')), ('Money', (add, '?m', 10))])
+    p = StateSpacePlanningProblem(start, [('Money', 50)], [work, buy])
+    assert next(breadth_first_search(p)).cost() == 2
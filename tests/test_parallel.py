@@ -0,0 +1,50 @@
+import pytest
+from py_search.uninformed import breadth_first_search
+
+from py_plan.base import Operator
+from py_plan.total_order import StateSpacePlanningProblem
+from py_plan.parallel import hash_distributed_search
+from py_plan.parallel import state_owner
+from py_plan.problems.blocksworld import move_from_table
+from py_plan.problems.blocksworld import move_to_table
+
+start = [('on', 'A', 'Table'),
+         ('on', 'B', 'Table'),
+         ('on', 'C', 'A'),
+         ('block', 'A'),
+         ('block', 'B'),
+         ('block', 'C')]
+
+goal = [('on', 'A', 'B'),
+        ('on', 'B', 'C'),
+        ('on', 'C', 'Table')]
+
+
+def test_state_owner():
+    s = frozenset(start)
+    assert state_owner(s, 4) == state_owner(frozenset(reversed(start)), 4)
+    assert 0 <= state_owner(s, 4) < 4
+
+
+def test_hash_distributed_search():
+    p = StateSpacePlanningProblem(start, goal, [move_from_table,
+                                                move_to_table])
+
+    sol = next(breadth_first_search(p))
+    psol = next(hash_distributed_search(p, num_workers=2))
+
+    assert psol.cost() == sol.cost()
+    assert psol.state_node.state == sol.state_node.state
+
+
+def explode(x):
+    raise ZeroDivisionError(x)
+
+
+def test_hash_distributed_search_error():
+    bad = Operator('bad', [('block', '?x'), (explode, '?x')],
+                   [('used', '?x')])
+    p = StateSpacePlanningProblem(start, goal, [move_from_table,
+                                                move_to_table, bad])
+    with pytest.raises(ZeroDivisionError):
+        next(hash_distributed_search(p, num_workers=2))
@@ -0,0 +1,59 @@
+import os
+
+from py_search.informed import best_first_search
+
+from py_plan.base import Operator
+from py_plan.pattern_databases import PatternDatabase
+from py_plan.pattern_databases import PDBHeuristic
+from py_plan.search import weighted_astar_steps
+from py_plan.total_order import StateSpacePlanningProblem
+from py_plan.problems.blocksworld import move
+from py_plan.problems.blocksworld import move_from_table
+from py_plan.problems.blocksworld import move_to_table
+
+start = [('on', 'A', 'Table'),
+         ('on', 'B', 'Table'),
+         ('on', 'C', 'A'),
+         ('block', 'A'),
+         ('block', 'B'),
+         ('block', 'C')]
+
+goal = [('on', 'A', 'B'),
+        ('on', 'B', 'C'),
+        ('on', 'C', 'Table')]
+
+operators = [move, move_from_table, move_to_table]
+
+
+def test_pattern_database(tmpdir):
+    pdb = PatternDatabase(operators, start, goal, ['on'])
+    assert 0 < pdb.h(start) <= 3
+    assert pdb.h(goal) == 0
+
+    path = os.path.join(str(tmpdir), 'on.pdb')
+    pdb.save(path)
+    mapped = PatternDatabase(operators, start, goal, ['on'], path=path)
+    assert len(mapped) == len(pdb)
+    assert mapped.h(start) == pdb.h(start)
+    assert mapped.h([('on', 'X', 'Y')]) == 0
+    mapped.table.close()
+
+    h = PDBHeuristic([pdb, PatternDatabase(operators, start, goal, ['on'],
+                                           objects=['A'])])
+    p = StateSpacePlanningProblem(start, goal, operators, heuristic=h)
+    assert next(best_first_search(p)).cost() == 3
+
+
+def test_pattern_database_max_states():
+    drive = Operator('drive', [('at', '?x'), ('road', '?x', '?y')],
+                     [('at', '?y'), ('not', ('at', '?x'))])
+    start = [('at', 'a'), ('road', 'a', 'b'), ('road', 'b', 'c'),
+             ('road', 'c', 'd')]
+    goal = [('at', 'd')]
+    pdb = PatternDatabase([drive], start, goal, ['at'], max_states=2)
+    assert [pdb.h([('at', x)]) for x in 'abcd'] == [1, 0, 0, 0]
+
+    h = PDBHeuristic([pdb])
+    p = StateSpacePlanningProblem(start, goal, [drive])
+    solutions = [s for s in weighted_astar_steps(p, h) if s is not None]
+    assert solutions and solutions[0].cost() == 3
@@ -2,6 +2,9 @@ from operator import ne
 from operator import add
 from py_plan.pattern_matching import pattern_match
 from py_plan.pattern_matching import build_index
+from py_plan.pattern_matching import match_exists
+from py_plan.pattern_matching import count_matches
+from py_plan.pattern_matching import analyze_pattern
 from pprint import pprint
 from operator import add
 
@@ -23,3 +26,62 @@ def test_partial_match():
 
 def test_unify():
     pass
+
+
+def test_negation():
+    kb = [('on', 'A', 'B'), ('on', 'B', 'Table'), ('block', 'A'),
+          ('block', 'B')]
+    index = build_index(kb)
+
+    # ground negations
+    assert list(pattern_match([('not', ('on', 'A', 'B'))], index)) == []
+    assert list(pattern_match([('not', ('on', 'B', 'A'))], index)) == [{}]
+
+    # partially bound negations
+    q = [('block', '?x'), ('not', ('on', '?y', '?x'))]
+    assert list(pattern_match(q, index)) == [{'?x': 'A'}]
+    q = [('block', '?x'), ('not', ('on', '?x', '?x'))]
+    assert len(list(pattern_match(q, index))) == 2
+
+
+def test_query_modes():
+    kb = [('on', 'A', 'B'), ('on', 'B', 'C'), ('on', 'C', 'Table')]
+    index = build_index(kb)
+    q = [('on', '?x', '?y')]
+
+    assert len(list(pattern_match(q, index, limit=2))) == 2
+    assert (sorted(pattern_match(q, index, project=['?y', '?x'])) ==
+            [('B', 'A'), ('C', 'B'), ('Table', 'C')])
+    assert count_matches(q, index) == 3
+    assert match_exists(q, index)
+    assert not match_exists([('on', '?x', 'A')], index)
+
+
+def test_pattern_cache():
+    q = [('on', '?x', '?y'), ('not', ('on', '?z', '?x')), (ne, '?x', '?y')]
+    assert analyze_pattern(q) is analyze_pattern(list(reversed(q)))
+
+    index = build_index([('on', 'A', 'B'), ('on', 'B', 'C')])
+    for _ in range(2):
+        assert list(pattern_match(q, index)) == [{'?x': 'A', '?y': 'B'}]
+
+
+def test_pattern_cache_threads():
+    from threading import Thread
+    index = build_index([('on', 'A', 'B'), ('on', 'B', 'C')])
+    errors = []
+
+    def work(offset):
+        try:
+            for i in range(2000):
+                q = [('on', '?x', '?y'), (ne, '?x', 'X%i' % (i + offset))]
+                assert len(list(pattern_match(q, index))) == 2
+        except Exception as e:
+            errors.append(e)
+
+    threads = [Thread(target=work, args=(i * 500,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
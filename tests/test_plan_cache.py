@@ -0,0 +1,69 @@
+from operator import ne
+
+import pytest
+
+from py_plan.base import Operator
+from py_plan.total_order import StateSpacePlanningProblem
+from py_plan.plan_cache import PlanCache
+from py_plan.plan_cache import operator_signature
+from py_plan.problems.blocksworld import move_from_table
+from py_plan.problems.blocksworld import move_to_table
+
+operators = [move_from_table, move_to_table]
+
+
+def blocks(a, b, c):
+    start = [('on', a, 'Table'),
+             ('on', b, 'Table'),
+             ('on', c, a),
+             ('block', a),
+             ('block', b),
+             ('block', c)]
+    goal = [('on', a, b),
+            ('on', b, c),
+            ('on', c, 'Table')]
+    return StateSpacePlanningProblem(start, goal, operators)
+
+
+def test_plan_cache_renaming(tmpdir):
+    cache = PlanCache(max_size=10, path=str(tmpdir.join('plans')))
+    plan = cache.plan(blocks('A', 'B', 'C'))
+    assert len(plan) == 3
+    assert cache.misses == 1
+
+    # same problem with renamed objects
+    renamed = cache.plan(blocks('X', 'Y', 'Z'))
+    assert cache.hits == 1
+    assert [o for o, _ in renamed] == [o for o, _ in plan]
+    assert renamed[0][1]['?b'] in ('X', 'Y', 'Z')
+    cache.close()
+
+    # plans persist on disk
+    cache = PlanCache(max_size=10, path=str(tmpdir.join('plans')))
+    p = blocks('D', 'E', 'F')
+    assert cache.get(p.initial.state, p.goal.state, p.operators)
+    assert cache.hits == 1
+    cache.close()
+
+
+def test_operator_signature():
+    move = Operator('move', [('at', '?x'), (ne, '?x', '?y')],
+                    [('at', '?y'), ('not', ('at', '?x'))])
+    assert '0x' not in operator_signature([move])
+
+    local = Operator('move', [('at', '?x'), (lambda x: x, '?x')],
+                     [('at', '?y'), ('not', ('at', '?x'))])
+    with pytest.raises(ValueError):
+        operator_signature([local])
+
+
+def test_plan_cache_unnamed_functions():
+    cache = PlanCache()
+    move = Operator('move', [('at', '?x'), ('road', '?x', '?y'),
+                             (lambda x, y: x != y, '?x', '?y')],
+                    [('at', '?y'), ('not', ('at', '?x'))])
+    p = StateSpacePlanningProblem([('at', 'a'), ('road', 'a', 'b')],
+                                  [('at', 'b')], [move])
+    assert len(cache.plan(p)) == 1
+    assert len(cache.plan(p)) == 1
+    assert cache.hits == 0 and len(cache.memory) == 0
@@ -0,0 +1,53 @@
+from operator import ne
+
+from py_search.uninformed import breadth_first_search
+
+from py_plan.pattern_matching import build_index
+from py_plan.pattern_matching import pattern_match
+from py_plan.relational import RelationalIndex
+from py_plan.relational import join_match
+from py_plan.total_order import StateSpacePlanningProblem
+from py_plan.problems.blocksworld import move
+from py_plan.problems.blocksworld import move_from_table
+from py_plan.problems.blocksworld import move_to_table
+
+start = [('on', 'A', 'Table'),
+         ('on', 'B', 'Table'),
+         ('on', 'C', 'A'),
+         ('block', 'A'),
+         ('block', 'B'),
+         ('block', 'C')]
+
+goal = [('on', 'A', 'B'),
+        ('on', 'B', 'C'),
+        ('on', 'C', 'Table')]
+
+operators = [move, move_from_table, move_to_table]
+
+
+def matches(ms):
+    return sorted(tuple(sorted(m.items())) for m in ms)
+
+
+def test_join_match_agrees_with_pattern_match():
+    for o in operators:
+        expected = matches(pattern_match(o.conditions, build_index(start)))
+        actual = matches(join_match(o.conditions, RelationalIndex(start)))
+        assert actual == expected
+
+    pattern = [('on', '?x', '?x'), ('not', ('on', '?y', '?y')),
+               (ne, '?x', 'A')]
+    kb = [('on', 'A', 'A'), ('on', 'B', 'B')]
+    assert (matches(join_match(pattern, RelationalIndex(kb))) ==
+            matches(pattern_match(pattern, build_index(kb))) == [])
+
+    sub = {'?b': 'C'}
+    assert (matches(join_match(move_to_table.conditions,
+                               RelationalIndex(start), sub)) ==
+            matches(pattern_match(move_to_table.conditions,
+                                  build_index(start), sub)))
+
+
+def test_join_matcher():
+    p = StateSpacePlanningProblem(start, goal, operators, matcher='join')
+    assert next(breadth_first_search(p)).cost() == 3
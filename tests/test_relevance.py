@@ -0,0 +1,68 @@
+from operator import add
+from operator import ge
+
+from py_search.uninformed import breadth_first_search
+
+from py_plan.base import Operator
+from py_plan.grounding import GroundingLimitExceeded
+from py_plan.relevance import reduce_problem
+from py_plan.total_order import StateSpacePlanningProblem
+from py_plan.total_order import execute_plan
+
+buy = Operator('buy',
+               [('Book', '?b'),
+                ('Cost', '?b', '?c'),
+                ('Money', '?m'),
+                (ge, '?m', '?c')],
+               [('Own', '?b'),
+                ('decrease', ('Money',), '?c')])
+
+earn = Operator('earn', [('Job', '?j')], [('increase', ('Money',), 10)])
+
+start = [('Money', 30), ('Job', 'j')]
+for i in range(30):
+    book = "book%s" % i
+    start += [('Book', book), ('Cost', book, 10)]
+
+goal = [('Own', 'book2')]
+
+
+def test_reduce_problem():
+    state, operators = reduce_problem(start, goal, [buy, earn])
+    assert state == frozenset([('Money', 30), ('Book', 'book2'),
+                               ('Cost', 'book2', 10), ('Job', 'j')])
+    assert operators == [buy, earn]
+
+    try:
+        reduce_problem(start, goal, [buy], action_limit=10)
+        assert False
+    except GroundingLimitExceeded:
+        pass
+
+
+def test_relevance():
+    p = StateSpacePlanningProblem(start, goal, [buy], relevance=True)
+    assert len(p.initial.state) == 3
+
+    sol = next(breadth_first_search(p))
+    plan = sol.path()
+    assert len(plan) == 1
+    assert set(goal).issubset(execute_plan(start, plan))
+
+
+def test_relevance_changed_money():
+    # the book costs more than the initial money, so earning is needed.
+    state = [('Money', 30), ('Job', 'j'), ('Book', 'b1'), ('Cost', 'b1', 50)]
+    goals = [('Own', 'b1')]
+    reduced, operators = reduce_problem(state, goals, [buy, earn])
+    assert reduced == frozenset(state)
+    assert operators == [buy, earn]
+
+    p = StateSpacePlanningProblem(state, goals, [buy, earn], relevance=True)
+    plan = next(breadth_first_search(p)).path()
+    assert [o.name for o, _ in plan] == ['earn', 'earn', 'buy']
+
+    work = Operator('work', [('Money', '?m')],
+                    [('not', ('Money', '?m')), ('Money', (add, '?m', 10))])
+    reduced, operators = reduce_problem(state, goals, [buy, work])
+    assert operators == [buy, work]
@@ -0,0 +1,54 @@
+from py_plan.base import Operator
+from py_plan.heuristics import GoalCountHeuristic
+from py_plan.replanning import Replanner
+from py_plan.total_order import apply_operator
+from py_plan.total_order import execute_plan
+
+drive = Operator('drive', [('at', '?x'), ('road', '?x', '?y')],
+                 [('at', '?y'), ('not', ('at', '?x'))])
+
+roads = [('road', 'a', 'b'), ('road', 'b', 'c'), ('road', 'c', 'd'),
+         ('road', 'a', 'x'), ('road', 'x', 'b')]
+
+goal = [('at', 'd')]
+
+
+def test_replanner():
+    replan = Replanner(goal, [drive], heuristic=GoalCountHeuristic(goal))
+    state = frozenset(roads + [('at', 'a')])
+    plan = replan(state)
+    assert replan.last == 'searched' and len(plan) == 3
+
+    # the world moved along the plan
+    o, m = plan[0]
+    state = apply_operator(state, o, m)
+    assert len(replan(state)) == 2
+    assert replan.last == 'repaired'
+
+    # an unrelated fact changed
+    assert len(replan(state.union([('rain',)]))) == 2
+    assert replan.last == 'repaired'
+
+    # the world moved off the plan, to a state one step from it
+    state = frozenset(roads + [('at', 'x')])
+    plan = replan(state)
+    assert replan.last == 'stitched' and len(plan) == 3
+    assert ('at', 'd') in execute_plan(state, plan)
+    assert replan.searches == 2 and replan.repairs == 2
+
+    # no plan
+    assert replan(frozenset([('at', 'a')])) is None
+    assert replan.last is None
+
+
+def test_replanner_stitching_cost():
+    # from y, the known suffix through p1 is longer than a fresh plan.
+    roads = [('road', 's', 'p1'), ('road', 'p1', 'p2'), ('road', 'p2', 'p3'),
+             ('road', 'p3', 'd'), ('road', 'y', 'p1'), ('road', 'y', 'q'),
+             ('road', 'q', 'r'), ('road', 'r', 'd')]
+    replan = Replanner(goal, [drive], heuristic=GoalCountHeuristic(goal),
+                       cache_size=6)
+    assert len(replan(frozenset(roads + [('at', 's')]))) == 4
+    plan = replan(frozenset(roads + [('at', 'y')]))
+    assert replan.last == 'searched' and len(plan) == 3
+    assert len(replan.known) == 6
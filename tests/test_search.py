@@ -0,0 +1,203 @@
+from operator import ge
+from threading import Event
+
+from py_search.base import Node
+from py_search.base import PriorityQueue
+from py_search.uninformed import breadth_first_search
+
+from py_plan.total_order import StateSpacePlanningProblem
+from py_plan.heuristics import GoalCountHeuristic
+from py_plan.heuristics import FFHeuristic
+from py_plan.heuristics import CachedHeuristic
+from py_plan.search import anytime_search
+from py_plan.search import enforced_hill_climbing
+from py_plan.search import lazy_best_first_search
+from py_plan.search import weighted_astar_steps
+from py_plan.search import best_first_search
+from py_plan.search import BucketQueue
+from py_plan.search import open_list
+from py_plan.search import bidirectional_search
+from py_plan.base import Operator
+from py_plan.total_order import execute_plan
+from py_plan.problems.blocksworld import move_from_table
+from py_plan.problems.blocksworld import move_to_table
+
+start = [('on', 'A', 'Table'),
+         ('on', 'B', 'Table'),
+         ('on', 'C', 'A'),
+         ('block', 'A'),
+         ('block', 'B'),
+         ('block', 'C')]
+
+goal = [('on', 'A', 'B'),
+        ('on', 'B', 'C'),
+        ('on', 'C', 'Table')]
+
+operators = [move_from_table, move_to_table]
+
+
+def test_anytime_search():
+    p = StateSpacePlanningProblem(start, goal, operators)
+    optimal = next(breadth_first_search(p)).cost()
+
+    result = anytime_search(p, heuristic=GoalCountHeuristic(goal))
+    assert result.status == 'completed'
+    assert result.cost == optimal
+    assert len(result.plan) == optimal
+    assert result.solutions_found >= 1
+
+
+def test_anytime_search_budgets():
+    p = StateSpacePlanningProblem(start, goal, operators)
+
+    result = anytime_search(p, node_limit=1)
+    assert result.status == 'node_limit'
+    assert result.nodes_expanded == 1
+
+    cancel = Event()
+    cancel.set()
+    result = anytime_search(p, cancel=cancel)
+    assert result.status == 'cancelled'
+
+    result = anytime_search(p, time_limit=0)
+    assert result.status == 'time_limit'
+
+
+def test_ff_heuristic():
+    h = FFHeuristic(operators, start, goal)
+    p = StateSpacePlanningProblem(start, goal, operators, heuristic=h)
+    assert h(p.initial) == 3
+
+    helpful = h.helpful_actions(p.initial.state)
+    children = list(p.successors(p.initial))
+    assert 0 < len(helpful) < len(children)
+
+    pp = StateSpacePlanningProblem(start, goal, operators, heuristic=h,
+                                   preferred='only')
+    assert 0 < len(list(pp.successors(pp.initial))) <= len(helpful)
+
+    pp = StateSpacePlanningProblem(start, goal, operators, heuristic=h,
+                                   preferred='first')
+    assert len(list(pp.successors(pp.initial))) == len(children)
+
+
+def test_ff_heuristic_fluents():
+    # the book ordering domain: buying books decreases Money.
+    buy = Operator('buy', [('Book', '?b'), ('Cost', '?b', '?c'),
+                           ('Money', '?m'), (ge, '?m', '?c')],
+                   [('Own', '?b'), ('decrease', ('Money',), '?c')])
+    books = [('Money', 30)]
+    for i in range(5):
+        books += [('Book', 'book%i' % i), ('Cost', 'book%i' % i, 10)]
+    goals = [('Own', 'book1'), ('Own', 'book2'), ('Money', '?m'),
+             (ge, '?m', 10)]
+
+    h = FFHeuristic([buy], books, goals)
+    p = StateSpacePlanningProblem(books, goals, [buy], heuristic=h)
+    assert h(p.initial) == 2
+    for child in p.successors(p.initial):
+        assert h(child) in (1, 2)
+        for grandchild in p.successors(child):
+            assert h(grandchild) < float('inf')
+
+    # a fluent can take any value in the relaxation.
+    h = FFHeuristic([buy], books, [('Own', 'book1'), ('Money', 10)])
+    assert h(p.initial) == 1
+
+    # helpful actions still match after Money changes.
+    goals = [('Own', 'book1'), ('Own', 'book2')]
+    h = FFHeuristic([buy], books, goals)
+    p = StateSpacePlanningProblem(books, goals, [buy], heuristic=h,
+                                  preferred='only')
+    child = [c for c in p.successors(p.initial)
+             if ('Own', 'book1') in c.state][0]
+    assert ('Money', 20) in child.state
+    assert [c.action[1]['?b'] for c in p.successors(child)] == ['book2']
+
+    p = StateSpacePlanningProblem(books, goals, [buy])
+    sol = next(enforced_hill_climbing(p, heuristic=h, fallback=False))
+    assert len(sol.path()) == 2
+
+
+def test_enforced_hill_climbing():
+    h = FFHeuristic(operators, start, goal)
+    p = StateSpacePlanningProblem(start, goal, operators)
+    sol = next(enforced_hill_climbing(p, heuristic=h))
+    assert set(goal).issubset(execute_plan(start, sol.path()))
+
+    unreachable = [('on', 'A', 'D')]
+    p = StateSpacePlanningProblem(start, unreachable, operators)
+    h = FFHeuristic(operators, start, unreachable)
+    assert list(enforced_hill_climbing(p, heuristic=h)) == []
+
+
+def test_lazy_best_first_search():
+    p = StateSpacePlanningProblem(start, goal, operators)
+
+    lazy = CachedHeuristic(FFHeuristic(operators, start, goal))
+    sol = next(lazy_best_first_search(p, heuristic=lazy))
+    assert set(goal).issubset(execute_plan(start, sol.path()))
+
+    eager = CachedHeuristic(FFHeuristic(operators, start, goal))
+    next(e for e in weighted_astar_steps(p, eager) if e is not None)
+    assert lazy.evaluations < eager.evaluations
+
+
+def test_bucket_queue():
+    bq = BucketQueue(node_value=lambda n: n.cost() + n.extra,
+                     tie_breaking='h')
+    bq.push(Node('a', node_cost=1, extra=2))
+    bq.push(Node('b', node_cost=2, extra=1))
+    bq.push(Node('c', node_cost=0, extra=1))
+    assert [n.state for n in bq] == ['c', 'b', 'a']
+    assert [bq.pop().state for _ in range(3)] == ['c', 'b', 'a']
+
+    lifo = BucketQueue(tie_breaking='lifo')
+    lifo.push(1.0)
+    lifo.push(1)
+    assert lifo.pop() == 1 and len(lifo) == 1
+
+    try:
+        lifo.push(2.5)
+        assert False
+    except ValueError:
+        pass
+
+    fallback = BucketQueue(fallback=True)
+    for v in [3, 1, 2.5]:
+        fallback.push(v)
+    assert [fallback.pop() for _ in range(3)] == [1, 2.5, 3]
+
+
+def test_bucket_best_first_search():
+    p = StateSpacePlanningProblem(start, goal, operators,
+                                  heuristic=GoalCountHeuristic(goal))
+    assert isinstance(open_list(p)(), BucketQueue)
+    optimal = next(breadth_first_search(p)).cost()
+    assert next(best_first_search(p)).cost() == optimal
+
+    expensive = Operator('expensive', [('block', '?b')],
+                         [('heavy', '?b')], cost=1.5)
+    p = StateSpacePlanningProblem(start, goal, operators + [expensive])
+    assert isinstance(open_list(p)(), PriorityQueue)
+
+    # integral costs, but a heuristic with fractional estimates.
+    def half_count(node):
+        return GoalCountHeuristic(goal)(node) / 2
+
+    p = StateSpacePlanningProblem(start, goal, operators,
+                                  heuristic=half_count)
+    assert next(best_first_search(p)).cost() == optimal
+
+
+def test_bidirectional_search():
+    p = StateSpacePlanningProblem(start, goal, operators)
+    optimal = next(breadth_first_search(p)).cost()
+
+    for strategy in ('size', 'bound'):
+        p = StateSpacePlanningProblem(start, goal, operators)
+        solutions = list(bidirectional_search(p, strategy=strategy))
+        costs = [sol.cost() for sol in solutions]
+        assert costs == sorted(costs, reverse=True)
+        assert costs[-1] == optimal
+        assert len(solutions[-1].path()) == optimal
@@ -0,0 +1,43 @@
+from py_search.uninformed import breadth_first_search
+
+from py_plan.total_order import StateSpacePlanningProblem
+from py_plan.stubborn_sets import StubbornSets
+from py_plan.problems.blocksworld import move
+from py_plan.problems.blocksworld import move_from_table
+from py_plan.problems.blocksworld import move_to_table
+
+start = [('on', 'A', 'Table'),
+         ('on', 'B', 'Table'),
+         ('on', 'C', 'A'),
+         ('block', 'A'),
+         ('block', 'B'),
+         ('block', 'C')]
+
+goal = [('on', 'A', 'B'),
+        ('on', 'B', 'C'),
+        ('on', 'C', 'Table')]
+
+operators = [move, move_from_table, move_to_table]
+
+
+def test_stubborn_set_achievers():
+    ss = StubbornSets(operators)
+    achievers = ss.achievers(('on', 'A', 'B'))
+    assert (0, {'?b': 'A', '?y': 'B'}) in achievers
+    assert (1, {'?b': 'A', '?y': 'B'}) in achievers
+    assert len([i for i, _ in achievers if i == 2]) == 0
+
+
+def test_stubborn_set_pruning():
+    p = StateSpacePlanningProblem(start, goal, operators)
+    pp = StateSpacePlanningProblem(start, goal, operators,
+                                   stubborn_sets=True)
+
+    succ = set(s.state for s in p.successors(p.initial))
+    psucc = set(s.state for s in pp.successors(pp.initial))
+    assert len(psucc) > 0
+    assert psucc.issubset(succ)
+
+    sol = next(breadth_first_search(p))
+    psol = next(breadth_first_search(pp))
+    assert psol.cost() == sol.cost()
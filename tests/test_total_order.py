@@ -0,0 +1,37 @@
+from py_search.uninformed import breadth_first_search
+
+from py_plan.total_order import StateSpacePlanningProblem
+from py_plan.total_order import CompactNode
+from py_plan.problems.blocksworld import move_from_table
+from py_plan.problems.blocksworld import move_to_table
+
+start = [('on', 'A', 'Table'),
+         ('on', 'B', 'Table'),
+         ('on', 'C', 'A'),
+         ('block', 'A'),
+         ('block', 'B'),
+         ('block', 'C')]
+
+goal = [('on', 'A', 'B'),
+        ('on', 'B', 'C'),
+        ('on', 'C', 'Table')]
+
+
+def test_compact_nodes():
+    p = StateSpacePlanningProblem(start, goal, [move_from_table,
+                                                move_to_table])
+    cp = StateSpacePlanningProblem(start, goal, [move_from_table,
+                                                 move_to_table],
+                                   compact=True, checkpoint_interval=2)
+
+    sol = next(breadth_first_search(p))
+    csol = next(breadth_first_search(cp))
+
+    assert isinstance(csol.state_node, CompactNode)
+    assert csol.state_node.state == sol.state_node.state
+    assert len(csol.path()) == len(sol.path()) == 3
+
+    node = csol.state_node
+    while node.parent is not None:
+        assert hash(node) == hash(node.state)
+        node = node.parent